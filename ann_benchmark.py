@@ -0,0 +1,164 @@
+"""
+近似检索基准测试模块
+以关闭索引的精确搜索为基准，测量不同 ef_search/probes 设置下向量索引的
+recall@k、结果重合数和查询延迟分位数，用数据选择索引参数
+"""
+
+import json
+import time
+import logging
+from typing import List, Dict, Any, Optional, Sequence
+
+from vector_store import PgVectorStore, SearchParams, ConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """线性插值计算分位数（q 取 0-100）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def sample_queries(store: PgVectorStore, count: int, seed: float = 0.5, max_length: int = 200) -> List[str]:
+    """
+    从表中随机抽取文档块作为伪查询
+
+    Args:
+        store: 已连接的向量存储
+        count: 抽取数量
+        seed: 随机种子（-1 到 1），相同种子在数据不变时抽到相同的文档块
+        max_length: 伪查询截取的文档块开头长度
+    """
+    if not store.connection:
+        raise ConnectionError("数据库未连接")
+
+    with store._transaction() as cursor:
+        cursor.execute("SELECT setseed(%s)", (seed,))
+        cursor.execute(f"""
+        SELECT content FROM {store.config.table_name}
+        WHERE vector IS NOT NULL
+        ORDER BY random()
+        LIMIT %s
+        """, (count,))
+        return [row[0][:max_length] for row in cursor.fetchall()]
+
+
+def benchmark_settings(ef_search_values: Sequence[int] = (), probes_values: Sequence[int] = (),
+                       iterative_scan: Optional[str] = None) -> List[SearchParams]:
+    """待测的查询参数组合，未指定时只测默认参数"""
+    settings = [SearchParams(ef_search=value, iterative_scan=iterative_scan) for value in ef_search_values]
+    settings += [SearchParams(probes=value, iterative_scan=iterative_scan) for value in probes_values]
+    return settings or [SearchParams(iterative_scan=iterative_scan)]
+
+
+def run_benchmark(store: PgVectorStore, queries: List[str], top_k: int = 10,
+                  settings: Optional[List[SearchParams]] = None,
+                  mode: Optional[str] = None, warmup: int = 1) -> Dict[str, Any]:
+    """
+    运行基准测试
+
+    每个查询只向量化一次，延迟只包含数据库检索时间。
+
+    Args:
+        store: 已连接的向量存储
+        queries: 查询文本
+        top_k: recall@k 的 k
+        settings: 待测的查询参数组合
+        mode: 被测的搜索模式 index/binary，默认按配置选择
+        warmup: 每组参数正式计时前预热的查询数（预热索引页缓存）
+
+    Returns:
+        基准测试报告，包含精确搜索的延迟和每组参数的 recall@k、平均重合数、延迟分位数
+    """
+    mode = mode or ("binary" if store.config.binary_quantization else "index")
+    settings = settings or [SearchParams()]
+
+    query_vectors = store.embed_batch(queries)
+
+    # 精确搜索基准
+    exact_ids = []
+    exact_latencies = []
+    for query_vector in query_vectors:
+        start_time = time.perf_counter()
+        chunks = store.search_by_vector(query_vector, top_k, mode="exact")
+        exact_latencies.append((time.perf_counter() - start_time) * 1000)
+        exact_ids.append([chunk.chunk_id for chunk in chunks])
+
+    results = []
+    for params in settings:
+        for query_vector in query_vectors[:warmup]:
+            store.search_by_vector(query_vector, top_k, mode=mode, params=params)
+
+        recalls = []
+        overlaps = []
+        latencies = []
+        for query_vector, expected in zip(query_vectors, exact_ids):
+            start_time = time.perf_counter()
+            chunks = store.search_by_vector(query_vector, top_k, mode=mode, params=params)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+
+            overlap = len({chunk.chunk_id for chunk in chunks} & set(expected))
+            overlaps.append(overlap)
+            if expected:
+                recalls.append(overlap / len(expected))
+
+        results.append({
+            "ef_search": params.ef_search,
+            "probes": params.probes,
+            "iterative_scan": params.iterative_scan,
+            "recall": sum(recalls) / len(recalls) if recalls else 0.0,
+            "mean_overlap": sum(overlaps) / len(overlaps) if overlaps else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99)
+        })
+        logger.info(f"基准测试 {params}: recall@{top_k}={results[-1]['recall']:.3f}")
+
+    return {
+        "table": store.config.table_name,
+        "mode": mode,
+        "index_method": store.index_method,
+        "queries": len(queries),
+        "top_k": top_k,
+        "exact": {
+            "recall": 1.0,
+            "mean_overlap": sum(len(ids) for ids in exact_ids) / len(exact_ids) if exact_ids else 0.0,
+            "p50_ms": percentile(exact_latencies, 50),
+            "p95_ms": percentile(exact_latencies, 95),
+            "p99_ms": percentile(exact_latencies, 99)
+        },
+        "results": results
+    }
+
+
+def print_benchmark_report(report: Dict[str, Any]):
+    """打印基准测试结果"""
+    top_k = report["top_k"]
+    print(f"\n表: {report['table']}, 模式: {report['mode']} ({report['index_method']}), "
+          f"查询: {report['queries']}, top_k: {top_k}")
+    print(f"\n{'ef_search':>10}{'probes':>8}{'iterative':>15}{f'recall@{top_k}':>12}{'重合数':>8}"
+          f"{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+
+    def show(value):
+        return "-" if value is None else str(value)
+
+    for result in report["results"]:
+        print(f"{show(result['ef_search']):>10}{show(result['probes']):>8}{show(result['iterative_scan']):>15}"
+              f"{result['recall']:>12.3f}{result['mean_overlap']:>8.1f}"
+              f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+    exact = report["exact"]
+    print(f"{'exact':>33}{exact['recall']:>12.3f}{exact['mean_overlap']:>8.1f}"
+          f"{exact['p50_ms']:>10.2f}{exact['p95_ms']:>10.2f}{exact['p99_ms']:>10.2f}")
+
+
+def save_benchmark_report(report: Dict[str, Any], path: str):
+    """保存基准测试结果为 JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
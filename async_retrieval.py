@@ -0,0 +1,229 @@
+"""
+异步检索模块
+基于 asyncpg 连接池和 aiohttp 的 pgvector 检索：查询向量化和数据库查询都不阻塞事件循环，
+一个进程内的多个查询可以在同一个事件循环中并发执行。asyncpg 和 aiohttp 是可选依赖
+"""
+
+import json
+import asyncio
+import logging
+from typing import List, Optional, Dict, Any
+
+from vector_backend import DocumentChunk, SearchParams, EmbeddingError, ConnectionError, VectorStoreError
+from vector_store import vector_literal
+from embedding_client import BATCH_ENDPOINT, SINGLE_ENDPOINT
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+def async_available() -> bool:
+    """异步检索依赖（asyncpg、aiohttp）是否已安装"""
+    return asyncpg is not None and aiohttp is not None
+
+
+class AsyncEmbeddingClient:
+    """基于 aiohttp 的 Ollama 向量化客户端（只用于查询向量化，批量入库仍使用 EmbeddingClient）"""
+
+    def __init__(self, config, embedding_cache=None):
+        """
+        Args:
+            config: 向量存储配置
+            embedding_cache: 与同步客户端共用的持久化向量缓存
+        """
+        if aiohttp is None:
+            raise ImportError("异步向量化需要 aiohttp: pip install aiohttp")
+
+        self.config = config
+        self.embedding_cache = embedding_cache
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._batch_endpoint_supported = config.use_batch_endpoint
+
+    def _service_url(self, path: str) -> str:
+        """根据 embedding_endpoint 推导同一服务上的其他接口地址"""
+        base_url = self.config.embedding_endpoint.split("/api/")[0]
+        return base_url.rstrip("/") + path
+
+    def _http_session(self) -> "aiohttp.ClientSession":
+        """共享的HTTP会话，复用keep-alive连接"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout),
+                connector=aiohttp.TCPConnector(limit=max(1, self.config.embedding_concurrency))
+            )
+        return self._session
+
+    def _active_endpoint(self) -> str:
+        """当前使用的向量化接口（查询向量缓存时使用）"""
+        return BATCH_ENDPOINT if self._batch_endpoint_supported else SINGLE_ENDPOINT
+
+    async def embed_text(self, text: str) -> List[float]:
+        """向量化单个文本（优先读取向量缓存），返回服务的原始向量"""
+        if self.embedding_cache:
+            # SQLite 缓存的读写（命中时还要更新访问时间并提交）在线程池中执行，不阻塞事件循环
+            cached = await asyncio.to_thread(self.embedding_cache.get, text, self._active_endpoint())
+            if cached is not None:
+                return cached
+
+        try:
+            embedding, endpoint = await self._embed(text)
+        except aiohttp.ClientError as e:
+            logger.error(f"向量化服务连接失败: {e}")
+            raise EmbeddingError(f"向量化服务连接失败: {e}")
+        except asyncio.TimeoutError:
+            logger.error("向量化请求超时")
+            raise EmbeddingError("向量化请求超时")
+
+        if len(embedding) != self.config.vector_dimension:
+            logger.warning(f"向量维度不匹配: 期望{self.config.vector_dimension}, 实际{len(embedding)}")
+        if self.embedding_cache:
+            await asyncio.to_thread(self.embedding_cache.put, text, embedding, endpoint)
+        return embedding
+
+    async def _embed(self, text: str):
+        """优先使用 /api/embed，服务端不支持时回退到 /api/embeddings，返回 (向量, 实际使用的接口)"""
+        session = self._http_session()
+        if self._batch_endpoint_supported:
+            async with session.post(self._service_url(BATCH_ENDPOINT),
+                                    json={"model": self.config.embedding_model, "input": [text]}) as response:
+                if response.status == 200:
+                    embeddings = (await response.json()).get("embeddings")
+                    if isinstance(embeddings, list) and len(embeddings) == 1:
+                        return embeddings[0], BATCH_ENDPOINT
+                elif response.status not in (404, 405, 501):
+                    raise EmbeddingError(f"向量化请求失败: {response.status}")
+            logger.warning("向量化服务不支持 /api/embed 接口，回退到 /api/embeddings")
+            self._batch_endpoint_supported = False
+
+        async with session.post(self.config.embedding_endpoint,
+                                json={"model": self.config.embedding_model, "prompt": text}) as response:
+            if response.status != 200:
+                raise EmbeddingError(f"向量化请求失败: {response.status}")
+            return (await response.json()).get("embedding", []), SINGLE_ENDPOINT
+
+    async def close(self):
+        """关闭HTTP会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def discard(self):
+        """丢弃绑定在已关闭事件循环上的HTTP会话（无法再在该循环中关闭）"""
+        self._session = None
+
+
+class AsyncPgVectorStore:
+    """
+    PgVectorStore 的异步检索视图
+
+    检索语句、降维变换和结果转换都复用同步的 PgVectorStore，只把向量化和查询换成异步驱动。
+    连接池绑定创建它的事件循环。
+    """
+
+    def __init__(self, store):
+        """
+        Args:
+            store: 同步的 PgVectorStore（提供配置、检索语句和已加载的降维投影）
+        """
+        if not async_available():
+            raise ImportError("异步检索需要 asyncpg 和 aiohttp: pip install asyncpg aiohttp")
+
+        self.store = store
+        self.config = store.config
+        self.embedder = AsyncEmbeddingClient(store.config, store.embedding_cache)
+        self.pool: Optional["asyncpg.Pool"] = None
+        # 并发的首批查询只创建一个连接池
+        self._connect_lock = asyncio.Lock()
+
+    @staticmethod
+    async def _init_connection(connection):
+        """注册 pgvector 和 JSONB 的编解码，查询参数可以直接传 Python 列表"""
+        # pgvector 扩展可能安装在 public 以外的模式中，按类型名查找所在模式
+        rows = await connection.fetch(
+            "SELECT t.typname, n.nspname FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace "
+            "WHERE t.typname IN ('vector', 'halfvec') AND pg_type_is_visible(t.oid)"
+        )
+        # 旧版本 pgvector 没有 halfvec 类型
+        for type_name, schema in rows:
+            await connection.set_type_codec(type_name, encoder=vector_literal, decoder=str,
+                                            schema=schema, format="text")
+        await connection.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads,
+                                        schema="pg_catalog", format="text")
+
+    async def connect(self) -> bool:
+        """创建 asyncpg 连接池（大小与同步连接池的配置一致）"""
+        async with self._connect_lock:
+            if self.pool is not None:
+                return True
+            try:
+                self.pool = await asyncpg.create_pool(
+                    self.config.database_url,
+                    min_size=self.config.pool_min_size,
+                    max_size=self.config.pool_max_size,
+                    init=self._init_connection
+                )
+                logger.info(f"已创建异步数据库连接池: {self.config.pool_min_size}-{self.config.pool_max_size} 个连接")
+                return True
+            except Exception as e:
+                logger.error(f"异步数据库连接失败: {e}")
+                raise ConnectionError(f"异步数据库连接失败: {e}")
+
+    async def close(self):
+        """关闭连接池和HTTP会话"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        await self.embedder.close()
+
+    def terminate(self):
+        """不经过事件循环立即关闭连接池（创建它的事件循环已关闭、无法再 await close() 时使用）"""
+        if self.pool is not None:
+            try:
+                self.pool.terminate()
+            except Exception as e:
+                logger.warning(f"关闭异步数据库连接池失败: {e}")
+            self.pool = None
+        self.embedder.discard()
+
+    async def search_by_vector(self, query_vector: List[float], top_k: int = 5,
+                               mode: Optional[str] = None, params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """按查询向量检索，参数同 PgVectorStore.search_by_vector"""
+        await self.connect()
+        settings, search_sql, query_params = self.store.search_query(
+            self.store._prepare_vector(query_vector), top_k, mode, params
+        )
+        async with self.pool.acquire() as connection:
+            # SET LOCAL 只在事务内生效
+            async with connection.transaction():
+                for statement in settings:
+                    await connection.execute(statement)
+                # asyncpg 按语句文本缓存预备语句，查询向量只发送一次
+                rows = await connection.fetch(search_sql, *query_params)
+        return self.store.rows_to_chunks(rows, params)
+
+    async def search_similar(self, query: str, top_k: int = 5,
+                             params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """基于向量相似度搜索相关文档"""
+        try:
+            query_vector = await self.embedder.embed_text(query)
+            chunks = await self.search_by_vector(query_vector, top_k, params=params)
+            logger.info(f"异步相似度搜索完成: 找到 {len(chunks)} 个相关文档块")
+            return chunks
+        except Exception as e:
+            logger.error(f"异步相似度搜索失败: {e}")
+            raise VectorStoreError(f"异步相似度搜索失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池状态"""
+        if self.pool is None:
+            return {}
+        return {"size": self.pool.get_size(), "idle": self.pool.get_idle_size()}
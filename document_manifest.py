@@ -0,0 +1,171 @@
+"""
+文档清单模块
+记录已入库文档的路径、大小、修改时间、内容哈希以及生成的文档块ID，
+用于增量向量化时识别新增、变更和删除的文件
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, asdict
+
+
+@dataclass
+class ManifestEntry:
+    """单个文档的清单记录"""
+    file_path: str
+    size: int
+    mtime: float
+    content_hash: str
+    document_id: str
+    chunk_ids: List[str] = field(default_factory=list)
+    indexed_at: Optional[str] = None
+
+
+@dataclass
+class ManifestDiff:
+    """当前文件集合与清单的差异"""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        """是否存在需要处理的变化"""
+        return bool(self.added or self.changed or self.removed)
+
+
+def file_content_hash(file_path: str) -> str:
+    """计算文件内容的 sha256 摘要"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentManifest:
+    """文档清单"""
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        """
+        加载文档清单
+
+        Args:
+            path: 清单文件路径（JSON），不存在时从空清单开始
+        """
+        self.path = os.path.expanduser(path)
+        self.entries: Dict[str, ManifestEntry] = {}
+        self._load()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        """清单中使用的文件路径键"""
+        return os.path.normpath(os.path.abspath(file_path))
+
+    def _load(self):
+        """从磁盘读取清单"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        for key, entry in data.get("files", {}).items():
+            self.entries[key] = ManifestEntry(**entry)
+
+    def save(self):
+        """原子地写回清单文件"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "version": self.VERSION,
+            "updated_at": datetime.now().isoformat(),
+            "files": {key: asdict(entry) for key, entry in sorted(self.entries.items())}
+        }
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, file_path: str) -> Optional[ManifestEntry]:
+        """获取文件的清单记录"""
+        return self.entries.get(self._key(file_path))
+
+    def diff(self, file_paths: List[str], scope: Optional[str] = None) -> ManifestDiff:
+        """
+        比较当前文件集合与清单
+
+        大小和修改时间都未变化的文件直接视为未变化；否则比较内容哈希，
+        仅修改时间变化而内容相同的文件也视为未变化。
+
+        Args:
+            file_paths: 当前存在的文件路径列表
+            scope: 只把该目录下的清单记录视为可删除（避免误删其他目录的文档）
+
+        Returns:
+            差异结果
+        """
+        result = ManifestDiff()
+        current_keys = set()
+
+        for file_path in file_paths:
+            key = self._key(file_path)
+            current_keys.add(key)
+            entry = self.entries.get(key)
+
+            if entry is None:
+                result.added.append(file_path)
+                continue
+
+            stat = os.stat(file_path)
+            if stat.st_size == entry.size and stat.st_mtime == entry.mtime:
+                result.unchanged.append(file_path)
+            elif file_content_hash(file_path) == entry.content_hash:
+                # 内容未变，只刷新修改时间，下次可直接跳过哈希计算
+                entry.mtime = stat.st_mtime
+                result.unchanged.append(file_path)
+            else:
+                result.changed.append(file_path)
+
+        scope_prefix = self._key(scope) + os.sep if scope else None
+        for key, entry in self.entries.items():
+            if key in current_keys:
+                continue
+            if scope_prefix and not key.startswith(scope_prefix):
+                continue
+            result.removed.append(entry.file_path)
+
+        return result
+
+    def update(self, file_path: str, document_id: str, chunk_ids: List[str]):
+        """记录文件处理成功后的状态"""
+        stat = os.stat(file_path)
+        self.entries[self._key(file_path)] = ManifestEntry(
+            file_path=file_path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            content_hash=file_content_hash(file_path),
+            document_id=document_id,
+            chunk_ids=list(chunk_ids),
+            indexed_at=datetime.now().isoformat()
+        )
+
+    def remove(self, file_path: str) -> Optional[ManifestEntry]:
+        """删除文件的清单记录"""
+        return self.entries.pop(self._key(file_path), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """清单统计信息"""
+        return {
+            "files": len(self.entries),
+            "chunks": sum(len(entry.chunk_ids) for entry in self.entries.values())
+        }
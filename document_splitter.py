@@ -11,11 +11,13 @@
 - 支持批量处理
 """
 
+import io
 import os
 import re
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
 @dataclass
@@ -29,16 +31,19 @@ class DocumentChunk:
 class DocumentSplitter:
     """文档分割器"""
 
-    def __init__(self, min_chunk_size: int = 200, max_chunk_size: int = 800):
+    def __init__(self, min_chunk_size: int = 200, max_chunk_size: int = 800,
+                 extract_keywords: bool = True):
         """
         初始化分割器
 
         Args:
             min_chunk_size: 最小块大小（字符数）
             max_chunk_size: 最大块大小（字符数）
+            extract_keywords: 分割时是否同步提取关键词（流水线中由独立阶段提取时关闭）
         """
         self.min_chunk_size = min_chunk_size
         self.max_chunk_size = max_chunk_size
+        self.extract_keywords = extract_keywords
 
         # 标题正则表达式
         self.title_patterns = {
@@ -64,79 +69,9 @@ class DocumentSplitter:
         """
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            chunks = []
-            current_chunk = []
-            current_metadata = self._extract_base_metadata(file_path)
-
-            in_code_block = False
-            current_title_level = 0
-            current_title = ""
-            block_index = 0
-
-            for i, line in enumerate(lines):
-                line = line.rstrip('\n')
-
-                # 检测代码块开始/结束
-                if self.code_block_pattern.match(line):
-                    in_code_block = not in_code_block
-                    current_chunk.append(line)
-                    continue
-
-                # 如果在代码块中，直接添加到当前块
-                if in_code_block:
-                    current_chunk.append(line)
-                    continue
-
-                # 检测标题
-                title_match = self._detect_title(line)
-                if title_match:
-                    level, title = title_match
-
-                    # 如果当前块有内容，先保存
-                    if current_chunk and self._should_save_chunk(current_chunk):
-                        chunk = self._create_chunk(
-                            current_chunk, current_metadata,
-                            current_title_level, current_title, block_index
-                        )
-                        if chunk:
-                            chunks.append(chunk)
-                        block_index += 1
-                        current_chunk = []
-
-                    # 开始新块
-                    current_title_level = level
-                    current_title = title
-                    current_chunk.append(line)
-
-                    # 更新元数据
-                    current_metadata.update(self._extract_title_metadata(level, title))
-
-                else:
-                    # 普通内容行
-                    current_chunk.append(line)
-
-                    # 检查是否需要分割（基于大小）
-                    if self._should_split_chunk(current_chunk):
-                        chunk = self._create_chunk(
-                            current_chunk, current_metadata,
-                            current_title_level, current_title, block_index
-                        )
-                        if chunk:
-                            chunks.append(chunk)
-                        block_index += 1
-                        current_chunk = []
-
-            # 处理最后一个块
-            if current_chunk and self._should_save_chunk(current_chunk):
-                chunk = self._create_chunk(
-                    current_chunk, current_metadata,
-                    current_title_level, current_title, block_index
-                )
-                if chunk:
-                    chunks.append(chunk)
+                text = f.read()
 
+            chunks = self.split_text(text, file_path)
             print(f"✓ 分割完成: {file_path} -> {len(chunks)} 个块")
             return chunks
 
@@ -144,6 +79,101 @@ class DocumentSplitter:
             print(f"✗ 分割失败 {file_path}: {e}")
             return []
 
+    def split_text(self, text: str, file_path: str) -> List[DocumentChunk]:
+        """
+        分割已读入内存的文档文本
+
+        Args:
+            text: 文档文本
+            file_path: 文档路径（用于提取元数据）
+
+        Returns:
+            文档块列表
+        """
+        lines = io.StringIO(text).readlines()
+
+        chunks = []
+        current_chunk = []
+        current_metadata = self._extract_base_metadata(file_path)
+
+        in_code_block = False
+        current_title_level = 0
+        current_title = ""
+        block_index = 0
+        # 各级标题，用于生成标题路径
+        heading_stack: Dict[int, str] = {}
+
+        for i, line in enumerate(lines):
+            line = line.rstrip('\n')
+
+            # 检测代码块开始/结束
+            if self.code_block_pattern.match(line):
+                in_code_block = not in_code_block
+                current_chunk.append(line)
+                continue
+
+            # 如果在代码块中，直接添加到当前块
+            if in_code_block:
+                current_chunk.append(line)
+                continue
+
+            # 检测标题
+            title_match = self._detect_title(line)
+            if title_match:
+                level, title = title_match
+
+                # 如果当前块有内容，先保存
+                if current_chunk and self._should_save_chunk(current_chunk):
+                    chunk = self._create_chunk(
+                        current_chunk, current_metadata,
+                        current_title_level, current_title, block_index
+                    )
+                    if chunk:
+                        chunks.append(chunk)
+                    block_index += 1
+                    current_chunk = []
+
+                # 开始新块
+                current_title_level = level
+                current_title = title
+                current_chunk.append(line)
+
+                # 更新元数据
+                current_metadata.update(self._extract_title_metadata(level, title))
+
+                # 更新标题路径（丢弃更深层级的旧标题）
+                heading_stack = {l: t for l, t in heading_stack.items() if l < level}
+                heading_stack[level] = title
+                current_metadata['heading_path'] = ' > '.join(
+                    heading_stack[l] for l in sorted(heading_stack)
+                )
+
+            else:
+                # 普通内容行
+                current_chunk.append(line)
+
+                # 检查是否需要分割（基于大小）
+                if self._should_split_chunk(current_chunk):
+                    chunk = self._create_chunk(
+                        current_chunk, current_metadata,
+                        current_title_level, current_title, block_index
+                    )
+                    if chunk:
+                        chunks.append(chunk)
+                    block_index += 1
+                    current_chunk = []
+
+        # 处理最后一个块
+        if current_chunk and self._should_save_chunk(current_chunk):
+            chunk = self._create_chunk(
+                current_chunk, current_metadata,
+                current_title_level, current_title, block_index
+            )
+            if chunk:
+                chunks.append(chunk)
+
+        return chunks
+
     def _detect_title(self, line: str) -> tuple:
         """检测标题行"""
         for level, pattern in self.title_patterns.items():
@@ -193,7 +223,7 @@ class DocumentSplitter:
         chunk_id = f"chapter_{chapter_id}_block_{block_index:03d}"
 
         # 提取关键词
-        keywords = self._extract_keywords(content)
+        keywords = self._extract_keywords(content) if self.extract_keywords else []
 
         # 构建完整元数据（不包含关键词，因为现在有独立字段）
         metadata = base_metadata.copy()
@@ -307,10 +337,10 @@ class DocumentSplitter:
         """提取关键词（使用jieba改进版本）"""
         try:
             # 导入关键词提取器
-            from keyword_extractor import KeywordExtractor
+            from keyword_extractor import get_keyword_extractor
 
-            # 创建提取器实例
-            extractor = KeywordExtractor()
+            # 使用进程内共享的提取器实例
+            extractor = get_keyword_extractor()
 
             # 使用TF-IDF方法提取关键词
             keywords_with_weights = extractor.extract_keywords(
@@ -347,16 +377,18 @@ class DocumentSplitter:
         # 返回前N个关键词
         return keywords[:max_keywords]
 
-    def batch_split(self, input_dir: str, output_dir: str = None) -> Dict[str, List[DocumentChunk]]:
+    def batch_split(self, input_dir: str, output_dir: str = None,
+                    workers: Optional[int] = 1) -> Dict[str, List[DocumentChunk]]:
         """
         批量分割目录中的所有文档
 
         Args:
             input_dir: 输入目录
             output_dir: 输出目录（可选，保存分割结果）
+            workers: 并行进程数，1 表示在当前进程顺序处理，None 表示使用全部CPU核心
 
         Returns:
-            文件名到文档块列表的映射
+            文件名到文档块列表的映射（按文件名排序）
         """
         input_path = Path(input_dir)
 
@@ -364,8 +396,8 @@ class DocumentSplitter:
             print(f"✗ 输入目录不存在: {input_dir}")
             return {}
 
-        # 获取所有markdown文件
-        md_files = list(input_path.glob('*.md'))
+        # 获取所有markdown文件（排序保证结果顺序确定）
+        md_files = sorted(input_path.glob('*.md'))
 
         if not md_files:
             print(f"✗ 在目录中未找到.md文件: {input_dir}")
@@ -375,8 +407,23 @@ class DocumentSplitter:
 
         all_chunks = {}
 
-        for file_path in md_files:
-            chunks = self.split_document(str(file_path))
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(md_files))
+
+        if workers > 1:
+            # 每个工作进程只初始化一次分割器和jieba，结果按提交顺序返回
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_split_worker,
+                initargs=(self.min_chunk_size, self.max_chunk_size, self.extract_keywords)
+            ) as executor:
+                results = executor.map(_split_in_worker, [str(file_path) for file_path in md_files])
+                chunk_lists = list(results)
+        else:
+            chunk_lists = [self.split_document(str(file_path)) for file_path in md_files]
+
+        for file_path, chunks in zip(md_files, chunk_lists):
             all_chunks[file_path.name] = chunks
 
             # 如果指定了输出目录，保存分割结果
@@ -411,6 +458,27 @@ class DocumentSplitter:
 
         print(f"  ✓ 保存分割结果: {output_file}")
 
+# 进程池工作进程中的分割器，由 _init_split_worker 在每个进程中创建一次
+_worker_splitter: Optional[DocumentSplitter] = None
+
+
+def _init_split_worker(min_chunk_size: int, max_chunk_size: int, extract_keywords: bool):
+    """进程池初始化：创建分割器并预热关键词提取器"""
+    global _worker_splitter
+    _worker_splitter = DocumentSplitter(min_chunk_size, max_chunk_size, extract_keywords)
+
+    if extract_keywords:
+        try:
+            from keyword_extractor import get_keyword_extractor
+            get_keyword_extractor()
+        except ImportError:
+            pass
+
+
+def _split_in_worker(file_path: str) -> List[DocumentChunk]:
+    """在工作进程中分割单个文档"""
+    return _worker_splitter.split_document(file_path)
+
 def test_splitter():
     """测试分割器功能"""
     print("=" * 60)
@@ -444,6 +512,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='文档分割器 - 智能分割markdown文档')
     parser.add_argument('--input', type=str, help='输入文件或目录路径')
     parser.add_argument('--output', type=str, help='输出目录路径（批量处理时使用）')
+    parser.add_argument('--workers', type=int, default=1, help='批量处理时的并行进程数（0 表示使用全部CPU核心）')
     parser.add_argument('--test', action='store_true', help='运行测试')
 
     args = parser.parse_args()
@@ -460,15 +529,17 @@ if __name__ == "__main__":
                 splitter._save_chunks(chunks, args.output, os.path.basename(args.input))
         elif os.path.isdir(args.input):
             # 批量处理
-            splitter.batch_split(args.input, args.output)
+            splitter.batch_split(args.input, args.output, workers=args.workers or None)
         else:
             print(f"✗ 输入路径不存在: {args.input}")
     else:
         print("使用说明:")
         print("  --input <路径>   输入文件或目录")
         print("  --output <路径>  输出目录（批量处理时使用）")
+        print("  --workers <数量> 批量处理时的并行进程数")
         print("  --test           运行测试")
         print("\n示例:")
         print("  python document_splitter.py --input text/07-Chapter-01-Prompt-Chaining.md")
         print("  python document_splitter.py --input text --output chunks")
+        print("  python document_splitter.py --input text --output chunks --workers 4")
         print("  python document_splitter.py --test")
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""
+向量缓存模块
+基于SQLite的持久化向量缓存，按 (embedding_model, vector_dimension, 向量化接口, sha256(content)) 索引，
+避免对未变化的文档块重复调用向量化服务。/api/embed 返回L2归一化的向量而 /api/embeddings 不归一化，
+两个接口的向量分开缓存
+"""
+
+import os
+import time
+import struct
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Dict, Any, Sequence
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句的参数数量上限较低，批量查询时分段处理
+_SQL_BATCH = 500
+
+
+def content_hash(text: str) -> str:
+    """计算文本内容的 sha256 摘要"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_float16(vector: Sequence[float]) -> bytes:
+    """将向量编码为小端 float16 字节串"""
+    return struct.pack(f"<{len(vector)}e", *vector)
+
+
+def unpack_float16(blob: bytes) -> List[float]:
+    """将小端 float16 字节串解码为向量"""
+    return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+
+
+class EmbeddingCache:
+    """持久化向量缓存"""
+
+    def __init__(self, path: str, model: str, dimension: int, max_size_mb: int = 1024,
+                 endpoint: str = "/api/embeddings"):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 缓存文件路径
+            model: 向量化模型名称
+            dimension: 向量维度
+            max_size_mb: 缓存向量数据的最大体积（MB），超出后按最近访问时间淘汰
+            endpoint: 默认的向量化接口，get/put 未指定 endpoint 时使用
+        """
+        self.path = os.path.expanduser(path)
+        self.model = model
+        self.dimension = dimension
+        self.endpoint = endpoint
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                endpoint TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, dimension, endpoint, content_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get(self, text: str, endpoint: Optional[str] = None) -> Optional[List[float]]:
+        """查询单个文本的缓存向量"""
+        return self.get_many([text], endpoint)[0]
+
+    def get_many(self, texts: List[str], endpoint: Optional[str] = None) -> List[Optional[List[float]]]:
+        """
+        批量查询缓存
+
+        Args:
+            texts: 文本列表
+            endpoint: 生成向量的接口，默认为构造时指定的接口
+
+        Returns:
+            与输入顺序一致的向量列表，未命中的位置为 None
+        """
+        endpoint = endpoint or self.endpoint
+        hashes = [content_hash(text) for text in texts]
+        found: Dict[str, bytes] = {}
+
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique_hashes), _SQL_BATCH):
+                batch = unique_hashes[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dimension = ? AND endpoint = ? AND content_hash IN ({placeholders})",
+                    (self.model, self.dimension, endpoint, *batch)
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? "
+                    "WHERE model = ? AND dimension = ? AND endpoint = ? AND content_hash = ?",
+                    [(now, self.model, self.dimension, endpoint, h) for h in found]
+                )
+                self._conn.commit()
+
+        results = []
+        for h in hashes:
+            blob = found.get(h)
+            if blob is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                results.append(unpack_float16(blob))
+        return results
+
+    def put(self, text: str, vector: List[float], endpoint: Optional[str] = None):
+        """写入单个文本的向量"""
+        self.put_many([text], [vector], endpoint)
+
+    def put_many(self, texts: List[str], vectors: List[List[float]], endpoint: Optional[str] = None):
+        """
+        批量写入缓存
+
+        Args:
+            texts: 文本列表
+            vectors: 与文本对应的向量列表
+            endpoint: 生成向量的接口，默认为构造时指定的接口
+        """
+        endpoint = endpoint or self.endpoint
+        now = time.time()
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            if not vector or len(vector) != self.dimension:
+                continue
+            key = content_hash(text)
+            blob = pack_float16(vector)
+            rows[key] = (self.model, self.dimension, endpoint, key, blob, len(blob), now)
+
+        if not rows:
+            return
+
+        with self._lock:
+            # 覆盖已有条目时先扣除旧条目的体积
+            keys = list(rows)
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                replaced = self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings "
+                    f"WHERE model = ? AND dimension = ? AND endpoint = ? AND content_hash IN ({placeholders})",
+                    (self.model, self.dimension, endpoint, *batch)
+                ).fetchone()[0]
+                self._total_size -= replaced
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, dimension, endpoint, content_hash, vector, size, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                list(rows.values())
+            )
+            self._total_size += sum(row[5] for row in rows.values())
+            self.writes += len(rows)
+
+            if self._total_size > self.max_size_bytes:
+                self._evict()
+
+            self._conn.commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰条目，直到体积降到上限的 90%"""
+        target = int(self.max_size_bytes * 0.9)
+        while self._total_size > target:
+            rows = self._conn.execute(
+                "SELECT rowid, size FROM embeddings ORDER BY last_access LIMIT ?", (_SQL_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._total_size = 0
+                break
+
+            evicted = []
+            for rowid, size in rows:
+                if self._total_size <= target:
+                    break
+                evicted.append((rowid,))
+                self._total_size -= size
+
+            self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", evicted)
+            self.evictions += len(evicted)
+
+        logger.info(f"向量缓存淘汰完成: 累计淘汰 {self.evictions} 条, 当前体积 {self._total_size / 1024 / 1024:.1f}MB")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "size_mb": round(self._total_size / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions
+        }
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._total_size = 0
+
+    def close(self):
+        """关闭缓存文件"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,312 @@
+"""
+向量化客户端模块
+调用 Ollama 向量化服务（/api/embed 批量接口，不支持时回退到 /api/embeddings），
+并发请求、持久化缓存和耗时统计；返回服务的原始向量，降维和归一化由向量存储后端处理
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any
+
+import requests
+
+from embedding_cache import EmbeddingCache
+from vector_backend import EmbeddingError
+
+logger = logging.getLogger(__name__)
+
+# 向量缓存按生成向量的接口区分：/api/embed 返回L2归一化的向量，/api/embeddings 返回原始向量
+BATCH_ENDPOINT = "/api/embed"
+SINGLE_ENDPOINT = "/api/embeddings"
+
+
+class EmbeddingClient:
+    """Ollama 向量化客户端"""
+
+    def __init__(self, config):
+        """
+        Args:
+            config: 向量存储配置，使用 embedding_* 、batch_size、timeout 和缓存相关字段
+        """
+        self.config = config
+        # 每个线程独立的HTTP会话，复用keep-alive连接
+        self._http_local = threading.local()
+        # 最近一次批量向量化的统计信息
+        self.last_embedding_stats: Dict[str, Any] = {}
+        # 服务端是否支持 /api/embed 多输入接口（None 表示尚未探测）
+        self._batch_endpoint_supported: Optional[bool] = None
+        self.embedding_cache = self._open_embedding_cache()
+
+    def _open_embedding_cache(self) -> Optional[EmbeddingCache]:
+        """按配置打开持久化向量缓存"""
+        if not self.config.embedding_cache_path:
+            return None
+
+        try:
+            return EmbeddingCache(
+                self.config.embedding_cache_path,
+                model=self.config.embedding_model,
+                dimension=self.config.vector_dimension,
+                max_size_mb=self.config.embedding_cache_max_mb,
+                endpoint=SINGLE_ENDPOINT
+            )
+        except Exception as e:
+            logger.warning(f"向量缓存打开失败，将不使用缓存: {e}")
+            return None
+
+    def embed_text(self, text: str) -> List[float]:
+        """使用Ollama的embedding模型向量化文本（优先读取向量缓存），返回服务的原始向量"""
+        if self.embedding_cache:
+            cached = self.embedding_cache.get(text, self.active_endpoint())
+            if cached is not None:
+                return cached
+
+        embedding, endpoint = self._embed_uncached(text)
+
+        if self.embedding_cache:
+            self.embedding_cache.put(text, embedding, endpoint)
+        return embedding
+
+    def _embed_uncached(self, text: str):
+        """调用向量化服务处理单个文本，返回 (向量, 实际使用的接口)"""
+        if self._batch_endpoint_enabled():
+            try:
+                return self.embed_many([text])[0], BATCH_ENDPOINT
+            except EmbeddingError:
+                # 服务端不支持批量接口时回退到单条接口，其他错误直接抛出
+                if self._batch_endpoint_supported is not False:
+                    raise
+
+        return self._embed_single(text), SINGLE_ENDPOINT
+
+    def _embed_single(self, text: str) -> List[float]:
+        """通过单输入的 /api/embeddings 接口向量化文本"""
+        try:
+            payload = {
+                "model": self.config.embedding_model,
+                "prompt": text
+            }
+
+            response = self._http_session().post(
+                self.config.embedding_endpoint,
+                json=payload,
+                timeout=self.config.timeout
+            )
+
+            if response.status_code == 200:
+                result = response.json()
+                embedding = result.get("embedding", [])
+
+                if len(embedding) != self.config.vector_dimension:
+                    logger.warning(f"向量维度不匹配: 期望{self.config.vector_dimension}, 实际{len(embedding)}")
+
+                return embedding
+            else:
+                logger.error(f"向量化请求失败: {response.status_code} - {response.text}")
+                raise EmbeddingError(f"向量化请求失败: {response.status_code}")
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"向量化服务连接失败: {e}")
+            raise EmbeddingError(f"向量化服务连接失败: {e}")
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        通过多输入的 /api/embed 接口批量向量化文本
+
+        超过 batch_size 的输入会自动拆分为多个请求；服务端返回 413 时对半拆分重试。
+        服务端不支持该接口时标记为不可用并抛出 EmbeddingError。
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与输入顺序一致的向量列表
+        """
+        batch_size = max(1, self.config.batch_size)
+        if len(texts) > batch_size:
+            embeddings = []
+            for start in range(0, len(texts), batch_size):
+                embeddings.extend(self.embed_many(texts[start:start + batch_size]))
+            return embeddings
+
+        try:
+            response = self._http_session().post(
+                self._service_url(BATCH_ENDPOINT),
+                json={"model": self.config.embedding_model, "input": texts},
+                timeout=self.config.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"向量化服务连接失败: {e}")
+            raise EmbeddingError(f"向量化服务连接失败: {e}")
+
+        if response.status_code == 413 and len(texts) > 1:
+            middle = len(texts) // 2
+            return self.embed_many(texts[:middle]) + self.embed_many(texts[middle:])
+
+        if response.status_code in (404, 405, 501):
+            self._mark_batch_endpoint_unsupported(f"HTTP {response.status_code}")
+            raise EmbeddingError(f"批量向量化接口不可用: {response.status_code}")
+
+        if response.status_code != 200:
+            logger.error(f"批量向量化请求失败: {response.status_code} - {response.text}")
+            raise EmbeddingError(f"批量向量化请求失败: {response.status_code}")
+
+        embeddings = response.json().get("embeddings")
+        if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+            self._mark_batch_endpoint_unsupported("响应中缺少 embeddings 字段")
+            raise EmbeddingError("批量向量化接口返回格式不正确")
+
+        self._batch_endpoint_supported = True
+        for embedding in embeddings:
+            if len(embedding) != self.config.vector_dimension:
+                logger.warning(f"向量维度不匹配: 期望{self.config.vector_dimension}, 实际{len(embedding)}")
+                break
+
+        return embeddings
+
+    def _batch_endpoint_enabled(self) -> bool:
+        """是否走 /api/embed 批量接口"""
+        return self.config.use_batch_endpoint and self._batch_endpoint_supported is not False
+
+    def active_endpoint(self) -> str:
+        """当前使用的向量化接口（查询向量缓存时使用）"""
+        return BATCH_ENDPOINT if self._batch_endpoint_enabled() else SINGLE_ENDPOINT
+
+    def _mark_batch_endpoint_unsupported(self, reason: str):
+        """记录服务端不支持批量接口，后续请求回退到单条接口"""
+        if self._batch_endpoint_supported is not False:
+            logger.warning(f"向量化服务不支持 /api/embed 批量接口({reason})，回退到单条接口")
+        self._batch_endpoint_supported = False
+
+    def _service_url(self, path: str) -> str:
+        """根据 embedding_endpoint 推导同一服务上的其他接口地址"""
+        base_url = self.config.embedding_endpoint.split("/api/")[0]
+        return base_url.rstrip("/") + path
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量向量化文本（返回向量化服务的原始向量）
+
+        服务端支持时每个请求通过 /api/embed 携带最多 batch_size 条输入，否则按
+        batch_size 分批逐条请求。两种方式都最多保持 embedding_concurrency 个请求
+        在途，返回结果与输入顺序一致。失败的文本使用零向量作为占位符。
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        latencies: List[float] = []
+        failed = 0
+
+        concurrency = max(1, self.config.embedding_concurrency)
+        batch_size = max(1, self.config.batch_size)
+        start_time = time.time()
+
+        # 先查缓存，只对未命中的文本调用向量化服务
+        if self.embedding_cache:
+            embeddings = self.embedding_cache.get_many(texts, self.active_endpoint())
+        pending = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        cache_hits = len(texts) - len(pending)
+        # 新向量来自哪个接口，按接口分别写入缓存
+        sources: Dict[int, str] = {}
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # 优先使用批量接口：每个请求携带最多 batch_size 条输入
+            if self._batch_endpoint_enabled():
+                groups = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+                group_texts = [[texts[index] for index in group] for group in groups]
+                for group, (group_embeddings, latency) in zip(groups, executor.map(self._timed_embed_many, group_texts)):
+                    latencies.append(latency)
+                    if group_embeddings is None:
+                        continue
+                    for index, embedding in zip(group, group_embeddings):
+                        embeddings[index] = embedding
+                        sources[index] = BATCH_ENDPOINT
+                pending = [index for index in pending if embeddings[index] is None]
+
+            # 单条接口（或批量请求失败后的回退）
+            for batch_start in range(0, len(pending), batch_size):
+                batch = pending[batch_start:batch_start + batch_size]
+                # executor.map 按提交顺序返回结果，保证顺序不变
+                batch_texts = [texts[index] for index in batch]
+                for index, (embedding, endpoint, latency) in zip(batch, executor.map(self._timed_embed, batch_texts)):
+                    if embedding is None:
+                        failed += 1
+                        embedding = [0.0] * self.config.vector_dimension
+                    else:
+                        sources[index] = endpoint
+                    embeddings[index] = embedding
+                    latencies.append(latency)
+
+        if self.embedding_cache and sources:
+            # 零向量占位符不写入缓存
+            for endpoint in set(sources.values()):
+                written = [index for index, source in sources.items() if source == endpoint and any(embeddings[index])]
+                self.embedding_cache.put_many([texts[i] for i in written], [embeddings[i] for i in written], endpoint)
+
+        self._record_embedding_stats(latencies, failed, time.time() - start_time, cache_hits)
+        return embeddings
+
+    def _timed_embed(self, text: str):
+        """向量化单个文本并记录请求耗时，返回 (向量, 接口, 耗时)，失败时向量和接口为 None"""
+        start_time = time.time()
+        try:
+            embedding, endpoint = self._embed_uncached(text)
+        except EmbeddingError as e:
+            logger.error(f"批量向量化失败: {e}")
+            embedding, endpoint = None, None
+        return embedding, endpoint, time.time() - start_time
+
+    def _timed_embed_many(self, texts: List[str]):
+        """批量向量化一组文本并记录请求耗时，失败时返回 (None, 耗时)"""
+        start_time = time.time()
+        try:
+            embeddings = self.embed_many(texts)
+        except EmbeddingError as e:
+            logger.warning(f"批量向量化请求失败，改为逐条处理: {e}")
+            embeddings = None
+        return embeddings, time.time() - start_time
+
+    def _record_embedding_stats(self, latencies: List[float], failed: int, total_time: float,
+                                cache_hits: int = 0):
+        """汇总批量向量化的请求耗时"""
+        if not latencies:
+            self.last_embedding_stats = {"requests": 0, "cache_hits": cache_hits} if cache_hits else {}
+            if cache_hits:
+                logger.info(f"批量向量化完成: 全部 {cache_hits} 条命中缓存")
+            return
+
+        ordered = sorted(latencies)
+        p95_index = min(len(ordered) - 1, int(len(ordered) * 0.95))
+        self.last_embedding_stats = {
+            "requests": len(latencies),
+            "failed": failed,
+            "concurrency": max(1, self.config.embedding_concurrency),
+            "total_time": total_time,
+            "avg_latency": sum(ordered) / len(ordered),
+            "p95_latency": ordered[p95_index],
+            "max_latency": ordered[-1],
+            "throughput": len(latencies) / total_time if total_time > 0 else 0.0,
+            "cache_hits": cache_hits
+        }
+        logger.info(
+            f"批量向量化完成: {len(latencies)} 个请求, 失败 {failed}, 缓存命中 {cache_hits}, "
+            f"总耗时 {total_time:.2f}s, 平均延迟 {self.last_embedding_stats['avg_latency']:.3f}s, "
+            f"P95 {self.last_embedding_stats['p95_latency']:.3f}s, "
+            f"吞吐 {self.last_embedding_stats['throughput']:.1f} 条/s"
+        )
+
+    def _http_session(self) -> requests.Session:
+        """获取当前线程的HTTP会话"""
+        session = getattr(self._http_local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._http_local.session = session
+        return session
+
+    def health_check(self) -> bool:
+        """向量化服务是否可用"""
+        try:
+            response = requests.get(self._service_url("/api/tags"), timeout=5)
+            return response.status_code == 200
+        except Exception:
+            return False
@@ -0,0 +1,368 @@
+"""
+流水线入库模块
+将清洗、分割、关键词提取、向量化和数据库写入组织为并发阶段，
+阶段之间通过有界队列连接：下游变慢时上游自动阻塞（背压），
+内存中同时存在的文档和文档块数量与语料规模无关
+"""
+
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Callable, Iterable
+
+from document_splitter import DocumentSplitter
+from vector_store import PgVectorStore, DocumentChunk
+from wash import clean_markdown_text
+from keyword_extractor import get_keyword_extractor
+
+logger = logging.getLogger(__name__)
+
+# 阶段结束标记
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """单个阶段的运行统计"""
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    busy_time: float = 0.0
+    errors: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """每秒处理的输入条目数（只计算实际工作时间）"""
+        return self.items_in / self.busy_time if self.busy_time > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'name': self.name,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_time': self.busy_time,
+            'throughput': self.throughput,
+            'errors': self.errors
+        }
+
+
+@dataclass
+class _DocumentWork:
+    """在阶段之间传递的文档"""
+    file_path: str
+    document_id: str
+    text: Optional[str] = None
+    chunks: List[Any] = field(default_factory=list)
+
+
+class IngestPipeline:
+    """流水线式文档入库"""
+
+    def __init__(self, vector_store: PgVectorStore,
+                 splitter: Optional[DocumentSplitter] = None,
+                 wash: bool = False,
+                 queue_size: int = 8,
+                 make_chunk_id: Optional[Callable] = None,
+                 delete_stale: bool = False,
+                 skip_existing: bool = False,
+                 max_keywords: int = 5):
+        """
+        初始化流水线
+
+        Args:
+            vector_store: 已连接的向量存储
+            splitter: 文档分割器，默认创建不在分割阶段提取关键词的分割器
+            wash: 是否在分割前清洗文本（删除英文段落、去掉<mark>标签）
+            queue_size: 阶段之间队列的容量
+            make_chunk_id: 文档块ID生成函数 (document_id, index, chunk, seen_ids) -> str
+            delete_stale: 入库完成后是否清理各文档中不再存在的文档块
+            skip_existing: 已入库的文档块不再向量化，只同步元数据（文档块ID由内容决定时使用）
+            max_keywords: 每个文档块提取的关键词数量
+        """
+        self.vector_store = vector_store
+        self.splitter = splitter or DocumentSplitter(extract_keywords=False)
+        self.wash = wash
+        self.queue_size = max(1, queue_size)
+        self.make_chunk_id = make_chunk_id or (lambda document_id, index, chunk, seen_ids: f"{document_id}_chunk_{index}")
+        self.delete_stale = delete_stale
+        self.skip_existing = skip_existing
+        self.max_keywords = max_keywords
+        self.keyword_extractor = get_keyword_extractor()
+
+        self.stats: Dict[str, StageStats] = {}
+        self._failed_documents: Dict[str, str] = {}
+        self._document_chunk_ids: Dict[str, List[str]] = {}
+        self._embed_buffer: List[DocumentChunk] = []
+        self._skipped_chunks = 0
+        self._lock = threading.Lock()
+        # 向量化和写入阶段共用同一个数据库连接，写入事务期间不能穿插其他语句
+        self._db_lock = threading.Lock()
+
+    def run(self, file_paths: Iterable[str]) -> Dict[str, Any]:
+        """
+        运行流水线
+
+        Args:
+            file_paths: 待入库的文件路径
+
+        Returns:
+            运行报告（文档数、文档块数、失败文档、各阶段统计）
+        """
+        start_time = time.time()
+        self.stats = {}
+        self._failed_documents = {}
+        self._document_chunk_ids = {}
+        self._embed_buffer = []
+        self._skipped_chunks = 0
+
+        stages = [
+            ("wash", self._read_document, None),
+            ("split", self._split_document, None),
+            ("keywords", self._extract_keywords, None),
+            ("embed", self._embed_chunks, self._flush_embed_buffer),
+            ("write", self._write_chunks, None),
+        ]
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(stages))]
+        threads = []
+        for index, (name, handler, flush) in enumerate(stages):
+            stats = StageStats(name=name)
+            self.stats[name] = stats
+            outbox = queues[index + 1] if index + 1 < len(stages) else None
+            thread = threading.Thread(
+                target=self._stage_worker,
+                args=(stats, queues[index], outbox, handler, flush),
+                name=f"ingest-{name}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        # 队列已满时 put 会阻塞，源头读取速度由最慢的阶段决定
+        document_count = 0
+        for file_path in file_paths:
+            queues[0].put(_DocumentWork(file_path=str(file_path), document_id=Path(file_path).stem))
+            document_count += 1
+        queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        stale_deleted = 0
+        if self.delete_stale:
+            for document_id, chunk_ids in self._document_chunk_ids.items():
+                if document_id in self._failed_documents:
+                    continue
+                try:
+                    stale_deleted += self.vector_store.delete_stale_chunks(document_id, chunk_ids)
+                except Exception as e:
+                    self._failed_documents[document_id] = f"清理过期文档块失败: {e}"
+
+        return {
+            'documents': document_count,
+            'successful': document_count - len(self._failed_documents),
+            'failed': len(self._failed_documents),
+            'failed_documents': dict(self._failed_documents),
+            'chunks_written': self.stats['write'].items_out,
+            'chunks_skipped': self._skipped_chunks,
+            'stale_deleted': stale_deleted,
+            'total_time': time.time() - start_time,
+            'stages': [stats.to_dict() for stats in self.stats.values()]
+        }
+
+    def _stage_worker(self, stats: StageStats, inbox: queue.Queue, outbox: Optional[queue.Queue],
+                      handler: Callable, flush: Optional[Callable]):
+        """阶段线程：从输入队列取条目，处理后放入输出队列"""
+        try:
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    break
+
+                stats.items_in += 1
+                self._emit(stats, outbox, self._timed(stats, handler, item))
+
+            if flush:
+                self._emit(stats, outbox, self._timed(stats, flush))
+        finally:
+            if outbox is not None:
+                outbox.put(_DONE)
+
+    def _timed(self, stats: StageStats, handler: Callable, *args) -> List[Any]:
+        """
+        执行处理函数并累计工作时间（不包含等待队列的时间）
+
+        处理函数抛出异常时保留已产出的结果，输入条目涉及的文档记为失败，不会被计入成功入库。
+        """
+        start_time = time.time()
+        outputs = []
+        try:
+            for output in handler(*args):
+                outputs.append(output)
+        except Exception as e:
+            stats.errors += 1
+            logger.error(f"流水线阶段 {stats.name} 处理失败: {e}")
+            for item in args:
+                for document_id in self._document_ids(item):
+                    self._fail(document_id, f"{stats.name} 阶段失败: {e}")
+        finally:
+            stats.busy_time += time.time() - start_time
+        return outputs
+
+    @staticmethod
+    def _emit(stats: StageStats, outbox: Optional[queue.Queue], outputs: List[Any]):
+        """将处理结果放入下游队列"""
+        for output in outputs:
+            stats.items_out += 1
+            if outbox is not None:
+                outbox.put(output)
+
+    def _fail(self, document_id: str, reason: str):
+        """记录失败的文档"""
+        with self._lock:
+            self._failed_documents.setdefault(document_id, reason)
+        logger.error(f"文档 {document_id} 入库失败: {reason}")
+
+    @staticmethod
+    def _document_ids(item) -> List[str]:
+        """阶段之间传递的条目（文档或一批文档块）涉及的文档ID"""
+        if isinstance(item, _DocumentWork):
+            return [item.document_id]
+        if isinstance(item, list):
+            return sorted({chunk.document_id for chunk in item})
+        return []
+
+    def _fail_batch(self, batch: List[DocumentChunk], reason: str):
+        """一批文档块处理失败时，批内涉及的每个文档都记为失败"""
+        for document_id in self._document_ids(batch):
+            self._fail(document_id, reason)
+
+    def _read_document(self, work: _DocumentWork):
+        """读取文档，按需清洗"""
+        try:
+            with open(work.file_path, 'r', encoding='utf-8') as f:
+                work.text = f.read()
+            if self.wash:
+                work.text = clean_markdown_text(work.text)
+        except Exception as e:
+            self._fail(work.document_id, f"读取失败: {e}")
+            return
+        yield work
+
+    def _split_document(self, work: _DocumentWork):
+        """分割文档"""
+        try:
+            work.chunks = self.splitter.split_text(work.text, work.file_path)
+        except Exception as e:
+            self._fail(work.document_id, f"分割失败: {e}")
+            return
+        work.text = None
+        yield work
+
+    def _extract_keywords(self, work: _DocumentWork):
+        """提取关键词并转换为向量存储的文档块"""
+        # 整个文档的文档块一次批量提取，每个文档块只分词一次
+        pending = [chunk.content for chunk in work.chunks if not chunk.keywords]
+        extracted = iter(self.keyword_extractor.extract_batch(
+            pending, top_k=self.max_keywords, fields=('keywords',)
+        ) if pending else [])
+
+        seen_ids = set()
+        vector_chunks = []
+        for index, chunk in enumerate(work.chunks):
+            keywords = chunk.keywords or next(extracted)['keywords']
+            metadata = dict(chunk.metadata)
+            metadata['keywords'] = keywords
+            vector_chunks.append(DocumentChunk(
+                content=chunk.content,
+                metadata=metadata,
+                chunk_id=self.make_chunk_id(work.document_id, index, chunk, seen_ids),
+                document_id=work.document_id
+            ))
+
+        # 只在需要清理过期文档块时记录，否则内存占用与语料规模无关
+        if self.delete_stale:
+            with self._lock:
+                self._document_chunk_ids[work.document_id] = [chunk.chunk_id for chunk in vector_chunks]
+
+        work.chunks = vector_chunks
+        yield work
+
+    def _embed_chunks(self, work: _DocumentWork):
+        """跨文档攒够 batch_size 个文档块后批量向量化"""
+        self._embed_buffer.extend(self._new_chunks(work) if self.skip_existing else work.chunks)
+        batch_size = max(1, self.vector_store.config.batch_size)
+        while len(self._embed_buffer) >= batch_size:
+            batch = self._embed_buffer[:batch_size]
+            self._embed_buffer = self._embed_buffer[batch_size:]
+            if self._embed(batch):
+                yield batch
+
+    def _new_chunks(self, work: _DocumentWork) -> List[DocumentChunk]:
+        """返回文档中尚未入库的文档块，已入库的文档块只更新元数据"""
+        with self._db_lock:
+            existing_ids = set(self.vector_store.get_chunk_ids(work.document_id))
+            kept_chunks = [chunk for chunk in work.chunks if chunk.chunk_id in existing_ids]
+            if kept_chunks:
+                self.vector_store.update_chunk_metadata(kept_chunks)
+        self._skipped_chunks += len(kept_chunks)
+        return [chunk for chunk in work.chunks if chunk.chunk_id not in existing_ids]
+
+    def _flush_embed_buffer(self):
+        """向量化剩余的文档块"""
+        if self._embed_buffer:
+            batch, self._embed_buffer = self._embed_buffer, []
+            if self._embed(batch):
+                yield batch
+
+    def _embed(self, batch: List[DocumentChunk]) -> bool:
+        """向量化一批文档块（批内可能包含多个文档），失败时批内涉及的文档记为失败"""
+        try:
+            embeddings = self.vector_store.embed_batch([chunk.content for chunk in batch])
+        except Exception as e:
+            self._fail_batch(batch, f"向量化失败: {e}")
+            return False
+        for chunk, embedding in zip(batch, embeddings):
+            chunk.vector = embedding
+            chunk.embedding_model = self.vector_store.config.embedding_model
+        return True
+
+    def _write_chunks(self, batch: List[DocumentChunk]):
+        """写入一批文档块"""
+        try:
+            with self._db_lock:
+                stored = self.vector_store.store_chunks(batch)
+        except Exception as e:
+            self._fail_batch(batch, f"写入数据库失败: {e}")
+            return
+        if stored:
+            yield from batch
+            return
+
+        self._fail_batch(batch, "写入数据库失败")
+
+
+def print_pipeline_report(report: Dict[str, Any]):
+    """打印流水线运行报告"""
+    print("\n=== 流水线入库结果 ===")
+    print(f"文档数: {report['documents']}")
+    print(f"成功: {report['successful']}")
+    print(f"失败: {report['failed']}")
+    print(f"写入文档块: {report['chunks_written']}")
+    if report['chunks_skipped']:
+        print(f"已入库未变化的文档块: {report['chunks_skipped']}")
+    if report['stale_deleted']:
+        print(f"清理过期文档块: {report['stale_deleted']}")
+    print(f"总耗时: {report['total_time']:.2f}s")
+
+    print(f"\n{'阶段':<10}{'输入':>8}{'输出':>8}{'工作时间(s)':>14}{'吞吐(条/s)':>14}{'错误':>6}")
+    for stage in report['stages']:
+        print(f"{stage['name']:<10}{stage['items_in']:>8}{stage['items_out']:>8}"
+              f"{stage['busy_time']:>14.2f}{stage['throughput']:>14.1f}{stage['errors']:>6}")
+
+    for document_id, reason in report['failed_documents'].items():
+        print(f"  ❌ {document_id}: {reason}")
@@ -10,20 +10,55 @@
 - 自定义词典支持
 """
 
+import os
+import re
+import json
+import marshal
+import hashlib
+import threading
 import jieba
 import jieba.analyse
 import jieba.posseg as pseg
-import re
-from typing import List, Tuple, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Dict, Any, Optional, Sequence
+
+# 编译后词典的缓存目录（默认词典 + 用户词典 + 领域词）
+DICTIONARY_CACHE_DIR = os.path.expanduser(os.getenv("RAG_JIEBA_CACHE_DIR", "~/.rag_cli/jieba"))
+
+# TF-IDF关键词保留的词性：名词、动名词、动词
+TFIDF_ALLOW_POS = frozenset(('n', 'vn', 'v'))
+
+# extract_batch 支持的结果类型
+BATCH_FIELDS = ('keywords', 'phrases', 'concepts', 'hybrid')
+
+# jieba 是否已完成初始化（每个进程只初始化一次）
+_jieba_initialized = False
+_jieba_lock = threading.Lock()
+
+# 进程内共享的关键词提取器
+_shared_extractor: Optional['KeywordExtractor'] = None
+_extractor_lock = threading.Lock()
+
+
+def get_keyword_extractor() -> 'KeywordExtractor':
+    """
+    获取进程内共享的关键词提取器
+
+    首次调用时完成jieba词典加载和领域词注册，之后的调用直接返回同一个实例。
+    """
+    global _shared_extractor
+    if _shared_extractor is None:
+        with _extractor_lock:
+            if _shared_extractor is None:
+                _shared_extractor = KeywordExtractor()
+    return _shared_extractor
+
 
 class KeywordExtractor:
     """关键词提取器"""
 
     def __init__(self):
-        """初始化提取器"""
-        # 初始化jieba
-        self._initialize_jieba()
-
+        """初始化提取器（批量处理时请使用 get_keyword_extractor() 共享实例）"""
         # 智能体领域自定义词典
         self.agent_domain_words = [
             # 核心概念
@@ -54,9 +89,8 @@ class KeywordExtractor:
             '任务规划', '资源分配', '协作系统', '知识管理'
         ]
 
-        # 添加自定义词典
-        for word in self.agent_domain_words:
-            jieba.add_word(word, freq=1000, tag='n')
+        # 初始化jieba并添加自定义词典
+        self._initialize_jieba()
 
         # 短语模式正则表达式
         self.phrase_patterns = [
@@ -104,15 +138,73 @@ class KeywordExtractor:
                            'herself', 'itself', 'ourselves', 'yourselves', 'themselves'}
 
     def _initialize_jieba(self):
-        """初始化jieba配置"""
+        """
+        初始化jieba配置
+
+        jieba.add_word 每次调用都会累加总词频，重复注册会让分词结果随处理历史漂移，
+        因此每个进程只初始化一次。加载默认词典、用户词典并注册领域词后的词频表
+        会缓存到磁盘，之后的进程直接读取缓存，跳过词典解析和逐词注册。
+        """
+        global _jieba_initialized
         # 设置分词模式
         jieba.setLogLevel(20)  # 减少日志输出
 
-        # 加载用户词典（如果有的话）
+        with _jieba_lock:
+            if _jieba_initialized:
+                return
+
+            cache_file = self._dictionary_cache_file()
+            if not self._load_dictionary_cache(cache_file):
+                # 加载用户词典（如果有的话）
+                try:
+                    jieba.load_userdict('user_dict.txt')
+                except:
+                    pass  # 如果没有用户词典，忽略
+
+                for word in self.agent_domain_words:
+                    jieba.add_word(word, freq=1000, tag='n')
+
+                self._save_dictionary_cache(cache_file)
+
+            _jieba_initialized = True
+
+    def _dictionary_cache_file(self) -> str:
+        """编译后词典的缓存文件路径，词典来源变化时文件名随之变化"""
+        digest = hashlib.sha256()
+        digest.update(jieba.__version__.encode('utf-8'))
+        digest.update(str(jieba.dt.dictionary or jieba.DEFAULT_DICT_NAME).encode('utf-8'))
+        digest.update(json.dumps(self.agent_domain_words, ensure_ascii=False).encode('utf-8'))
+        if os.path.exists('user_dict.txt'):
+            with open('user_dict.txt', 'rb') as f:
+                digest.update(f.read())
+        return os.path.join(DICTIONARY_CACHE_DIR, f"dict_{digest.hexdigest()[:16]}.cache")
+
+    @staticmethod
+    def _load_dictionary_cache(cache_file: str) -> bool:
+        """从缓存恢复jieba词频表和自定义词性，成功返回True"""
+        try:
+            with open(cache_file, 'rb') as f:
+                freq, total, word_tags = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+
+        with jieba.dt.lock:
+            jieba.dt.FREQ, jieba.dt.total = freq, total
+            jieba.dt.user_word_tag_tab.update(word_tags)
+            jieba.dt.initialized = True
+        return True
+
+    @staticmethod
+    def _save_dictionary_cache(cache_file: str):
+        """将当前jieba词频表和自定义词性写入缓存（写入失败不影响使用）"""
         try:
-            jieba.load_userdict('user_dict.txt')
-        except:
-            pass  # 如果没有用户词典，忽略
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                marshal.dump((jieba.dt.FREQ, jieba.dt.total, dict(jieba.dt.user_word_tag_tab)), f)
+            os.replace(tmp_path, cache_file)
+        except OSError:
+            pass
 
     def extract_keywords(self, text: str, top_k: int = 10,
                         method: str = 'tfidf',
@@ -140,20 +232,10 @@ class KeywordExtractor:
             keywords = jieba.analyse.textrank(
                 clean_text, topK=top_k, withWeight=with_weight, allowPOS=('n', 'vn', 'v')
             )
-        else:  # 默认使用tfidf
-            keywords = jieba.analyse.extract_tags(
-                clean_text, topK=top_k, withWeight=with_weight, allowPOS=('n', 'vn', 'v')
-            )
-
-        # 过滤停用词
-        if with_weight:
-            filtered_keywords = [(word, weight) for word, weight in keywords
-                               if word not in self.stop_words and len(word) >= 2]
-        else:
-            filtered_keywords = [word for word in keywords
-                              if word not in self.stop_words and len(word) >= 2]
+            return self._filter_keywords(keywords, top_k, with_weight)
 
-        return filtered_keywords[:top_k]
+        # 默认使用tfidf
+        return self._tfidf_from_tokens(self._segment(clean_text), top_k, with_weight)
 
     def extract_phrases(self, text: str, top_k: int = 10,
                        min_phrase_length: int = 2, max_phrase_length: int = 4) -> List[str]:
@@ -175,13 +257,158 @@ class KeywordExtractor:
         if not clean_text.strip():
             return []
 
-        # 使用词性标注提取名词性短语
-        words = pseg.cut(clean_text)
+        return self._phrases_from_tokens(self._segment(clean_text), top_k,
+                                         min_phrase_length, max_phrase_length)
+
+    def extract_concepts(self, text: str, top_k: int = 10) -> List[str]:
+        """
+        提取概念性短语（基于模式匹配）
+
+        Args:
+            text: 输入文本
+            top_k: 返回概念数量
+
+        Returns:
+            概念列表
+        """
+        clean_text = self._preprocess_text(text)
+
+        if not clean_text.strip():
+            return []
+
+        return self._concepts_from_text(clean_text, top_k)
+
+    def extract_hybrid_keywords(self, text: str, top_k: int = 10,
+                               method: str = 'tfidf') -> List[str]:
+        """
+        混合关键词提取（短语+概念+传统关键词）
+
+        Args:
+            text: 输入文本
+            top_k: 返回关键词数量
+            method: 传统关键词提取方法
+
+        Returns:
+            混合关键词列表
+        """
+        clean_text = self._preprocess_text(text)
+
+        if not clean_text.strip():
+            return []
+
+        # 短语和TF-IDF关键词共用同一次分词结果
+        return self._hybrid_from_tokens(clean_text, self._segment(clean_text), top_k, method)
+
+    def extract_batch(self, texts: List[str], top_k: int = 10,
+                      fields: Sequence[str] = BATCH_FIELDS,
+                      with_weight: bool = False,
+                      workers: int = 1) -> List[Dict[str, List]]:
+        """
+        批量提取关键词、短语、概念和混合关键词
+
+        每个文本只预处理和分词一次，TF-IDF关键词、短语和混合关键词共用同一份
+        词性标注结果。
+
+        Args:
+            texts: 输入文本列表
+            top_k: 每类结果返回的数量
+            fields: 需要的结果类型，取自 BATCH_FIELDS
+            with_weight: 关键词是否带权重
+            workers: 并行进程数，1 表示在当前进程中处理，0 表示使用全部CPU核
+
+        Returns:
+            与输入顺序一致的结果列表，每个元素为 {结果类型: 列表}
+        """
+        unknown = set(fields) - set(BATCH_FIELDS)
+        if unknown:
+            raise ValueError(f"不支持的结果类型: {', '.join(sorted(unknown))}")
+
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(texts) < 2:
+            return [self._extract_fields(text, top_k, fields, with_weight) for text in texts]
+
+        # 按进程数切分为若干批，减少进程间传输次数
+        batch_size = max(1, (len(texts) + workers * 4 - 1) // (workers * 4))
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_keyword_worker) as executor:
+            for batch_results in executor.map(_extract_batch_in_worker, batches,
+                                              [(top_k, tuple(fields), with_weight)] * len(batches)):
+                results.extend(batch_results)
+        return results
+
+    def _extract_fields(self, text: str, top_k: int, fields: Sequence[str],
+                        with_weight: bool) -> Dict[str, List]:
+        """对单个文本分词一次并提取所需的结果类型"""
+        clean_text = self._preprocess_text(text)
+        if not clean_text.strip():
+            return {name: [] for name in fields}
+
+        tokens = self._segment(clean_text) if set(fields) - {'concepts'} else []
+        result = {}
+        for name in fields:
+            if name == 'keywords':
+                result[name] = self._tfidf_from_tokens(tokens, top_k, with_weight)
+            elif name == 'phrases':
+                result[name] = self._phrases_from_tokens(tokens, top_k)
+            elif name == 'concepts':
+                result[name] = self._concepts_from_text(clean_text, top_k)
+            elif name == 'hybrid':
+                result[name] = self._hybrid_from_tokens(clean_text, tokens, top_k)
+        return result
+
+    @staticmethod
+    def _segment(clean_text: str) -> List[Tuple[str, str]]:
+        """词性标注分词，返回 (词, 词性) 列表"""
+        return [(pair.word, pair.flag) for pair in pseg.cut(clean_text)]
+
+    def _filter_keywords(self, keywords: List, top_k: int, with_weight: bool) -> List:
+        """过滤停用词和单字词"""
+        if with_weight:
+            filtered_keywords = [(word, weight) for word, weight in keywords
+                               if word not in self.stop_words and len(word) >= 2]
+        else:
+            filtered_keywords = [word for word in keywords
+                              if word not in self.stop_words and len(word) >= 2]
+
+        return filtered_keywords[:top_k]
+
+    def _tfidf_from_tokens(self, tokens: List[Tuple[str, str]], top_k: int,
+                           with_weight: bool = False) -> List:
+        """
+        基于已有的分词结果计算TF-IDF关键词
+
+        与 jieba.analyse.extract_tags(allowPOS=('n', 'vn', 'v')) 的计算方式一致，
+        只是不再重复分词。
+        """
+        tfidf = jieba.analyse.default_tfidf
+        freq = {}
+        for word, flag in tokens:
+            if flag not in TFIDF_ALLOW_POS:
+                continue
+            if len(word.strip()) < 2 or word.lower() in tfidf.stop_words:
+                continue
+            freq[word] = freq.get(word, 0.0) + 1.0
+
+        total = sum(freq.values())
+        for word in freq:
+            freq[word] *= tfidf.idf_freq.get(word, tfidf.median_idf) / total
+
+        if with_weight:
+            keywords = sorted(freq.items(), key=lambda item: item[1], reverse=True)
+        else:
+            keywords = sorted(freq, key=freq.__getitem__, reverse=True)
+
+        return self._filter_keywords(keywords[:top_k], top_k, with_weight)
 
+    def _phrases_from_tokens(self, tokens: List[Tuple[str, str]], top_k: int,
+                             min_phrase_length: int = 2, max_phrase_length: int = 4) -> List[str]:
+        """基于已有的分词结果提取名词性短语"""
         phrases = []
         current_phrase = []
 
-        for word, flag in words:
+        for word, flag in tokens:
             # 名词性词性：n(名词), vn(动名词), nr(人名), ns(地名), nt(机构名), nz(其他专名)
             if flag.startswith('n') and word not in self.stop_words and len(word) >= 2:
                 current_phrase.append(word)
@@ -201,26 +428,12 @@ class KeywordExtractor:
             if len(phrase) >= 4:
                 phrases.append(phrase)
 
-        # 去重并返回
-        unique_phrases = list(set(phrases))
+        # 按首次出现的顺序去重，保证多进程与单进程结果一致
+        unique_phrases = list(dict.fromkeys(phrases))
         return unique_phrases[:top_k]
 
-    def extract_concepts(self, text: str, top_k: int = 10) -> List[str]:
-        """
-        提取概念性短语（基于模式匹配）
-
-        Args:
-            text: 输入文本
-            top_k: 返回概念数量
-
-        Returns:
-            概念列表
-        """
-        clean_text = self._preprocess_text(text)
-
-        if not clean_text.strip():
-            return []
-
+    def _concepts_from_text(self, clean_text: str, top_k: int) -> List[str]:
+        """基于预处理后的文本匹配概念性短语"""
         concepts = []
         for pattern in self.phrase_patterns:
             matches = re.findall(pattern, clean_text)
@@ -232,29 +445,22 @@ class KeywordExtractor:
 
         return concepts[:top_k]
 
-    def extract_hybrid_keywords(self, text: str, top_k: int = 10,
-                               method: str = 'tfidf') -> List[str]:
-        """
-        混合关键词提取（短语+概念+传统关键词）
-
-        Args:
-            text: 输入文本
-            top_k: 返回关键词数量
-            method: 传统关键词提取方法
-
-        Returns:
-            混合关键词列表
-        """
+    def _hybrid_from_tokens(self, clean_text: str, tokens: List[Tuple[str, str]],
+                            top_k: int, method: str = 'tfidf') -> List[str]:
+        """基于已有的分词结果进行混合关键词提取"""
         # 提取短语
-        phrases = self.extract_phrases(text, top_k=top_k//2)
+        phrases = self._phrases_from_tokens(tokens, top_k=top_k//2)
 
         # 提取概念
-        concepts = self.extract_concepts(text, top_k=top_k//3)
+        concepts = self._concepts_from_text(clean_text, top_k=top_k//3)
 
-        # 提取传统关键词
-        traditional_keywords = self.extract_keywords(
-            text, top_k=top_k//3, method=method, with_weight=False
-        )
+        # 提取传统关键词（TextRank 需要自行构建共现图，仍单独分词）
+        if method == 'textrank':
+            traditional_keywords = self.extract_keywords(
+                clean_text, top_k=top_k//3, method=method, with_weight=False
+            )
+        else:
+            traditional_keywords = self._tfidf_from_tokens(tokens, top_k//3)
 
         # 合并并去重
         all_keywords = phrases + concepts + traditional_keywords
@@ -359,6 +565,17 @@ class KeywordExtractor:
             'textrank_only': textrank_only
         }
 
+def _init_keyword_worker():
+    """进程池初始化：预热共享的关键词提取器"""
+    get_keyword_extractor()
+
+
+def _extract_batch_in_worker(texts: List[str], options: Tuple[int, Tuple[str, ...], bool]) -> List[Dict[str, List]]:
+    """在工作进程中处理一批文本"""
+    top_k, fields, with_weight = options
+    return get_keyword_extractor().extract_batch(texts, top_k=top_k, fields=fields, with_weight=with_weight)
+
+
 def test_extractor():
     """测试关键词提取器"""
     print("=" * 60)
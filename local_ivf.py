@@ -0,0 +1,210 @@
+"""
+本地 IVF 索引模块
+用 NumPy 小批量 k-means 训练聚类中心，倒排表以连续数组保存：
+向量矩阵按聚类重新排列后，每个聚类对应矩阵中的一段连续行，查询时只扫描最近的若干个聚类
+"""
+
+import os
+import json
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 分配聚类时每次计算的行数，限制中间结果的内存
+ASSIGN_BLOCK_ROWS = 8192
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """按行L2归一化"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, metric: str, count: int = 1) -> np.ndarray:
+    """
+    每个向量最近的 count 个聚类中心 (n, count)，按距离从近到远
+
+    l2 按欧氏距离；cosine/ip 的聚类中心已归一化，按内积最大
+    """
+    dots = vectors @ centroids.T
+    if metric == "l2":
+        # ||v - c||^2 = ||v||^2 - 2 v·c + ||c||^2，||v||^2 不影响排序
+        scores = 2 * dots - (centroids ** 2).sum(axis=1)
+    else:
+        scores = dots
+
+    count = min(count, centroids.shape[0])
+    if count == 1:
+        return scores.argmax(axis=1)[:, None]
+    candidates = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def train_kmeans(matrix: np.ndarray, n_lists: int, metric: str = "l2", batch_size: int = 4096,
+                 iterations: int = 100, seed: int = 0) -> np.ndarray:
+    """
+    小批量 k-means 训练聚类中心
+
+    每轮随机抽取 batch_size 个向量分配到最近的中心，按每个中心累计分配数的倒数作为学习率
+    更新中心（Sculley 2010）。cosine/ip 度量在单位球面上聚类，中心每轮重新归一化。
+
+    Args:
+        matrix: 向量矩阵 (n, d)，可以是内存映射
+        n_lists: 聚类数
+        metric: 距离度量 l2/cosine/ip
+        batch_size: 每轮的样本数
+        iterations: 训练轮数
+        seed: 随机种子
+
+    Returns:
+        聚类中心 (n_lists, d) float32
+    """
+    rows = matrix.shape[0]
+    if rows < n_lists:
+        raise ValueError(f"向量数量 {rows} 少于聚类数 {n_lists}")
+
+    spherical = metric != "l2"
+    rng = np.random.default_rng(seed)
+    centroids = matrix[np.sort(rng.choice(rows, n_lists, replace=False))].astype(np.float32)
+    if spherical:
+        centroids = _normalize_rows(centroids)
+    counts = np.zeros(n_lists, dtype=np.float64)
+
+    for _ in range(iterations):
+        batch = matrix[np.sort(rng.choice(rows, min(batch_size, rows), replace=False))].astype(np.float32)
+        if spherical:
+            batch = _normalize_rows(batch)
+
+        assignment = nearest_centroids(batch, centroids, metric)[:, 0]
+        batch_counts = np.bincount(assignment, minlength=n_lists)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, batch)
+
+        updated = batch_counts > 0
+        counts[updated] += batch_counts[updated]
+        # c <- c + (sum(x) - n_b * c) / n_total，等价于逐个样本以 1/n 的学习率更新
+        centroids[updated] += ((sums[updated] - batch_counts[updated, None] * centroids[updated])
+                               / counts[updated, None]).astype(np.float32)
+        if spherical:
+            centroids = _normalize_rows(centroids)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    倒排文件索引
+
+    被索引的向量按聚类排列在存储矩阵的前 indexed_rows 行，聚类 i 的向量是
+    [offsets[i], offsets[i+1]) 行；之后追加的行未被索引，查询时总是全部扫描。
+    """
+
+    CENTROIDS_FILE = "ivf_centroids.npy"
+    LISTS_FILE = "ivf_lists.npy"
+    # 训练使用的距离度量，加载时与当前配置比较
+    META_FILE = "ivf_meta.json"
+
+    def __init__(self, centroids: np.ndarray, row_lists: np.ndarray, metric: str):
+        """
+        Args:
+            centroids: 聚类中心 (n_lists, d)
+            row_lists: 被索引的每一行所属的聚类，按聚类非递减排列
+            metric: 训练使用的距离度量
+        """
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.metric = metric
+        self._set_row_lists(row_lists)
+
+    def _set_row_lists(self, row_lists: np.ndarray):
+        self.row_lists = np.asarray(row_lists, dtype=np.int32)
+        counts = np.bincount(self.row_lists, minlength=self.n_lists)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    @property
+    def n_lists(self) -> int:
+        """聚类数"""
+        return self.centroids.shape[0]
+
+    @property
+    def indexed_rows(self) -> int:
+        """被索引的行数"""
+        return len(self.row_lists)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, n_lists: int, metric: str, **train_options) -> Tuple['IVFIndex', np.ndarray]:
+        """
+        训练聚类中心并把全部行分配到倒排表
+
+        Returns:
+            (索引, 行的新顺序)：调用方需按新顺序重排矩阵，使每个聚类的行连续
+        """
+        centroids = train_kmeans(matrix, n_lists, metric, **train_options)
+
+        assignment = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], ASSIGN_BLOCK_ROWS):
+            block = matrix[start:start + ASSIGN_BLOCK_ROWS].astype(np.float32)
+            if metric != "l2":
+                block = _normalize_rows(block)
+            assignment[start:start + len(block)] = nearest_centroids(block, centroids, metric)[:, 0]
+
+        order = np.argsort(assignment, kind="stable")
+        index = cls(centroids, assignment[order], metric)
+
+        sizes = np.diff(index.offsets)
+        logger.info(f"IVF 索引训练完成: {matrix.shape[0]} 行, {n_lists} 个聚类, "
+                    f"聚类大小 {sizes.min()}-{sizes.max()}, 空聚类 {int((sizes == 0).sum())}")
+        return index, order
+
+    def probe(self, query: np.ndarray, n_probe: int) -> List[Tuple[int, int]]:
+        """查询最近的 n_probe 个聚类，返回它们在矩阵中的行区间"""
+        vector = query[None, :].astype(np.float32)
+        if self.metric != "l2":
+            vector = _normalize_rows(vector)
+        lists = nearest_centroids(vector, self.centroids, self.metric, n_probe)[0]
+        return [(int(self.offsets[i]), int(self.offsets[i + 1])) for i in sorted(lists)
+                if self.offsets[i + 1] > self.offsets[i]]
+
+    def remove_rows(self, keep: np.ndarray):
+        """
+        删除行后更新倒排表
+
+        Args:
+            keep: 被索引的行中保留的行号（递增），删除不改变剩余行的相对顺序，各聚类仍然连续
+        """
+        self._set_row_lists(self.row_lists[keep])
+
+    def save(self, path: str):
+        """保存到目录"""
+        for name, array in ((self.CENTROIDS_FILE, self.centroids), (self.LISTS_FILE, self.row_lists)):
+            target = os.path.join(path, name)
+            with open(target + ".tmp", 'wb') as f:
+                np.save(f, array)
+            os.replace(target + ".tmp", target)
+
+        target = os.path.join(path, self.META_FILE)
+        with open(target + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"metric": self.metric}, f)
+        os.replace(target + ".tmp", target)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['IVFIndex']:
+        """从目录加载（度量为训练时保存的度量），不存在时返回 None"""
+        paths = [os.path.join(path, name) for name in (cls.CENTROIDS_FILE, cls.LISTS_FILE, cls.META_FILE)]
+        if not all(os.path.exists(target) for target in paths):
+            return None
+        centroids_path, lists_path, meta_path = paths
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metric = json.load(f)["metric"]
+        return cls(np.load(centroids_path), np.load(lists_path, mmap_mode="r"), metric)
+
+    @classmethod
+    def remove_files(cls, path: str):
+        """删除目录中的索引文件"""
+        for name in (cls.CENTROIDS_FILE, cls.LISTS_FILE, cls.META_FILE):
+            target = os.path.join(path, name)
+            if os.path.exists(target):
+                os.remove(target)
@@ -0,0 +1,64 @@
+"""
+本地向量存储（numpy/sqlite）命令行的公共部分
+配置读取 rag_cli/config.yaml 中的 vector_store，与 rag-cli 检索时使用同一份配置，
+入库和查询的距离度量、向量维度和降维方式保持一致
+"""
+
+import os
+import sys
+import glob
+import argparse
+from typing import Dict
+
+from ingest_pipeline import IngestPipeline, print_pipeline_report
+
+
+def make_parser(description: str, actions: Dict[str, str], path_help: str) -> argparse.ArgumentParser:
+    """
+    创建包含公共参数的命令行解析器
+
+    Args:
+        description: 工具说明
+        actions: 支持的操作及说明
+        path_help: --path 的说明
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('action', choices=list(actions),
+                        help='，'.join(f"{action} {help_text}" for action, help_text in actions.items()))
+    parser.add_argument('--input', type=str, default='text', help='文档目录（build）')
+    parser.add_argument('--pattern', type=str, default='*.md', help='文件匹配模式（build）')
+    parser.add_argument('--wash', action='store_true', help='分割前清洗文本（build）')
+    parser.add_argument('--path', type=str, help=path_help)
+    return parser
+
+
+def load_store_config(**overrides):
+    """
+    读取 rag-cli 配置中的向量存储配置
+
+    Args:
+        overrides: 命令行指定的配置项，值为 None 的项使用配置文件中的值
+    """
+    from rag_cli.main import load_config
+
+    config = load_config().retriever_config.vector_store_config
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(config, name, value)
+    return config
+
+
+def build_from_directory(store, args: argparse.Namespace):
+    """把 --input 目录中匹配 --pattern 的文档入库，并清理各文档中不再存在的文档块"""
+    file_paths = sorted(glob.glob(os.path.join(args.input, args.pattern)))
+    if not file_paths:
+        print(f"❌ 没有找到匹配的文档: {os.path.join(args.input, args.pattern)}")
+        sys.exit(1)
+    report = IngestPipeline(store, wash=args.wash, delete_stale=True).run(file_paths)
+    print_pipeline_report(report)
+
+
+def print_statistics(store):
+    """打印存储统计"""
+    for key, value in store.get_statistics().items():
+        print(f"{key}: {value}")
@@ -0,0 +1,533 @@
+"""
+本地向量存储模块
+将文档块向量加载为连续的 NumPy 矩阵并预先计算范数，
+查询时一次矩阵-向量乘积加 argpartition 得到精确 top_k，不需要数据库；
+语料较大时可构建本地 IVF 索引（local_ivf.py），只扫描最近的若干个聚类
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+
+import numpy as np
+
+from local_ivf import IVFIndex
+from vector_backend import VectorStoreBackend, DocumentChunk, SearchParams, VectorStoreError, ConnectionError
+from vector_store import PgVectorStore, VectorStoreConfig, DISTANCE_OPERATORS
+
+logger = logging.getLogger(__name__)
+
+LOCAL_DTYPES = ("float32", "float16")
+# float16 矩阵按块转换为 float32 再计算，避免 NumPy 半精度矩阵乘法的慢路径
+SCORE_BLOCK_ROWS = 8192
+LOCAL_INDEXES = ("flat", "ivf")
+
+
+def default_ivf_lists(row_count: int) -> int:
+    """本地 IVF 默认聚类数：4*sqrt(行数)，每个聚类平均约 sqrt(行数)/4 行"""
+    return max(1, min(row_count, int(4 * row_count ** 0.5)))
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """每行分数最高的 k 个位置，按分数从高到低"""
+    k = min(k, scores.shape[1])
+    # argpartition 只做 O(n) 的选择，再对 k 个候选排序
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def row_norms(matrix: np.ndarray) -> np.ndarray:
+    """按块计算矩阵每行的L2范数（float32）"""
+    squared = np.empty(matrix.shape[0], dtype=np.float32)
+    for start in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+        block = matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+        squared[start:start + len(block)] = np.einsum('ij,ij->i', block, block)
+    return np.sqrt(squared)
+
+
+def similarity_scores(queries: np.ndarray, matrix: np.ndarray, norms: np.ndarray, metric: str) -> np.ndarray:
+    """
+    计算查询与矩阵各行的相似度 (n_queries, n_rows)
+
+    分数与 PgVectorStore 一致：cosine 为余弦相似度，ip 为内积，l2 为 1 / (1 + 距离)
+    """
+    if matrix.dtype == np.float32:
+        dots = queries @ matrix.T
+    else:
+        dots = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+        for offset in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+            block = matrix[offset:offset + SCORE_BLOCK_ROWS].astype(np.float32)
+            dots[:, offset:offset + len(block)] = queries @ block.T
+
+    if metric == "ip":
+        return dots
+    query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    if metric == "cosine":
+        return dots / np.maximum(query_norms * norms, 1e-12)
+    # ||q - c||^2 = ||q||^2 - 2 q·c + ||c||^2
+    squared = np.maximum(query_norms ** 2 - 2 * dots + norms ** 2, 0.0)
+    return 1.0 / (1.0 + np.sqrt(squared))
+
+
+class NumpyVectorStore(VectorStoreBackend):
+    """基于内存 NumPy 矩阵的精确检索向量存储"""
+
+    VECTORS_FILE = "vectors.npy"
+    NORMS_FILE = "norms.npy"
+    CHUNKS_FILE = "chunks.json"
+
+    def __init__(self, config: VectorStoreConfig, embedder=None):
+        """
+        Args:
+            config: 向量存储配置，使用 local_*、distance_metric 和向量化相关字段
+            embedder: 向量化客户端，默认按配置创建 EmbeddingClient
+        """
+        if config.local_dtype not in LOCAL_DTYPES:
+            raise ValueError(f"不支持的本地向量类型: {config.local_dtype}")
+        if config.local_index not in LOCAL_INDEXES:
+            raise ValueError(f"不支持的本地索引类型: {config.local_index}，可选 {'/'.join(LOCAL_INDEXES)}")
+        if config.distance_metric not in DISTANCE_OPERATORS:
+            raise ValueError(f"不支持的距离度量: {config.distance_metric}")
+        if config.reduction_method == "pca":
+            raise ValueError("本地向量存储不支持 pca 降维（投影保存在数据库中），可使用 truncate")
+
+        super().__init__(config, embedder)
+        self.path = os.path.expanduser(config.local_store_path)
+        self.dtype = np.dtype(config.local_dtype)
+
+        self._chunks: List[DocumentChunk] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        # store_chunks 之后矩阵需要重建
+        self._pending: Dict[int, List[float]] = {}
+        # 本地 IVF 索引，覆盖矩阵的前 ivf.indexed_rows 行
+        self.ivf: Optional[IVFIndex] = None
+        self.loaded = False
+
+    def connect(self) -> bool:
+        """加载本地向量文件（不存在时视为空存储；已加载时直接返回，不丢弃未保存的修改）"""
+        if self.loaded:
+            return True
+        vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+        chunks_path = os.path.join(self.path, self.CHUNKS_FILE)
+        if os.path.exists(vectors_path) and os.path.exists(chunks_path):
+            self.load()
+        else:
+            logger.warning(f"本地向量文件不存在: {self.path}，请先运行 python numpy_store.py build")
+        self.loaded = True
+        return True
+
+    def disconnect(self):
+        """本地存储无需断开，未保存的修改会被丢弃"""
+        if self._pending:
+            logger.warning(f"本地向量存储有 {len(self._pending)} 个未保存的文档块")
+
+    @property
+    def size(self) -> int:
+        """文档块数量"""
+        return len(self._chunks)
+
+    def load(self):
+        """
+        从 local_store_path 加载向量矩阵和文档块
+
+        向量矩阵以只读内存映射打开，由操作系统按需换页；修改后的矩阵在内存中重建，save() 时写回。
+        """
+        with open(os.path.join(self.path, self.CHUNKS_FILE), 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        matrix = np.load(os.path.join(self.path, self.VECTORS_FILE), mmap_mode="r")
+        if matrix.shape[0] != len(records):
+            raise VectorStoreError(f"本地向量文件损坏: {matrix.shape[0]} 个向量, {len(records)} 个文档块")
+
+        self._chunks = [
+            DocumentChunk(
+                content=record["content"],
+                metadata=record["metadata"],
+                chunk_id=record["chunk_id"],
+                document_id=record["document_id"],
+                embedding_model=record.get("embedding_model"),
+                created_at=datetime.fromisoformat(record["created_at"]) if record.get("created_at") else None
+            )
+            for record in records
+        ]
+        self._positions = {chunk.chunk_id: index for index, chunk in enumerate(self._chunks)}
+
+        norms_path = os.path.join(self.path, self.NORMS_FILE)
+        norms = np.load(norms_path) if os.path.exists(norms_path) else None
+        self._set_matrix(matrix, norms)
+        self._pending = {}
+
+        self.ivf = IVFIndex.load(self.path)
+        if self.ivf is not None and self.ivf.indexed_rows > len(self._chunks):
+            logger.warning("本地 IVF 索引与向量文件不一致，已忽略，请重新运行 python numpy_store.py index")
+            self.ivf = None
+        if self.ivf is not None and self.ivf.metric != self.config.distance_metric:
+            logger.warning(f"本地 IVF 索引按 {self.ivf.metric} 度量训练，与当前配置 {self.config.distance_metric} 不一致，"
+                           "已忽略，请重新运行 python numpy_store.py index")
+            self.ivf = None
+        if self.config.local_index == "ivf" and self.ivf is None:
+            logger.warning("本地 IVF 索引不存在，使用精确检索，请运行 python numpy_store.py index")
+
+        logger.info(f"已加载本地向量: {matrix.shape[0]} 个文档块, {matrix.shape[1] if matrix.ndim == 2 else 0} 维, "
+                    f"{matrix.dtype}" + (f", IVF {self.ivf.n_lists} 个聚类" if self.ivf else ""))
+
+    def save(self):
+        """保存向量矩阵和文档块到 local_store_path（先写临时文件再替换）"""
+        self._apply_pending()
+        os.makedirs(self.path, exist_ok=True)
+
+        records = [
+            {
+                "chunk_id": chunk.chunk_id,
+                "document_id": chunk.document_id,
+                "content": chunk.content,
+                "metadata": chunk.metadata,
+                "embedding_model": chunk.embedding_model,
+                "created_at": chunk.created_at.isoformat() if chunk.created_at else None
+            }
+            for chunk in self._chunks
+        ]
+        matrix = self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=self.dtype)
+        norms = self._norms if self._norms is not None else np.zeros(0, dtype=np.float32)
+
+        vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+        norms_path = os.path.join(self.path, self.NORMS_FILE)
+        chunks_path = os.path.join(self.path, self.CHUNKS_FILE)
+        with open(vectors_path + ".tmp", 'wb') as f:
+            np.save(f, matrix)
+        with open(norms_path + ".tmp", 'wb') as f:
+            np.save(f, norms)
+        with open(chunks_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(norms_path + ".tmp", norms_path)
+        os.replace(chunks_path + ".tmp", chunks_path)
+
+        if self.ivf is not None:
+            self.ivf.save(self.path)
+        else:
+            IVFIndex.remove_files(self.path)
+        logger.info(f"本地向量已保存: {len(records)} 个文档块 -> {self.path}")
+
+    def _set_matrix(self, matrix: np.ndarray, norms: Optional[np.ndarray] = None):
+        """设置向量矩阵并预先计算范数（norms 为已保存的范数，行数一致时直接使用）"""
+        if matrix.dtype != self.dtype or not matrix.flags.c_contiguous:
+            matrix = np.ascontiguousarray(matrix, dtype=self.dtype)
+        # 类型一致的内存映射保持映射，不读入内存
+        self._matrix = matrix
+        if self._matrix.ndim != 2 or self._matrix.shape[0] == 0:
+            self._norms = np.zeros(0, dtype=np.float32)
+            return
+        if norms is not None and norms.shape == (self._matrix.shape[0],):
+            self._norms = norms.astype(np.float32, copy=False)
+            return
+        self._norms = row_norms(self._matrix)
+
+    def _apply_pending(self):
+        """把 store_chunks 写入的向量合并进矩阵"""
+        if not self._pending:
+            return
+
+        dimension = len(next(iter(self._pending.values())))
+        matrix = np.zeros((len(self._chunks), dimension), dtype=self.dtype)
+        if self._matrix is not None and self._matrix.ndim == 2 and self._matrix.shape[0]:
+            if self._matrix.shape[1] != dimension:
+                raise VectorStoreError(f"向量维度 {dimension} 与本地存储的 {self._matrix.shape[1]} 维不一致")
+            kept = min(self._matrix.shape[0], len(self._chunks))
+            matrix[:kept] = self._matrix[:kept]
+        for index, vector in self._pending.items():
+            matrix[index] = vector
+        self._pending = {}
+        self._set_matrix(matrix)
+
+    # ---- 写入（供 IngestPipeline 使用） ----
+
+    def store_chunks(self, chunks: List[DocumentChunk]) -> bool:
+        """按 chunk_id 插入或覆盖文档块（调用 save() 后持久化）"""
+        for chunk in chunks:
+            if chunk.vector is None:
+                continue
+            # 向量只保存在矩阵中
+            stored = DocumentChunk(
+                content=chunk.content,
+                metadata=chunk.metadata,
+                chunk_id=chunk.chunk_id,
+                document_id=chunk.document_id,
+                embedding_model=chunk.embedding_model,
+                created_at=chunk.created_at or datetime.now()
+            )
+            index = self._positions.get(chunk.chunk_id)
+            if index is None:
+                index = len(self._chunks)
+                self._positions[chunk.chunk_id] = index
+                self._chunks.append(stored)
+            else:
+                self._chunks[index] = stored
+            self._pending[index] = chunk.vector
+        return True
+
+    def get_chunk_ids(self, document_id: str) -> List[str]:
+        """获取某个文档的全部文档块ID"""
+        return [chunk.chunk_id for chunk in self._chunks if chunk.document_id == document_id]
+
+    def fetch_chunks(self, chunk_ids: List[str]) -> Dict[str, DocumentChunk]:
+        """按 chunk_id 读取文档块（内容常驻内存，检索时忽略 lazy_content）"""
+        chunks = {}
+        for chunk_id in chunk_ids:
+            index = self._positions.get(chunk_id)
+            if index is not None:
+                source = self._chunks[index]
+                chunks[chunk_id] = DocumentChunk(
+                    content=source.content,
+                    metadata=dict(source.metadata),
+                    chunk_id=source.chunk_id,
+                    document_id=source.document_id,
+                    embedding_model=source.embedding_model,
+                    created_at=source.created_at
+                )
+        return chunks
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """删除指定的文档块"""
+        targets = set(chunk_ids)
+        return self._remove(lambda chunk: chunk.chunk_id in targets)
+
+    def delete_stale_chunks(self, document_id: str, keep_chunk_ids: List[str]) -> int:
+        """删除某个文档中不在保留列表里的文档块"""
+        keep = set(keep_chunk_ids)
+        return self._remove(lambda chunk: chunk.document_id == document_id and chunk.chunk_id not in keep)
+
+    def delete_document(self, document_id: str) -> int:
+        """删除某个文档的全部文档块"""
+        return self._remove(lambda chunk: chunk.document_id == document_id)
+
+    def _remove(self, predicate) -> int:
+        """删除满足条件的文档块并压缩矩阵（保持剩余行的顺序，IVF 各聚类仍然连续）"""
+        self._apply_pending()
+        keep = np.array([index for index, chunk in enumerate(self._chunks) if not predicate(chunk)], dtype=np.int64)
+        removed = len(self._chunks) - len(keep)
+        if not removed:
+            return 0
+
+        self._chunks = [self._chunks[index] for index in keep]
+        self._positions = {chunk.chunk_id: index for index, chunk in enumerate(self._chunks)}
+        if self._matrix is not None and self._matrix.ndim == 2 and self._matrix.shape[0]:
+            self._set_matrix(self._matrix[keep], self._norms[keep])
+        if self.ivf is not None:
+            self.ivf.remove_rows(keep[keep < self.ivf.indexed_rows])
+        return removed
+
+    # ---- 本地 IVF 索引 ----
+
+    def build_index(self, n_lists: Optional[int] = None, **train_options) -> IVFIndex:
+        """
+        训练本地 IVF 索引并按聚类重排矩阵（调用 save() 后持久化）
+
+        之后新增的文档块追加在矩阵末尾，查询时总是全部扫描；覆盖已索引的文档块时保留原聚类。
+        增量写入较多后应重新构建。
+
+        Args:
+            n_lists: 聚类数，默认使用 local_ivf_lists，未配置时为 4*sqrt(行数)
+            train_options: 传给 train_kmeans 的参数（batch_size/iterations/seed）
+        """
+        self._apply_pending()
+        if not self._chunks:
+            raise VectorStoreError("本地向量存储为空，无法构建 IVF 索引")
+
+        n_lists = n_lists or self.config.local_ivf_lists or default_ivf_lists(len(self._chunks))
+        index, order = IVFIndex.build(self._matrix, n_lists, self.config.distance_metric, **train_options)
+
+        self._chunks = [self._chunks[position] for position in order]
+        self._positions = {chunk.chunk_id: position for position, chunk in enumerate(self._chunks)}
+        self._set_matrix(self._matrix[order], self._norms[order])
+        self.ivf = index
+        return index
+
+    def drop_index(self):
+        """删除本地 IVF 索引（调用 save() 后删除索引文件）"""
+        self.ivf = None
+
+    # ---- 检索 ----
+
+    def _scores(self, queries: np.ndarray, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """计算查询与矩阵 [start, end) 行的相似度 (n_queries, end - start)"""
+        return similarity_scores(queries, self._matrix[start:end], self._norms[start:end],
+                                 self.config.distance_metric)
+
+    def _search_ivf(self, query: np.ndarray, top_k: int, probes: int):
+        """扫描最近的 probes 个聚类和未索引的尾部行，返回 (行号, 分数)"""
+        ranges = self.ivf.probe(query, probes)
+        if self.ivf.indexed_rows < len(self._chunks):
+            ranges.append((self.ivf.indexed_rows, len(self._chunks)))
+        if not ranges:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores = np.concatenate([self._scores(query[None, :], start, end)[0] for start, end in ranges])
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        top = top_k_indices(scores[None, :], top_k)[0]
+        return rows[top], scores[top]
+
+    def search_batch(self, query_vectors: List[List[float]], top_k: int = 5,
+                     params: Optional[SearchParams] = None) -> List[List[DocumentChunk]]:
+        """
+        批量检索
+
+        精确检索时一次矩阵-矩阵乘积计算全部查询的分数；local_index 为 ivf 且索引存在时，
+        每个查询只扫描最近的若干个聚类（params.probes，默认 local_ivf_probes）。
+
+        Args:
+            query_vectors: 已预处理的查询向量
+            top_k: 每个查询返回的数量
+            params: 近似搜索参数，只使用 probes
+        """
+        return self._search(query_vectors, top_k, params)
+
+    def _search(self, query_vectors: List[List[float]], top_k: int, params: Optional[SearchParams],
+                exact: bool = False) -> List[List[DocumentChunk]]:
+        """检索实现，exact=True 时忽略 IVF 索引"""
+        if not self.loaded:
+            raise ConnectionError("本地向量存储未加载")
+        self._apply_pending()
+        if not self._chunks or not query_vectors:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if self.config.local_index == "ivf" and self.ivf is not None and not exact:
+            probes = (params.probes if params and params.probes else None) or self.config.local_ivf_probes
+            hits = [self._search_ivf(query, top_k, probes) for query in queries]
+        else:
+            scores = self._scores(queries)
+            top_indices = top_k_indices(scores, top_k)
+            hits = [(indices, scores[row, indices]) for row, indices in enumerate(top_indices)]
+
+        results = []
+        for indices, similarities in hits:
+            chunks = []
+            for index, similarity in zip(indices, similarities):
+                source = self._chunks[index]
+                metadata = dict(source.metadata)
+                metadata["similarity"] = float(similarity)
+                chunks.append(DocumentChunk(
+                    content=source.content,
+                    metadata=metadata,
+                    chunk_id=source.chunk_id,
+                    document_id=source.document_id,
+                    embedding_model=source.embedding_model,
+                    created_at=source.created_at
+                ))
+            results.append(chunks)
+        return results
+
+    def search_by_vector(self, query_vector: List[float], top_k: int = 5,
+                         mode: Optional[str] = None, params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """
+        按查询向量检索
+
+        mode 为 exact 时总是精确计算（基准测试用），否则按 local_index 选择；其余取值为与 PgVectorStore 兼容保留
+        """
+        return self._search([query_vector], top_k, params, exact=mode == "exact")[0]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        self._apply_pending()
+        model_distribution: Dict[str, int] = {}
+        for chunk in self._chunks:
+            model_distribution[chunk.embedding_model] = model_distribution.get(chunk.embedding_model, 0) + 1
+
+        return {
+            "total_chunks": len(self._chunks),
+            "unique_documents": len({chunk.document_id for chunk in self._chunks}),
+            "model_distribution": model_distribution,
+            "backend": "numpy",
+            "path": self.path,
+            "vector_storage": str(self.dtype),
+            "local_index": (f"ivf ({self.ivf.n_lists} 个聚类, 已索引 {self.ivf.indexed_rows} 行)"
+                            if self.ivf is not None else "flat"),
+            "matrix_size_mb": round(self._matrix.nbytes / 1024 / 1024, 2) if self._matrix is not None else 0.0
+        }
+
+    def health_check(self) -> Dict[str, bool]:
+        """健康检查（本地存储没有数据库，database 表示向量已加载）"""
+        return {
+            "database": self.loaded,
+            "embedding_service": self.embedder.health_check(),
+            "table_exists": self.size > 0
+        }
+
+
+def export_from_database(pg_store: PgVectorStore, local_store: NumpyVectorStore, fetch_size: int = 2000) -> int:
+    """
+    把数据库中已入库的文档块和向量导出到本地存储（不重新向量化）
+
+    Returns:
+        导出的文档块数量
+    """
+    exported = 0
+    # 命名游标只能在事务内使用，连接本身是 autocommit 模式
+    with pg_store._transaction(cursor_name="export_vectors") as cursor:
+        cursor.itersize = fetch_size
+        cursor.execute(f"""
+        SELECT chunk_id, document_id, content, metadata, embedding_model, created_at, vector::text
+        FROM {pg_store.config.table_name}
+        WHERE vector IS NOT NULL
+        ORDER BY id
+        """)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            local_store.store_chunks([
+                DocumentChunk(
+                    content=row[2],
+                    metadata=row[3] or {},
+                    chunk_id=row[0],
+                    document_id=row[1],
+                    vector=json.loads(row[6]),
+                    embedding_model=row[4],
+                    created_at=row[5]
+                )
+                for row in rows
+            ])
+            exported += len(rows)
+
+    local_store.save()
+    return exported
+
+
+if __name__ == "__main__":
+    from local_store_cli import make_parser, load_store_config, build_from_directory, print_statistics
+
+    parser = make_parser('本地向量存储工具', {
+        'build': '从文档目录入库', 'export': '从数据库导出', 'index': '构建本地 IVF 索引', 'stats': '查看统计'
+    }, path_help='本地向量目录，默认使用配置中的 local_store_path')
+    parser.add_argument('--dtype', choices=LOCAL_DTYPES, help='向量类型，float16 体积减半')
+    parser.add_argument('--lists', type=int, help='IVF 聚类数（index），默认 4*sqrt(行数)')
+    parser.add_argument('--database-url', type=str, default=os.getenv("DATABASE_URL"),
+                        help='数据库连接（export），默认使用配置中的 database_url')
+    args = parser.parse_args()
+
+    config = load_store_config(local_store_path=args.path, local_dtype=args.dtype, database_url=args.database_url)
+    store = NumpyVectorStore(config)
+    store.connect()
+
+    if args.action == 'build':
+        build_from_directory(store, args)
+        store.save()
+    elif args.action == 'export':
+        pg_store = PgVectorStore(config)
+        pg_store.connect()
+        try:
+            count = export_from_database(pg_store, store)
+        finally:
+            pg_store.disconnect()
+        print(f"✓ 已导出 {count} 个文档块到 {store.path}")
+    elif args.action == 'index':
+        index = store.build_index(args.lists)
+        store.save()
+        print(f"✓ 已构建本地 IVF 索引: {index.n_lists} 个聚类, {index.indexed_rows} 行")
+
+    print_statistics(store)
@@ -0,0 +1,191 @@
+"""
+PostgreSQL 连接池模块
+按数据库地址共享的线程安全连接池：取出连接时检查健康状态，失效的连接自动丢弃并重新建立，
+连接用尽时等待归还而不是报错，交互和服务场景不再为每次操作付出 TCP 和认证开销
+"""
+
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any
+
+import psycopg2
+from psycopg2 import pool as psycopg2_pool
+
+from vector_backend import ConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class PgConnectionPool:
+    """带健康检查和自动重连的 PostgreSQL 连接池"""
+
+    def __init__(self, database_url: str, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, check_interval: float = 30.0):
+        """
+        Args:
+            database_url: 数据库连接地址
+            min_size: 保持打开的最少连接数
+            max_size: 最多连接数
+            timeout: 连接全部被占用时等待归还的最长时间（秒）
+            check_interval: 空闲超过该时间（秒）的连接在取出时先执行 SELECT 1 检查
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"连接池大小无效: min_size={min_size}, max_size={max_size}")
+
+        self.database_url = database_url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+
+        self._pool = psycopg2_pool.ThreadedConnectionPool(min_size, max_size, database_url)
+        # ThreadedConnectionPool 用尽时直接报错，用信号量让调用方排队等待
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+
+        self.checkouts = 0
+        self.reconnects = 0
+
+    def _healthy(self, connection) -> bool:
+        """检查连接是否可用，近期使用过的连接只检查是否已关闭"""
+        if connection.closed:
+            return False
+        last_used = self._last_used.get(id(connection))
+        if last_used is not None and time.monotonic() - last_used < self.check_interval:
+            return True
+        try:
+            connection.autocommit = True
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """
+        取出一个健康的连接（autocommit 模式），用完必须调用 putconn 归还
+
+        Raises:
+            ConnectionError: 等待超时或无法建立连接
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ConnectionError(f"等待数据库连接超时（{self.timeout}s，连接池上限 {self.max_size}）")
+
+        try:
+            # 最多把池中现有的连接都检查一遍，再新建一个
+            for _ in range(self.max_size + 1):
+                with self._lock:
+                    connection = self._pool.getconn()
+                if self._healthy(connection):
+                    connection.autocommit = True
+                    self.checkouts += 1
+                    return connection
+                logger.warning("数据库连接已失效，重新建立连接")
+                self.reconnects += 1
+                self._discard(connection)
+            raise ConnectionError("无法建立健康的数据库连接")
+        except psycopg2.Error as e:
+            self._slots.release()
+            raise ConnectionError(f"数据库连接失败: {e}")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection, close: bool = False):
+        """
+        归还连接
+
+        Args:
+            connection: getconn 取出的连接
+            close: 是否关闭而不是放回池中（连接已损坏时使用）
+        """
+        try:
+            if close or connection.closed:
+                self._discard(connection)
+            else:
+                self._last_used[id(connection)] = time.monotonic()
+                with self._lock:
+                    # 未结束的事务由 psycopg2 回滚
+                    self._pool.putconn(connection)
+        finally:
+            self._slots.release()
+
+    def _discard(self, connection):
+        """关闭连接并从池中移除"""
+        self._last_used.pop(id(connection), None)
+        with self._lock:
+            self._pool.putconn(connection, close=True)
+
+    @contextmanager
+    def connection(self):
+        """取出连接，退出时归还；连接出现错误时关闭而不放回"""
+        connection = self.getconn()
+        broken = False
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(connection, close=broken or connection.closed)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池状态"""
+        with self._lock:
+            idle = len(self._pool._pool)
+            in_use = len(self._pool._used)
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "idle": idle,
+            "in_use": in_use,
+            "checkouts": self.checkouts,
+            "reconnects": self.reconnects
+        }
+
+    def close(self):
+        """关闭全部连接"""
+        with self._lock:
+            if not self._pool.closed:
+                self._pool.closeall()
+
+
+_pools: Dict[str, PgConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_url: str, min_size: int = 1, max_size: int = 10,
+             timeout: float = 30.0, check_interval: float = 30.0) -> PgConnectionPool:
+    """
+    获取某个数据库地址的共享连接池，第一次调用时创建（之后的大小参数被忽略）
+
+    Raises:
+        ConnectionError: 无法建立初始连接
+    """
+    with _pools_lock:
+        existing = _pools.get(database_url)
+        if existing is not None and not existing._pool.closed:
+            return existing
+        try:
+            created = PgConnectionPool(database_url, min_size, max_size, timeout, check_interval)
+        except psycopg2.Error as e:
+            raise ConnectionError(f"数据库连接失败: {e}")
+        _pools[database_url] = created
+        logger.info(f"已创建数据库连接池: {min_size}-{max_size} 个连接")
+        return created
+
+
+def close_pools():
+    """关闭全部共享连接池"""
+    with _pools_lock:
+        for created in _pools.values():
+            created.close()
+        _pools.clear()
+
+
+atexit.register(close_pools)
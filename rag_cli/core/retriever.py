@@ -10,7 +10,7 @@ from datetime import datetime
 
 from rag_cli.models.config import RetrieverConfig
 from rag_cli.models.results import SearchResult, SearchStats
-from vector_store import PgVectorStore, DocumentChunk
+from vector_backend import VectorStoreBackend, DocumentChunk, SearchParams, create_vector_store
 
 
 class RAGRetriever:
@@ -18,7 +18,8 @@ class RAGRetriever:
 
     def __init__(self, config: RetrieverConfig):
         self.config = config
-        self.vector_store = PgVectorStore(config.vector_store_config)
+        # 按配置选择后端（pgvector/numpy/sqlite），检索器只依赖 VectorStoreBackend 接口
+        self.vector_store: VectorStoreBackend = create_vector_store(config.vector_store_config)
         self.logger = logging.getLogger(__name__)
 
     def connect(self) -> bool:
@@ -51,26 +52,8 @@ class RAGRetriever:
 
         try:
             # 使用向量存储进行相似度搜索
-            vector_chunks = self.vector_store.search_similar(query, top_k)
-
-            # 转换为SearchResult对象
-            results = []
-            for chunk in vector_chunks:
-                # 从元数据中提取相似度分数
-                similarity_score = chunk.metadata.get("similarity", 0.0)
-
-                # 创建SearchResult对象
-                result = SearchResult(
-                    chunk_id=chunk.chunk_id,
-                    document_id=chunk.document_id,
-                    content=chunk.content,
-                    metadata=chunk.metadata,
-                    similarity_score=similarity_score,
-                    embedding_model=chunk.embedding_model,
-                    created_at=chunk.created_at,
-                    keywords=chunk.metadata.get("keywords", [])
-                )
-                results.append(result)
+            vector_chunks = self.vector_store.search_similar(query, top_k, params=self.search_params())
+            results = self._to_results(vector_chunks)
 
             search_time = time.time() - start_time
             self.logger.info(f"向量检索完成: 查询='{query}', 结果数={len(results)}, 耗时={search_time:.3f}s")
@@ -81,6 +64,97 @@ class RAGRetriever:
             self.logger.error(f"向量检索失败: {e}")
             raise
 
+    async def asearch(self, query: str, top_k: Optional[int] = None) -> List[SearchResult]:
+        """
+        异步向量检索，参数和结果同 search
+
+        pgvector 后端在安装了 asyncpg 和 aiohttp 时使用原生异步驱动，其他情况在线程池中执行同步检索；
+        同一事件循环中可以用 asyncio.gather 并发执行多个查询。
+        """
+        start_time = time.time()
+
+        if top_k is None:
+            top_k = self.config.search_config.default_top_k
+
+        try:
+            vector_chunks = await self.vector_store.asearch_similar(query, top_k, params=self.search_params())
+            results = self._to_results(vector_chunks)
+
+            search_time = time.time() - start_time
+            self.logger.info(f"异步向量检索完成: 查询='{query}', 结果数={len(results)}, 耗时={search_time:.3f}s")
+
+            return results
+
+        except Exception as e:
+            self.logger.error(f"异步向量检索失败: {e}")
+            raise
+
+    async def aclose(self):
+        """释放异步检索的连接池和HTTP会话（在创建它们的事件循环中调用）"""
+        await self.vector_store.aclose()
+
+    def _to_results(self, vector_chunks: List[DocumentChunk]) -> List[SearchResult]:
+        """把文档块转换为检索结果，并按相似度阈值过滤"""
+        # 余弦/内积度量的分数是有界的相似度，相似度阈值才有意义
+        threshold = None
+        if self.config.vector_store_config.distance_metric in ("cosine", "ip"):
+            threshold = self.config.search_config.similarity_threshold
+
+        results = []
+        for chunk in vector_chunks:
+            # 从元数据中提取相似度分数
+            similarity_score = chunk.metadata.get("similarity", 0.0)
+            if threshold is not None and similarity_score < threshold:
+                continue
+
+            results.append(SearchResult(
+                chunk_id=chunk.chunk_id,
+                document_id=chunk.document_id,
+                content=chunk.content,
+                metadata=chunk.metadata,
+                similarity_score=similarity_score,
+                embedding_model=chunk.embedding_model,
+                created_at=chunk.created_at,
+                keywords=chunk.metadata.get("keywords", [])
+            ))
+        return results
+
+    def search_params(self) -> SearchParams:
+        """根据检索配置生成近似搜索参数（ef_search 低于 top_k 时会在查询时自动提高）"""
+        search_config = self.config.search_config
+        return SearchParams(
+            ef_search=search_config.ef_search,
+            probes=search_config.probes,
+            iterative_scan=search_config.iterative_scan,
+            lazy_content=search_config.lazy_content
+        )
+
+    def hydrate(self, results: List[SearchResult]) -> List[SearchResult]:
+        """
+        补全 lazy_content 检索结果的内容：一次按 chunk_id 批量读取尚未加载内容的结果
+
+        Args:
+            results: 检索结果，原地填充 content
+
+        Returns:
+            同一个结果列表
+        """
+        missing = [result for result in results if result.content is None]
+        if not missing:
+            return results
+
+        chunks = self.vector_store.fetch_chunks([result.chunk_id for result in missing])
+        for result in missing:
+            chunk = chunks.get(result.chunk_id)
+            if chunk is None:
+                # 检索之后文档块被删除或重建
+                self.logger.warning(f"文档块已不存在: {result.chunk_id}")
+                result.content = ""
+            else:
+                result.content = chunk.content
+        self.logger.info(f"补全检索结果内容: {len(missing)} 个文档块")
+        return results
+
     def get_search_stats(self, query: str, results: List[SearchResult],
                         search_time: float, reranker_time: Optional[float] = None) -> SearchStats:
         """
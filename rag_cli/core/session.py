@@ -12,6 +12,16 @@ from rag_cli.models.results import SearchResult, RerankedResult, QueryHistory, S
 from rag_cli.core.retriever import RAGRetriever
 from rag_cli.core.reranker import Reranker
 from rag_cli.core.display import ResultDisplay
+from vector_store import SearchParams
+
+# 交互模式 set 命令可修改的检索参数: 名称 -> (SearchConfig 字段, 类型)
+SEARCH_OPTIONS = {
+    "top_k": ("default_top_k", int),
+    "threshold": ("similarity_threshold", float),
+    "ef_search": ("ef_search", int),
+    "probes": ("probes", int),
+    "iterative_scan": ("iterative_scan", str),
+}
 
 
 class InteractiveSession:
@@ -73,6 +83,48 @@ class InteractiveSession:
             self.display.console.print(f"[red]❌ 查询处理失败: {e}[/red]")
             return False
 
+    def set_search_option(self, name: str, value: str) -> bool:
+        """
+        修改检索参数，下一次查询生效
+
+        Args:
+            name: 参数名，见 SEARCH_OPTIONS
+            value: 参数值，ef_search/probes/iterative_scan 可用 default 恢复默认
+        """
+        if name not in SEARCH_OPTIONS:
+            self.display.console.print(f"[red]❌ 未知参数: {name}，可选 {', '.join(SEARCH_OPTIONS)}[/red]")
+            return False
+
+        field_name, value_type = SEARCH_OPTIONS[name]
+        nullable = name in ("ef_search", "probes", "iterative_scan")
+        try:
+            parsed = None if nullable and value.lower() in ("default", "none") else value_type(value)
+            if name == "top_k" and parsed <= 0:
+                raise ValueError("top_k 必须是正整数")
+        except ValueError as e:
+            self.display.console.print(f"[red]❌ 无效的参数值 {name}={value}: {e}[/red]")
+            return False
+
+        search = self.config.search
+        previous = getattr(search, field_name)
+        setattr(search, field_name, parsed)
+        try:
+            # 校验 ANN 参数组合
+            SearchParams(ef_search=search.ef_search, probes=search.probes, iterative_scan=search.iterative_scan)
+        except ValueError as e:
+            setattr(search, field_name, previous)
+            self.display.console.print(f"[red]❌ {e}[/red]")
+            return False
+
+        self.display.console.print(f"[green]✓ {name} = {parsed if parsed is not None else 'default'}[/green]")
+        return True
+
+    def show_search_options(self):
+        """显示当前检索参数"""
+        for name, (field_name, _) in SEARCH_OPTIONS.items():
+            value = getattr(self.config.search, field_name)
+            self.display.console.print(f"  [cyan]{name}[/cyan] = {value if value is not None else 'default'}")
+
     def show_history(self):
         """显示查询历史"""
         if not self.history:
@@ -97,6 +149,20 @@ class InteractiveSession:
 
         self.display.console.print(table)
 
+    def show_detail(self, index: int):
+        """显示当前结果中第 index 个（从0开始）文档的详情，未加载的内容在此时读取"""
+        if not self.current_results:
+            self.display.console.print("[yellow]⚠️  请先执行搜索以获取结果[/yellow]")
+            return
+
+        if 0 <= index < len(self.current_results):
+            try:
+                self.retriever.hydrate([self.current_results[index]])
+            except Exception as e:
+                self.display.console.print(f"[red]❌ 读取文档内容失败: {e}[/red]")
+                return
+        self.display.show_document_detail_by_index(index, self.current_results)
+
     def clear_history(self):
         """清空查询历史"""
         self.history.clear()
@@ -109,6 +175,8 @@ class InteractiveSession:
             return
 
         try:
+            # lazy_content 检索只取回了分数，导出前一次补全全部结果的内容
+            self.retriever.hydrate(self.current_results)
             if format == "json":
                 self._export_json()
             elif format == "markdown":
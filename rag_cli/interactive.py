@@ -157,10 +157,7 @@ class InteractiveCLI:
         try:
             # 尝试解析为序号
             index = int(args) - 1
-            if self.session.current_results:
-                self.session.display.show_document_detail_by_index(index, self.session.current_results)
-            else:
-                self.console.print("[yellow]⚠️  请先执行搜索以获取结果[/yellow]")
+            self.session.show_detail(index)
         except (ValueError, IndexError):
             # 当作文档ID处理
             self.console.print("[yellow]⚠️  文档ID功能暂未实现，请使用序号[/yellow]")
@@ -189,21 +186,17 @@ class InteractiveCLI:
         self.console.print(table)
 
     def _handle_set(self, args: str):
-        """处理设置命令"""
-        if not args:
-            self.console.print("[yellow]⚠️  使用方法: set <key> <value>[/yellow]")
+        """处理设置命令：不带参数时显示当前检索参数，否则修改参数并在下一次查询生效"""
+        parts = args.split()
+        if not parts:
+            self.session.show_search_options()
             return
 
-        parts = args.split(maxsplit=1)
-        if len(parts) < 2:
-            self.console.print("[yellow]⚠️  使用方法: set <key> <value>[/yellow]")
+        if len(parts) != 2:
+            self.console.print("[yellow]⚠️  使用方法: set <参数> <值>，如 set ef_search 200[/yellow]")
             return
 
-        key = parts[0]
-        value = parts[1]
-
-        # 这里可以实现配置的动态修改
-        self.console.print(f"[yellow]⚠️  配置修改功能暂未实现[/yellow]")
+        self.session.set_search_option(parts[0].lower(), parts[1])
 
     def _handle_export(self, args: str):
         """处理导出命令"""
@@ -228,7 +221,7 @@ class InteractiveCLI:
   [cyan]history[/cyan]             - 显示查询历史
   [cyan]detail <id/序号>[/cyan]    - 查看文档详情
   [cyan]config[/cyan]              - 显示当前配置
-  [cyan]set <key> <value>[/cyan]   - 修改配置
+  [cyan]set [<key> <value>][/cyan]  - 查看/修改检索参数 (top_k/threshold/ef_search/probes/iterative_scan)
   [cyan]export <format>[/cyan]     - 导出结果 (json/markdown/csv)
   [cyan]clear[/cyan]               - 清空屏幕
   [cyan]help[/cyan]                - 显示帮助
@@ -8,6 +8,7 @@ RAG 检索命令行工具主入口
 
 import sys
 from pathlib import Path
+from typing import List
 
 # 添加项目根目录到Python路径
 sys.path.append(str(Path(__file__).parent.parent))
@@ -60,7 +61,10 @@ def search(
     top_k: int = typer.Option(10, "--top-k", "-k", help="返回结果数量"),
     rerank: bool = typer.Option(False, "--rerank", "-r", help="启用重排序"),
     mode: str = typer.Option("vector", "--mode", "-m", help="检索模式: vector/hybrid"),
-    verbose: bool = typer.Option(False, "--verbose", "-v", help="显示详细信息")
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="显示详细信息"),
+    ef_search: int = typer.Option(None, "--ef-search", help="HNSW 查询候选列表大小，越大召回率越高、越慢"),
+    probes: int = typer.Option(None, "--probes", help="IVFFlat 查询探测的聚类数"),
+    iterative_scan: str = typer.Option(None, "--iterative-scan", help="迭代索引扫描: off/strict_order/relaxed_order（pgvector 0.8+）")
 ):
     """
     执行单次检索
@@ -72,6 +76,8 @@ def search(
     rag-cli search "机器学习算法" --top-k 20 --rerank
 
     rag-cli search "数据库优化" --mode hybrid --verbose
+
+    rag-cli search "提示链" --top-k 100 --ef-search 200 --iterative-scan relaxed_order
     """
     try:
         config = load_config()
@@ -85,6 +91,10 @@ def search(
         # 设置检索参数
         session.config.search.default_top_k = top_k
         session.config.reranker.enabled = rerank
+        options = {"ef_search": ef_search, "probes": probes, "iterative_scan": iterative_scan}
+        for name, value in options.items():
+            if value is not None and not session.set_search_option(name, str(value)):
+                sys.exit(1)
 
         # 执行查询
         success = session.process_query(query)
@@ -157,6 +167,7 @@ def interactive():
   [cyan]history[/cyan]             - 显示查询历史
   [cyan]detail <id/序号>[/cyan]    - 查看文档详情
   [cyan]config[/cyan]              - 显示当前配置
+  [cyan]set [<key> <value>][/cyan]  - 查看/修改检索参数 (top_k/threshold/ef_search/probes/iterative_scan)
   [cyan]export <format>[/cyan]     - 导出结果 (json/markdown/csv)
   [cyan]clear[/cyan]               - 清空屏幕
   [cyan]help[/cyan]                - 显示帮助
@@ -165,6 +176,14 @@ def interactive():
 [bold]快捷方式:[/bold]
   直接输入查询内容即可执行搜索
                     """)
+                elif user_input.lower() == 'set' or user_input.lower().startswith('set '):
+                    parts = user_input.split()
+                    if len(parts) == 1:
+                        session.show_search_options()
+                    elif len(parts) == 3:
+                        session.set_search_option(parts[1].lower(), parts[2])
+                    else:
+                        console.print("[yellow]⚠️  使用方法: set <参数> <值>，如 set ef_search 200[/yellow]")
                 elif user_input.lower() == 'history':
                     session.show_history()
                 elif user_input.lower().startswith('detail'):
@@ -172,10 +191,7 @@ def interactive():
                     if len(parts) > 1:
                         try:
                             index = int(parts[1]) - 1
-                            if session.current_results:
-                                session.display.show_document_detail_by_index(index, session.current_results)
-                            else:
-                                console.print("[yellow]⚠️  请先执行搜索以获取结果[/yellow]")
+                            session.show_detail(index)
                         except (ValueError, IndexError):
                             console.print("[yellow]⚠️  请提供有效的文档序号[/yellow]")
                     else:
@@ -249,6 +265,124 @@ def config():
         sys.exit(1)
 
 
+@app.command()
+def index(
+    action: str = typer.Argument("status", help="操作: status/build/rebuild/drop"),
+    concurrently: bool = typer.Option(True, "--concurrently/--no-concurrently", help="使用 CONCURRENTLY，构建期间不阻塞读写"),
+    lists: int = typer.Option(None, "--lists", help="IVFFlat 聚类数，默认按行数推导"),
+    m: int = typer.Option(None, "--m", help="HNSW 每个节点的连接数"),
+    ef_construction: int = typer.Option(None, "--ef-construction", help="HNSW 构建时的候选列表大小"),
+    work_mem: str = typer.Option(None, "--work-mem", help="构建使用的 maintenance_work_mem，如 2GB"),
+    workers: int = typer.Option(None, "--workers", help="并行构建的 worker 数"),
+):
+    """管理向量索引：查看状态、构建、重建或删除"""
+    if action not in ("status", "build", "rebuild", "drop"):
+        console.print(f"[red]❌ 未知操作: {action}，可选 status/build/rebuild/drop[/red]")
+        sys.exit(1)
+
+    try:
+        from dataclasses import replace
+        from vector_store import PgVectorStore
+        from vector_index import VectorIndexManager, print_index_status
+
+        config = load_config()
+        overrides = {
+            "ivfflat_lists": lists,
+            "hnsw_m": m,
+            "hnsw_ef_construction": ef_construction,
+            "maintenance_work_mem": work_mem,
+            "index_build_workers": workers,
+        }
+        store_config = replace(
+            config.retriever_config.vector_store_config,
+            **{key: value for key, value in overrides.items() if value is not None}
+        )
+
+        store = PgVectorStore(store_config)
+        store.connect()
+        try:
+            manager = VectorIndexManager(store)
+
+            if action == "drop":
+                dropped = manager.drop(concurrently=concurrently)
+                console.print(f"[green]✓ 已删除: {', '.join(dropped)}[/green]" if dropped else "[yellow]没有需要删除的向量索引[/yellow]")
+            elif action in ("build", "rebuild"):
+                def report(progress):
+                    percent = f" {progress.percent:.0f}%" if progress.percent is not None else ""
+                    console.print(f"  [dim]{progress.index_name}: {progress.phase}{percent}[/dim]")
+
+                results = manager.build(rebuild=action == "rebuild", concurrently=concurrently, on_progress=report)
+                for result in results:
+                    if result["status"] == "exists":
+                        console.print(f"[yellow]{result['name']} 已存在，跳过（使用 rebuild 重建）[/yellow]")
+                    else:
+                        console.print(f"[green]✓ {result['name']} {result['status']}: "
+                                      f"{result['rows']} 行, 耗时 {result['time']:.1f}s[/green]")
+
+            print_index_status(manager.status())
+        finally:
+            store.disconnect()
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]已取消索引构建[/yellow]")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]❌ 索引操作失败: {e}[/red]")
+        sys.exit(1)
+
+
+@app.command()
+def benchmark(
+    queries_file: Path = typer.Option(None, "--queries", "-q", help="查询文件，每行一个查询；不指定时从表中抽取文档块作为伪查询"),
+    sample: int = typer.Option(100, "--sample", "-n", help="抽取的伪查询数量"),
+    top_k: int = typer.Option(10, "--top-k", "-k", help="recall@k 的 k"),
+    ef_search: List[int] = typer.Option([], "--ef-search", help="待测的 HNSW ef_search，可重复指定"),
+    probes: List[int] = typer.Option([], "--probes", help="待测的 IVFFlat probes，可重复指定"),
+    iterative_scan: str = typer.Option(None, "--iterative-scan", help="迭代索引扫描: off/strict_order/relaxed_order"),
+    output: Path = typer.Option(None, "--output", "-o", help="JSON 结果输出文件"),
+):
+    """
+    对比向量索引与精确搜索的召回率和延迟
+
+    Examples:
+
+    rag-cli benchmark --ef-search 40 --ef-search 100 --ef-search 200
+
+    rag-cli benchmark --queries queries.txt --probes 1 --probes 10 -o bench.json
+    """
+    try:
+        from vector_store import PgVectorStore
+        from ann_benchmark import (sample_queries, benchmark_settings, run_benchmark,
+                                   print_benchmark_report, save_benchmark_report)
+
+        config = load_config()
+        store = PgVectorStore(config.retriever_config.vector_store_config)
+        store.connect()
+        try:
+            if queries_file:
+                queries = [line.strip() for line in queries_file.read_text(encoding='utf-8').splitlines() if line.strip()]
+            else:
+                queries = sample_queries(store, sample)
+            if not queries:
+                console.print("[yellow]⚠️  没有可用的查询[/yellow]")
+                sys.exit(1)
+
+            settings = benchmark_settings(ef_search, probes, iterative_scan)
+            console.print(f"[dim]{len(queries)} 个查询, {len(settings)} 组参数[/dim]")
+            report = run_benchmark(store, queries, top_k, settings)
+        finally:
+            store.disconnect()
+
+        print_benchmark_report(report)
+        if output:
+            save_benchmark_report(report, str(output))
+            console.print(f"[green]✓ 结果已保存到: {output}[/green]")
+
+    except Exception as e:
+        console.print(f"[red]❌ 基准测试失败: {e}[/red]")
+        sys.exit(1)
+
+
 @app.command()
 def version():
     """显示版本信息"""
@@ -3,7 +3,7 @@
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 @dataclass
@@ -16,6 +16,39 @@ class VectorStoreConfig:
     vector_dimension: int = 2560
     batch_size: int = 100
     timeout: int = 30
+    embedding_concurrency: int = 4
+    use_batch_endpoint: bool = False
+    embedding_cache_path: Optional[str] = None
+    embedding_cache_max_mb: int = 1024
+    bulk_write: bool = True
+    write_batch_size: int = 1000
+    copy_format: str = "binary"
+    vector_storage: str = "vector"
+    binary_quantization: bool = False
+    binary_oversample: int = 4
+    distance_metric: str = "l2"
+    reduction_method: str = "none"
+    reduced_dimension: Optional[int] = None
+    pca_sample_size: int = 5000
+    index_method: str = "auto"
+    ivfflat_lists: Optional[int] = None
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    maintenance_work_mem: str = "1GB"
+    index_build_workers: int = 2
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_timeout: float = 30.0
+    pool_check_interval: float = 30.0
+    prepare_statements: bool = True
+    force_vector_update: bool = False
+    backend: str = "pgvector"
+    local_store_path: str = "~/.rag_cli/vectors"
+    local_dtype: str = "float32"
+    local_index: str = "flat"
+    local_ivf_lists: Optional[int] = None
+    local_ivf_probes: int = 8
+    sqlite_path: str = "~/.rag_cli/vectors.db"
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'VectorStoreConfig':
@@ -58,6 +91,10 @@ class SearchConfig:
     default_top_k: int = 10
     similarity_threshold: float = 0.5
     enable_filters: bool = True
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    iterative_scan: Optional[str] = None
+    lazy_content: bool = False
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'SearchConfig':
@@ -108,7 +145,8 @@ class SessionConfig:
         retriever_config = RetrieverConfig.from_dict(data)
         reranker = RerankerConfig.from_dict(data.get('reranker', {}))
         display = DisplayConfig.from_dict(data.get('display', {}))
-        search = SearchConfig.from_dict(data.get('search', {}))
+        # 与检索器共用同一个检索配置，会话中修改的参数对下一次检索立即生效
+        search = retriever_config.search_config
         interactive = InteractiveConfig.from_dict(data.get('interactive', {}))
 
         return cls(
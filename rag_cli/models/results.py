@@ -12,7 +12,8 @@ class SearchResult:
     """检索结果"""
     chunk_id: str
     document_id: str
-    content: str
+    # lazy_content 检索时为 None，由 RAGRetriever.hydrate 按需补全
+    content: Optional[str]
     metadata: Dict[str, Any]
     similarity_score: float
     embedding_model: Optional[str] = None
@@ -9,16 +9,27 @@ from typing import Dict, Any, Optional
 class DatabaseManager:
     """数据库管理器"""
 
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, min_size: int = 1, max_size: int = 10):
+        """
+        Args:
+            database_url: 数据库连接地址
+            min_size / max_size: 共享连接池的大小（与同一地址的 PgVectorStore 共用连接池，先创建者生效）
+        """
         self.database_url = database_url
+        self.min_size = min_size
+        self.max_size = max_size
         self.logger = logging.getLogger(__name__)
 
+    def _pool(self):
+        """同一数据库地址的共享连接池"""
+        from pg_pool import get_pool
+        return get_pool(self.database_url, self.min_size, self.max_size)
+
     def test_connection(self) -> bool:
         """测试数据库连接"""
         try:
-            import psycopg2
-            conn = psycopg2.connect(self.database_url)
-            conn.close()
+            with self._pool().connection():
+                pass
             self.logger.info("数据库连接测试成功")
             return True
         except Exception as e:
@@ -28,28 +39,26 @@ class DatabaseManager:
     def get_database_info(self) -> Dict[str, Any]:
         """获取数据库信息"""
         try:
-            import psycopg2
-            conn = psycopg2.connect(self.database_url)
-            cursor = conn.cursor()
+            with self._pool().connection() as conn:
+                cursor = conn.cursor()
 
-            # 获取数据库版本
-            cursor.execute("SELECT version()")
-            version = cursor.fetchone()[0]
+                # 获取数据库版本
+                cursor.execute("SELECT version()")
+                version = cursor.fetchone()[0]
 
-            # 获取数据库名称
-            cursor.execute("SELECT current_database()")
-            db_name = cursor.fetchone()[0]
+                # 获取数据库名称
+                cursor.execute("SELECT current_database()")
+                db_name = cursor.fetchone()[0]
 
-            # 获取表数量
-            cursor.execute("""
-                SELECT COUNT(*)
-                FROM information_schema.tables
-                WHERE table_schema = 'public'
-            """)
-            table_count = cursor.fetchone()[0]
+                # 获取表数量
+                cursor.execute("""
+                    SELECT COUNT(*)
+                    FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                """)
+                table_count = cursor.fetchone()[0]
 
-            cursor.close()
-            conn.close()
+                cursor.close()
 
             return {
                 "version": version,
@@ -64,24 +73,22 @@ class DatabaseManager:
     def check_table_exists(self, table_name: str) -> bool:
         """检查表是否存在"""
         try:
-            import psycopg2
-            conn = psycopg2.connect(self.database_url)
-            cursor = conn.cursor()
+            with self._pool().connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_schema = 'public'
-                    AND table_name = %s
-                )
-            """, (table_name,))
+                cursor.execute("""
+                    SELECT EXISTS (
+                        SELECT FROM information_schema.tables
+                        WHERE table_schema = 'public'
+                        AND table_name = %s
+                    )
+                """, (table_name,))
 
-            exists = cursor.fetchone()[0]
-            cursor.close()
-            conn.close()
+                exists = cursor.fetchone()[0]
+                cursor.close()
 
             return exists
 
         except Exception as e:
             self.logger.error(f"检查表存在性失败: {e}")
-            return False
\ No newline at end of file
+            return False
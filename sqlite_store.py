@@ -0,0 +1,416 @@
+"""
+SQLite 向量存储模块
+单文件嵌入式存储：文档块和 float16 向量 BLOB 保存在 WAL 模式的 SQLite 中，写入在单个事务内批量完成；
+检索时把向量加载为缓存的 NumPy 矩阵精确计算 top_k，其他连接提交写入后自动重新加载
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+
+import numpy as np
+
+from numpy_store import LOCAL_DTYPES, row_norms, similarity_scores, top_k_indices
+from vector_backend import VectorStoreBackend, DocumentChunk, SearchParams, DatabaseError, ConnectionError
+from vector_store import VectorStoreConfig, DISTANCE_OPERATORS
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句的参数数量上限较低，批量操作时分段处理
+_SQL_BATCH = 500
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """将向量编码为小端 float16 BLOB"""
+    return np.asarray(vector, dtype='<f2').tobytes()
+
+
+class SqliteVectorStore(VectorStoreBackend):
+    """基于 SQLite 的嵌入式向量存储"""
+
+    def __init__(self, config: VectorStoreConfig, embedder=None):
+        """
+        Args:
+            config: 向量存储配置，使用 sqlite_path、table_name、local_dtype、distance_metric 和向量化相关字段
+            embedder: 向量化客户端，默认按配置创建 EmbeddingClient
+        """
+        if config.local_dtype not in LOCAL_DTYPES:
+            raise ValueError(f"不支持的本地向量类型: {config.local_dtype}")
+        if config.distance_metric not in DISTANCE_OPERATORS:
+            raise ValueError(f"不支持的距离度量: {config.distance_metric}")
+        if config.reduction_method == "pca":
+            raise ValueError("SQLite 向量存储不支持 pca 降维（投影保存在 PostgreSQL 中），可使用 truncate")
+
+        super().__init__(config, embedder)
+        self.path = os.path.expanduser(config.sqlite_path)
+        self.table_name = config.table_name
+        self.dtype = np.dtype(config.local_dtype)
+        self.connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+        # 缓存的向量矩阵，行号对应 _row_ids 中的表主键
+        self._matrix: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._row_ids: Optional[np.ndarray] = None
+        # 加载矩阵时的 PRAGMA data_version，其他连接提交后会变化
+        self._data_version: Optional[int] = None
+
+    def connect(self) -> bool:
+        """打开 SQLite 文件（WAL 模式）并创建表"""
+        if self.connection:
+            return True
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.create_table()
+            logger.info(f"SQLite 向量存储已打开: {self.path}")
+            return True
+        except sqlite3.Error as e:
+            self.connection = None
+            logger.error(f"打开 SQLite 向量存储失败: {e}")
+            raise ConnectionError(f"打开 SQLite 向量存储失败: {e}")
+
+    def disconnect(self):
+        """关闭 SQLite 连接"""
+        with self._lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+            self._invalidate()
+
+    def _conn(self) -> sqlite3.Connection:
+        if not self.connection:
+            raise ConnectionError("SQLite 向量存储未打开")
+        return self.connection
+
+    def create_table(self, force_recreate: bool = False) -> bool:
+        """
+        创建文档块表
+
+        Args:
+            force_recreate: 是否删除并重建表
+        """
+        with self._lock:
+            connection = self._conn()
+            try:
+                with connection:
+                    if force_recreate:
+                        connection.execute(f"DROP TABLE IF EXISTS {self.table_name}")
+                        logger.info(f"删除现有表: {self.table_name}")
+                    connection.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {self.table_name} (
+                        id INTEGER PRIMARY KEY,
+                        chunk_id TEXT UNIQUE NOT NULL,
+                        document_id TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        metadata TEXT,
+                        vector BLOB,
+                        embedding_model TEXT,
+                        created_at TEXT
+                    )
+                    """)
+                    connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_document_id "
+                                       f"ON {self.table_name} (document_id)")
+                self._invalidate()
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"创建表失败: {e}")
+                raise DatabaseError(f"创建表失败: {e}")
+
+    # ---- 写入 ----
+
+    def store_chunks(self, chunks: List[DocumentChunk]) -> bool:
+        """在一个事务内按 chunk_id 批量插入或更新已向量化的文档块"""
+        rows = [
+            (
+                chunk.chunk_id,
+                chunk.document_id,
+                chunk.content,
+                json.dumps(chunk.metadata, ensure_ascii=False),
+                pack_vector(chunk.vector),
+                chunk.embedding_model or self.config.embedding_model,
+                (chunk.created_at or datetime.now()).isoformat()
+            )
+            for chunk in chunks if chunk.vector is not None
+        ]
+        if not rows:
+            return True
+
+        with self._lock:
+            connection = self._conn()
+            try:
+                with connection:
+                    connection.executemany(f"""
+                    INSERT INTO {self.table_name}
+                        (chunk_id, document_id, content, metadata, vector, embedding_model, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (chunk_id) DO UPDATE SET
+                        document_id = excluded.document_id,
+                        content = excluded.content,
+                        metadata = excluded.metadata,
+                        vector = excluded.vector,
+                        embedding_model = excluded.embedding_model
+                    """, rows)
+                self._invalidate()
+                logger.info(f"批量存储完成: {len(rows)} 个文档块")
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"批量存储文档块失败: {e}")
+                raise DatabaseError(f"批量存储文档块失败: {e}")
+
+    def get_chunk_ids(self, document_id: str) -> List[str]:
+        """获取某个文档当前已存储的全部文档块ID"""
+        with self._lock:
+            rows = self._conn().execute(
+                f"SELECT chunk_id FROM {self.table_name} WHERE document_id = ?", (document_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """按 chunk_id 删除文档块"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return 0
+
+        with self._lock:
+            connection = self._conn()
+            try:
+                deleted = 0
+                with connection:
+                    for start in range(0, len(chunk_ids), _SQL_BATCH):
+                        batch = chunk_ids[start:start + _SQL_BATCH]
+                        deleted += connection.execute(
+                            f"DELETE FROM {self.table_name} WHERE chunk_id IN ({','.join('?' * len(batch))})",
+                            batch
+                        ).rowcount
+                if deleted:
+                    self._invalidate()
+                    logger.info(f"删除文档块: {deleted} 行")
+                return deleted
+            except sqlite3.Error as e:
+                logger.error(f"删除文档块失败: {e}")
+                raise DatabaseError(f"删除文档块失败: {e}")
+
+    def delete_stale_chunks(self, document_id: str, keep_chunk_ids: List[str]) -> int:
+        """删除某个文档中不在保留列表里的文档块"""
+        keep = set(keep_chunk_ids)
+        with self._lock:
+            deleted = self.delete_chunks([chunk_id for chunk_id in self.get_chunk_ids(document_id)
+                                          if chunk_id not in keep])
+        if deleted:
+            logger.info(f"清理文档 {document_id} 的过期文档块: {deleted} 行")
+        return deleted
+
+    def delete_document(self, document_id: str) -> int:
+        """删除某个文档的全部文档块"""
+        with self._lock:
+            connection = self._conn()
+            try:
+                with connection:
+                    deleted = connection.execute(
+                        f"DELETE FROM {self.table_name} WHERE document_id = ?", (document_id,)
+                    ).rowcount
+                self._invalidate()
+                logger.info(f"删除文档 {document_id}: {deleted} 行")
+                return deleted
+            except sqlite3.Error as e:
+                logger.error(f"删除文档失败: {e}")
+                raise DatabaseError(f"删除文档失败: {e}")
+
+    # ---- 检索 ----
+
+    def _invalidate(self):
+        """丢弃缓存的向量矩阵，下次检索时重新加载"""
+        self._matrix = None
+        self._norms = None
+        self._row_ids = None
+        self._data_version = None
+
+    def _load_matrix(self):
+        """
+        按需加载向量矩阵
+
+        本连接的写入会直接丢弃缓存；其他连接（如另一个进程的入库）提交后 PRAGMA data_version 变化，
+        检索前检查一次即可发现。调用方需持有 _lock。
+        """
+        connection = self._conn()
+        data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+        if self._matrix is not None and data_version == self._data_version:
+            return
+
+        rows = connection.execute(
+            f"SELECT id, vector FROM {self.table_name} WHERE vector IS NOT NULL ORDER BY id"
+        ).fetchall()
+        dimension = len(rows[0][1]) // 2 if rows else 0
+        matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype='<f2').reshape(len(rows), dimension)
+
+        self._row_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        self._matrix = matrix.astype(self.dtype)
+        self._norms = row_norms(self._matrix) if len(rows) else np.zeros(0, dtype=np.float32)
+        self._data_version = data_version
+        logger.info(f"已加载 SQLite 向量矩阵: {len(rows)} 个文档块, {dimension} 维, {self._matrix.dtype}")
+
+    def _fetch_chunks(self, keys: list, key_column: str = "id", content: bool = True) -> Dict[Any, DocumentChunk]:
+        """按主键或 chunk_id 读取文档块（不含向量），content=False 时不读取内容"""
+        chunks = {}
+        connection = self._conn()
+        content_column = "content" if content else "NULL"
+        for start in range(0, len(keys), _SQL_BATCH):
+            batch = keys[start:start + _SQL_BATCH]
+            for row in connection.execute(
+                f"SELECT {key_column}, chunk_id, document_id, {content_column}, metadata, embedding_model, created_at "
+                f"FROM {self.table_name} WHERE {key_column} IN ({','.join('?' * len(batch))})",
+                batch
+            ):
+                chunks[row[0]] = DocumentChunk(
+                    content=row[3],
+                    metadata=json.loads(row[4]) if row[4] else {},
+                    chunk_id=row[1],
+                    document_id=row[2],
+                    embedding_model=row[5],
+                    created_at=datetime.fromisoformat(row[6]) if row[6] else None
+                )
+        return chunks
+
+    def search_batch(self, query_vectors: List[List[float]], top_k: int = 5,
+                     params: Optional[SearchParams] = None) -> List[List[DocumentChunk]]:
+        """
+        批量精确检索：在缓存的矩阵上一次矩阵-矩阵乘积，再按主键读取命中的文档块
+
+        Args:
+            query_vectors: 已预处理的查询向量
+            top_k: 每个查询返回的数量
+            params: 查询参数，只使用 lazy_content（精确检索不使用 ANN 参数）
+        """
+        if not query_vectors:
+            return []
+
+        with self._lock:
+            try:
+                self._load_matrix()
+                if not len(self._row_ids):
+                    return [[] for _ in query_vectors]
+
+                queries = np.asarray(query_vectors, dtype=np.float32)
+                scores = similarity_scores(queries, self._matrix, self._norms, self.config.distance_metric)
+                top_indices = top_k_indices(scores, top_k)
+                hits = [(self._row_ids[indices], scores[row, indices]) for row, indices in enumerate(top_indices)]
+                chunks = self._fetch_chunks(sorted({int(row_id) for row_ids, _ in hits for row_id in row_ids}),
+                                            content=not (params and params.lazy_content))
+            except sqlite3.Error as e:
+                logger.error(f"向量检索失败: {e}")
+                raise DatabaseError(f"向量检索失败: {e}")
+
+        results = []
+        for row_ids, similarities in hits:
+            found = []
+            for row_id, similarity in zip(row_ids, similarities):
+                source = chunks.get(int(row_id))
+                if source is None:
+                    continue
+                found.append(DocumentChunk(
+                    content=source.content,
+                    metadata={**source.metadata, "similarity": float(similarity)},
+                    chunk_id=source.chunk_id,
+                    document_id=source.document_id,
+                    embedding_model=source.embedding_model,
+                    created_at=source.created_at
+                ))
+            results.append(found)
+        return results
+
+    def search_by_vector(self, query_vector: List[float], top_k: int = 5,
+                         mode: Optional[str] = None, params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """按查询向量精确检索（mode 为与 PgVectorStore 兼容保留，始终精确计算）"""
+        return self.search_batch([query_vector], top_k, params)[0]
+
+    def fetch_chunks(self, chunk_ids: List[str]) -> Dict[str, DocumentChunk]:
+        """按 chunk_id 批量读取文档块，用于补全 lazy_content 检索结果的内容"""
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        if not chunk_ids:
+            return {}
+
+        with self._lock:
+            try:
+                return self._fetch_chunks(chunk_ids, key_column="chunk_id")
+            except sqlite3.Error as e:
+                logger.error(f"读取文档块失败: {e}")
+                raise DatabaseError(f"读取文档块失败: {e}")
+
+    # ---- 状态 ----
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        with self._lock:
+            connection = self._conn()
+            try:
+                total_chunks, unique_documents = connection.execute(
+                    f"SELECT COUNT(*), COUNT(DISTINCT document_id) FROM {self.table_name}"
+                ).fetchone()
+                model_distribution = dict(connection.execute(
+                    f"SELECT embedding_model, COUNT(*) FROM {self.table_name} GROUP BY embedding_model"
+                ).fetchall())
+            except sqlite3.Error as e:
+                logger.error(f"获取统计信息失败: {e}")
+                raise DatabaseError(f"获取统计信息失败: {e}")
+            matrix_size = self._matrix.nbytes if self._matrix is not None else 0
+
+        stats = {
+            "total_chunks": total_chunks,
+            "unique_documents": unique_documents,
+            "model_distribution": model_distribution,
+            "backend": "sqlite",
+            "path": self.path,
+            "table_name": self.table_name,
+            "vector_storage": "float16",
+            "file_size_mb": round(os.path.getsize(self.path) / 1024 / 1024, 2) if os.path.exists(self.path) else 0.0,
+            "matrix_size_mb": round(matrix_size / 1024 / 1024, 2)
+        }
+        embedding_cache = getattr(self.embedder, "embedding_cache", None)
+        if embedding_cache:
+            stats["embedding_cache"] = embedding_cache.stats()
+        return stats
+
+    def health_check(self) -> Dict[str, bool]:
+        """健康检查（database 表示 SQLite 文件可读）"""
+        health_status = {
+            "database": False,
+            "embedding_service": self.embedder.health_check(),
+            "table_exists": False
+        }
+        try:
+            with self._lock:
+                connection = self._conn()
+                connection.execute("SELECT 1")
+                health_status["database"] = True
+                health_status["table_exists"] = connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table_name,)
+                ).fetchone() is not None
+        except Exception:
+            pass
+        return health_status
+
+
+if __name__ == "__main__":
+    from local_store_cli import make_parser, load_store_config, build_from_directory, print_statistics
+
+    parser = make_parser('SQLite 向量存储工具', {'build': '从文档目录入库', 'stats': '查看统计'},
+                         path_help='SQLite 文件，默认使用配置中的 sqlite_path')
+    args = parser.parse_args()
+
+    store = SqliteVectorStore(load_store_config(sqlite_path=args.path))
+    store.connect()
+
+    if args.action == 'build':
+        build_from_directory(store, args)
+
+    print_statistics(store)
+    store.disconnect()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似检索基准测试脚本
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ann_benchmark import percentile, benchmark_settings, run_benchmark, print_benchmark_report
+from vector_store import DocumentChunk
+
+
+class _FakeStore:
+    """精确搜索返回 0..k-1，索引搜索在 ef_search 较小时漏掉最后一个结果"""
+
+    def __init__(self):
+        self.config = SimpleNamespace(table_name="document_chunks", binary_quantization=False)
+        self.index_method = "hnsw"
+
+    def embed_batch(self, texts):
+        return [[float(len(text))] for text in texts]
+
+    def search_by_vector(self, query_vector, top_k, mode="index", params=None):
+        ids = list(range(top_k))
+        if mode != "exact" and (params is None or (params.ef_search or 40) < 100):
+            ids[-1] = 999
+        return [DocumentChunk(content="", metadata={}, chunk_id=str(i), document_id="doc") for i in ids]
+
+
+def test_percentile():
+    """测试线性插值分位数"""
+    print("=== 分位数测试 ===")
+
+    assert percentile([], 50) == 0.0
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile(list(range(101)), 95) == 95
+
+    print("✓ 分位数测试通过")
+
+
+def test_run_benchmark():
+    """测试召回率和重合数按参数组合分别统计"""
+    print("=== 基准测试报告测试 ===")
+
+    settings = benchmark_settings(ef_search_values=[40, 200])
+    report = run_benchmark(_FakeStore(), ["查询一", "查询二"], top_k=4, settings=settings)
+    print_benchmark_report(report)
+
+    low, high = report["results"]
+    assert low["ef_search"] == 40 and low["recall"] == 0.75 and low["mean_overlap"] == 3
+    assert high["ef_search"] == 200 and high["recall"] == 1.0
+    assert report["exact"]["mean_overlap"] == 4
+    assert benchmark_settings()[0].ef_search is None
+
+    print("✓ 基准测试报告测试通过")
+
+
+if __name__ == "__main__":
+    test_percentile()
+    test_run_benchmark()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步检索测试脚本（不需要数据库和向量化服务）
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import async_retrieval
+from testing_fakes import FakeEmbedder, make_chunks, make_local_store, make_pg_store
+
+
+class _ThreadRecordingCache:
+    """记录读写发生在哪个线程的向量缓存"""
+
+    def __init__(self, vector):
+        self.vector = vector
+        self.threads = []
+
+    def get(self, text, endpoint=None):
+        self.threads.append(threading.current_thread())
+        return self.vector
+
+    def put(self, text, vector, endpoint=None):
+        self.threads.append(threading.current_thread())
+
+
+class _AsyncContext:
+    """async with 返回给定对象"""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class _FakeAsyncConnection:
+    """模拟 asyncpg 连接：pgvector 类型安装在 extensions 模式中"""
+
+    def __init__(self):
+        self.codecs = []
+        self.executed = []
+        self.fetched = []
+
+    async def fetch(self, sql, *args):
+        if "pg_type" in sql:
+            return [("vector", "extensions")]
+        self.fetched.append((" ".join(sql.split()), args))
+        return [("c1", "doc", "内容", {}, "test", None, 0.9)]
+
+    async def execute(self, sql):
+        self.executed.append(sql)
+
+    async def set_type_codec(self, type_name, **options):
+        self.codecs.append((type_name, options["schema"]))
+
+    def transaction(self):
+        return _AsyncContext()
+
+
+class _FakeAsyncPool:
+    def __init__(self, connection):
+        self.connection = connection
+        self.closed = False
+        self.terminated = False
+
+    def acquire(self):
+        return _AsyncContext(self.connection)
+
+    async def close(self):
+        self.closed = True
+
+    def terminate(self):
+        self.terminated = True
+
+
+class _FakeAsyncpg:
+    """只实现 create_pool 的 asyncpg 替身，记录创建的连接池"""
+
+    def __init__(self):
+        self.pools = []
+
+    async def create_pool(self, database_url, min_size, max_size, init):
+        connection = _FakeAsyncConnection()
+        await init(connection)
+        self.pools.append(_FakeAsyncPool(connection))
+        return self.pools[-1]
+
+
+def _with_fake_async_drivers(test):
+    """在测试期间用替身代替 asyncpg 和 aiohttp"""
+    def wrapper():
+        original = async_retrieval.asyncpg, async_retrieval.aiohttp
+        async_retrieval.asyncpg, async_retrieval.aiohttp = _FakeAsyncpg(), SimpleNamespace()
+        try:
+            test(async_retrieval.asyncpg)
+        finally:
+            async_retrieval.asyncpg, async_retrieval.aiohttp = original
+    wrapper.__name__ = test.__name__
+    wrapper.__doc__ = test.__doc__
+    return wrapper
+
+
+@_with_fake_async_drivers
+def test_asyncpg_statement(fake_asyncpg):
+    """测试 asyncpg 检索语句：查询向量是唯一的 $1 参数，top_k 写入语句，SET LOCAL 在同一事务内执行"""
+    print("=== asyncpg 检索语句测试 ===")
+
+    async_store = async_retrieval.AsyncPgVectorStore(
+        make_pg_store(distance_metric="cosine", binary_quantization=True, binary_oversample=4)
+    )
+
+    async def search():
+        for mode in ("index", "exact", "binary"):
+            chunks = await async_store.search_by_vector([0.6, 0.8, 0.0], top_k=5, mode=mode)
+            assert chunks[0].chunk_id == "c1"
+        await async_store.close()
+
+    asyncio.run(search())
+    connection = fake_asyncpg.pools[0].connection
+    assert len(connection.fetched) == 3
+    for sql, args in connection.fetched:
+        assert args == ([0.6, 0.8, 0.0],)
+        assert "%s" not in sql and "$1" in sql and "$2" not in sql and "LIMIT 5" in sql
+    assert "LIMIT 20" in connection.fetched[2][0]
+    assert "SET LOCAL enable_indexscan = off" in connection.executed
+    assert "SET LOCAL hnsw.ef_search = 40" in connection.executed
+
+    print("✓ asyncpg 检索语句测试通过")
+
+
+@_with_fake_async_drivers
+def test_native_async_path(fake_asyncpg):
+    """测试原生异步检索：缓存读写不在事件循环线程，编解码按类型所在模式注册，已结束事件循环的连接池被关闭"""
+    print("=== 原生异步检索测试 ===")
+
+    cache = _ThreadRecordingCache([0.6, 0.8, 0.0])
+    store = make_pg_store(distance_metric="cosine")
+    store.embedder.embedding_cache = cache
+
+    async def search():
+        chunks = await store.asearch_similar("查询", top_k=5)
+        return chunks, threading.current_thread()
+
+    chunks, loop_thread = asyncio.run(search())
+    assert chunks[0].chunk_id == "c1" and chunks[0].metadata["similarity"] == 0.9
+    assert cache.threads and loop_thread not in cache.threads
+
+    first_pool = fake_asyncpg.pools[0]
+    assert first_pool.connection.codecs == [("vector", "extensions"), ("jsonb", "pg_catalog")]
+
+    # 第一个事件循环结束时没有调用 aclose，下一个事件循环创建连接池时将其关闭
+    async def search_and_close():
+        await store.asearch_similar("查询", top_k=5)
+        await store.aclose()
+
+    asyncio.run(search_and_close())
+    assert first_pool.terminated and fake_asyncpg.pools[1].closed
+    assert not store._async_stores
+
+    print("✓ 原生异步检索测试通过")
+
+
+def test_concurrent_asearch_falls_back_to_threads():
+    """测试没有原生异步驱动的后端在同一事件循环中并发检索"""
+    print("=== 异步并发检索测试 ===")
+
+    rng = np.random.default_rng(0)
+    corpus = rng.normal(size=(30, 4)).astype(np.float32)
+    queries = {f"查询{i}": corpus[i].tolist() for i in range(10)}
+
+    with tempfile.TemporaryDirectory() as path:
+        store = make_local_store("numpy", path, FakeEmbedder(queries), vector_dimension=4, distance_metric="cosine")
+        store.store_chunks(make_chunks(corpus))
+
+        async def run():
+            results = await asyncio.gather(*(store.asearch_similar(query, top_k=1) for query in queries))
+            await store.aclose()
+            return results
+
+        results = asyncio.run(run())
+        assert [chunks[0].chunk_id for chunks in results] == [f"doc_chunk_{i}" for i in range(10)]
+
+    print("✓ 异步并发检索测试通过")
+
+
+if __name__ == "__main__":
+    test_asyncpg_statement()
+    test_native_async_path()
+    test_concurrent_asearch_falls_back_to_threads()
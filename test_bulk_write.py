@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入语句测试脚本（用假游标，不需要数据库）
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from testing_fakes import FakeCursor, make_chunks, make_pg_store
+
+
+def _merge_statements(cursor: FakeCursor):
+    return [sql for sql, _ in cursor.executed if sql.startswith("INSERT INTO document_chunks")]
+
+
+def test_upsert_skips_unchanged_rows():
+    """测试写入时内容、元数据和模型未变化的行被跳过，比较不包含向量；force_vector_update 时无条件覆盖"""
+    print("=== 写入跳过未变化行测试 ===")
+
+    chunks = make_chunks([[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]])
+    for copy_format in ("binary", "csv"):
+        cursor = FakeCursor()
+        store = make_pg_store(cursor, copy_format=copy_format)
+        assert store.bulk_store_chunks(chunks) == 2
+        merge = _merge_statements(cursor)
+        assert len(merge) == 1 and "IS DISTINCT FROM" in merge[0]
+        assert "EXCLUDED.vector)" not in merge[0] and "EXCLUDED.embedding_model)" in merge[0]
+
+    cursor = FakeCursor()
+    store = make_pg_store(cursor, force_vector_update=True)
+    store.bulk_store_chunks(chunks)
+    merge = _merge_statements(cursor)
+    assert "vector = EXCLUDED.vector" in merge[0] and "WHERE" not in merge[0]
+
+    cursor = FakeCursor()
+    store = make_pg_store(cursor)
+    assert store.store_chunk(chunks[0])
+    assert "EXCLUDED.vector)" not in _merge_statements(cursor)[0]
+
+    print("✓ 写入跳过未变化行测试通过")
+
+
+def test_store_chunks_reports_partial_writes():
+    """测试批量写入只有全部文档块都写入时返回 True，重复的 chunk_id 只计一次"""
+    print("=== 批量写入结果测试 ===")
+
+    chunks = make_chunks([[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]])
+    store = make_pg_store(FakeCursor())
+    assert store.store_chunks(chunks + chunks[:1])
+
+    # 向量化服务少返回了向量，缺少向量的文档块不写入
+    chunks[1].vector = None
+    store.embedder.embed_batch = lambda texts: []
+    assert store.bulk_store_chunks(chunks) == 1
+    assert not store.store_chunks(chunks)
+
+    print("✓ 批量写入结果测试通过")
+
+
+if __name__ == "__main__":
+    test_upsert_skips_unchanged_rows()
+    test_store_chunks_reports_partial_writes()
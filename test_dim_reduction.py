@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量降维测试脚本
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dim_reduction import DimensionReducer, evaluate_reduction
+
+
+def _low_rank_vectors(count: int, dimension: int = 64, rank: int = 8, seed: int = 0) -> np.ndarray:
+    """生成主要信息集中在少数方向上的向量"""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(rank, dimension))
+    return rng.normal(size=(count, rank)) @ basis + 0.01 * rng.normal(size=(count, dimension))
+
+
+def test_truncate():
+    """测试前缀截断并重新归一化"""
+    print("=== 前缀截断测试 ===")
+
+    reducer = DimensionReducer("truncate", source_dimension=4, target_dimension=2)
+    assert reducer.fitted
+    reduced = reducer.transform([3.0, 4.0, 100.0, 100.0])
+    assert np.allclose(reduced, [0.6, 0.8])
+
+    print("✓ 前缀截断测试通过")
+
+
+def test_pca_roundtrip():
+    """测试PCA拟合、序列化和恢复后变换一致"""
+    print("=== PCA 拟合与序列化测试 ===")
+
+    vectors = _low_rank_vectors(200)
+    reducer = DimensionReducer("pca", source_dimension=64, target_dimension=8)
+    assert not reducer.fitted
+    reducer.fit(vectors)
+
+    restored = DimensionReducer.from_bytes(reducer.to_bytes())
+    assert restored.method == "pca" and restored.target_dimension == 8
+    assert np.allclose(restored.transform_many(vectors[:5]), reducer.transform_many(vectors[:5]), atol=1e-5)
+
+    print("✓ PCA 拟合与序列化测试通过")
+
+
+def test_evaluate_reduction():
+    """测试召回率对比：保留主要方向的PCA召回率应接近全维度"""
+    print("=== 降维召回率对比测试 ===")
+
+    vectors = _low_rank_vectors(320)
+    corpus, queries = vectors[:300], vectors[300:]
+    results = evaluate_reduction(corpus, queries, dimensions=[2, 8], method="pca", top_k=5, metric="cosine")
+
+    for result in results:
+        print(f"  {result}")
+
+    recall = {result["dimension"]: result["recall"] for result in results}
+    assert recall[64] == 1.0
+    assert recall[8] >= 0.9
+    assert recall[2] <= recall[8]
+
+    print("✓ 降维召回率对比测试通过")
+
+
+if __name__ == "__main__":
+    test_truncate()
+    test_pca_roundtrip()
+    test_evaluate_reduction()
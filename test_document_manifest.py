@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文档清单（增量向量化）测试脚本
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from document_manifest import DocumentManifest
+
+
+def _write(path: str, content: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def test_manifest_diff():
+    """测试新增、变更、未变化和删除文件的识别"""
+    print("=== 文档清单差异测试 ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        doc_a = os.path.join(tmp_dir, "07-Chapter-01.md")
+        doc_b = os.path.join(tmp_dir, "08-Chapter-02.md")
+        doc_c = os.path.join(tmp_dir, "09-Chapter-03.md")
+        for path in (doc_a, doc_b, doc_c):
+            _write(path, f"# {os.path.basename(path)}\n\n内容")
+
+        manifest_path = os.path.join(tmp_dir, "manifest.json")
+        manifest = DocumentManifest(manifest_path)
+
+        diff = manifest.diff([doc_a, doc_b, doc_c], scope=tmp_dir)
+        assert sorted(diff.added) == sorted([doc_a, doc_b, doc_c])
+        assert not diff.changed and not diff.removed
+
+        for path in (doc_a, doc_b, doc_c):
+            manifest.update(path, os.path.basename(path)[:-3], [f"{path}_chunk_0"])
+        manifest.save()
+
+        # 修改一个文件、只更新另一个文件的修改时间、删除第三个文件
+        _write(doc_a, "# 新标题\n\n新增的段落")
+        stat = os.stat(doc_b)
+        os.utime(doc_b, (stat.st_atime, stat.st_mtime + 10))
+        os.remove(doc_c)
+
+        reloaded = DocumentManifest(manifest_path)
+        diff = reloaded.diff([doc_a, doc_b], scope=tmp_dir)
+        print(f"  新增: {diff.added}")
+        print(f"  变更: {diff.changed}")
+        print(f"  未变化: {diff.unchanged}")
+        print(f"  删除: {diff.removed}")
+
+        assert diff.added == []
+        assert diff.changed == [doc_a]
+        assert diff.unchanged == [doc_b]
+        assert diff.removed == [doc_c]
+        assert reloaded.get(doc_c).chunk_ids == [f"{doc_c}_chunk_0"]
+
+        reloaded.remove(doc_c)
+        assert reloaded.stats() == {"files": 2, "chunks": 2}
+
+    print("✓ 文档清单差异测试通过")
+
+
+def test_manifest_scope():
+    """测试删除检测只作用于指定目录"""
+    print("=== 文档清单范围测试 ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        text_dir = os.path.join(tmp_dir, "text")
+        other_dir = os.path.join(tmp_dir, "other")
+        os.makedirs(text_dir)
+        os.makedirs(other_dir)
+
+        doc = os.path.join(text_dir, "a.md")
+        other_doc = os.path.join(other_dir, "b.md")
+        _write(doc, "内容")
+        _write(other_doc, "其他内容")
+
+        manifest = DocumentManifest(os.path.join(tmp_dir, "manifest.json"))
+        manifest.update(doc, "a", ["a_chunk_0"])
+        manifest.update(other_doc, "b", ["b_chunk_0"])
+
+        diff = manifest.diff([doc], scope=text_dir)
+        assert diff.removed == []
+        assert diff.unchanged == [doc]
+
+    print("✓ 文档清单范围测试通过")
+
+
+if __name__ == "__main__":
+    test_manifest_diff()
+    test_manifest_scope()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文档批量分割测试脚本
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from document_splitter import DocumentSplitter
+
+TEXT_DIR = Path(__file__).parent / "text"
+SAMPLE_FILES = ["00-Table-of-Contents.md", "02-Acknowledgment.md", "04-Thought-Leader.md"]
+
+
+def _read_outputs(output_dir: str) -> dict:
+    return {path.name: path.read_text(encoding="utf-8") for path in sorted(Path(output_dir).glob("*.json"))}
+
+
+def test_parallel_split_is_deterministic():
+    """测试多进程分割与顺序分割得到相同的文档块和保存的 JSON"""
+    print("=== 多进程批量分割测试 ===")
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_dir = os.path.join(directory, "input")
+        os.makedirs(input_dir)
+        for name in SAMPLE_FILES:
+            shutil.copy(TEXT_DIR / name, input_dir)
+
+        splitter = DocumentSplitter()
+        sequential = splitter.batch_split(input_dir, os.path.join(directory, "sequential"), workers=1)
+        parallel = splitter.batch_split(input_dir, os.path.join(directory, "parallel"), workers=2)
+
+        assert list(sequential) == sorted(SAMPLE_FILES) and list(parallel) == list(sequential)
+        assert parallel == sequential
+        assert sum(len(chunks) for chunks in sequential.values()) > len(SAMPLE_FILES)
+
+        sequential_json = _read_outputs(os.path.join(directory, "sequential"))
+        assert len(sequential_json) == len(SAMPLE_FILES)
+        assert _read_outputs(os.path.join(directory, "parallel")) == sequential_json
+
+    print("✓ 多进程批量分割测试通过")
+
+
+if __name__ == "__main__":
+    test_parallel_split_is_deterministic()
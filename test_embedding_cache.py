@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量缓存测试脚本
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from embedding_cache import EmbeddingCache
+
+
+def test_cache_hit_and_miss():
+    """测试缓存命中与未命中"""
+    print("=== 向量缓存命中测试 ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = EmbeddingCache(os.path.join(tmp_dir, "cache.db"), model="test-model", dimension=4)
+
+        assert cache.get("提示链模式") is None
+
+        cache.put_many(["提示链模式", "路由模式"], [[0.1, 0.2, 0.3, 0.4], [1.0, -1.0, 0.5, 0.0]])
+        results = cache.get_many(["路由模式", "未缓存的文本", "提示链模式"])
+
+        assert results[1] is None
+        assert results[0] == [1.0, -1.0, 0.5, 0.0]
+        # float16 存储存在精度损失
+        assert all(abs(a - b) < 1e-3 for a, b in zip(results[2], [0.1, 0.2, 0.3, 0.4]))
+
+        stats = cache.stats()
+        print(f"  缓存统计: {stats}")
+        assert stats["entries"] == 2
+        assert stats["hits"] == 2
+        assert stats["misses"] == 2
+
+        # 维度不匹配的向量不写入缓存
+        cache.put("维度错误", [0.1, 0.2])
+        assert cache.get("维度错误") is None
+
+        cache.close()
+
+    print("✓ 缓存命中测试通过")
+
+
+def test_cache_key_includes_model():
+    """测试不同模型、维度和向量化接口的向量互不干扰"""
+    print("=== 向量缓存键测试 ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "cache.db")
+        cache = EmbeddingCache(path, model="model-a", dimension=2)
+        cache.put("相同文本", [0.5, 0.5])
+        cache.close()
+
+        other_model = EmbeddingCache(path, model="model-b", dimension=2)
+        assert other_model.get("相同文本") is None
+        other_model.close()
+
+        reopened = EmbeddingCache(path, model="model-a", dimension=2)
+        assert reopened.get("相同文本") == [0.5, 0.5]
+
+        # /api/embed 的归一化向量与 /api/embeddings 的原始向量分开缓存
+        assert reopened.get("相同文本", "/api/embed") is None
+        reopened.put("相同文本", [0.25, -1.0], "/api/embed")
+        assert reopened.get("相同文本", "/api/embed") == [0.25, -1.0]
+        assert reopened.get("相同文本") == [0.5, 0.5]
+        reopened.close()
+
+    print("✓ 缓存键测试通过")
+
+
+def test_cache_eviction():
+    """测试按体积淘汰最久未访问的条目"""
+    print("=== 向量缓存淘汰测试 ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = EmbeddingCache(os.path.join(tmp_dir, "cache.db"), model="test-model", dimension=256)
+        # 每条向量 512 字节，上限约 1MB
+        cache.max_size_bytes = 512 * 100
+
+        for batch in range(3):
+            texts = [f"文本-{batch}-{i}" for i in range(50)]
+            cache.put_many(texts, [[float(i)] * 256 for i in range(50)])
+
+        stats = cache.stats()
+        print(f"  缓存统计: {stats}")
+        assert stats["evictions"] > 0
+        assert stats["entries"] <= 100
+        # 最早写入的条目被淘汰，最新写入的条目保留
+        assert cache.get("文本-0-0") is None
+        assert cache.get("文本-2-49") is not None
+
+        cache.close()
+
+    print("✓ 缓存淘汰测试通过")
+
+
+if __name__ == "__main__":
+    test_cache_hit_and_miss()
+    test_cache_key_includes_model()
+    test_cache_eviction()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线入库测试脚本（用假向量存储，不需要数据库和向量化服务）
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ingest_pipeline import IngestPipeline
+from vector_store import VectorStoreConfig, DatabaseError, EmbeddingError
+
+
+class _FailingStore:
+    """向量化含 "向量化错误" 的文本时抛出异常，写入 write_fail 文档的文档块时抛出异常"""
+
+    def __init__(self, batch_size: int = 1):
+        self.config = VectorStoreConfig(database_url="postgresql://localhost:1/unused", batch_size=batch_size)
+        self.stored = []
+
+    def embed_batch(self, texts):
+        if any("向量化错误" in text for text in texts):
+            raise EmbeddingError("向量化服务不可用")
+        return [[0.0, 1.0] for _ in texts]
+
+    def store_chunks(self, chunks):
+        if any(chunk.document_id == "write_fail" for chunk in chunks):
+            raise DatabaseError("连接已断开")
+        self.stored.extend(chunks)
+        return True
+
+    def delete_stale_chunks(self, document_id, keep_chunk_ids):
+        return 0
+
+
+class _ExistingStore(_FailingStore):
+    """existing 中的文档块已入库，记录向量化的文本和更新元数据的文档块"""
+
+    def __init__(self, existing):
+        super().__init__(batch_size=100)
+        self.existing = existing
+        self.embedded = []
+        self.metadata_updated = []
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_batch(texts)
+
+    def get_chunk_ids(self, document_id):
+        return [chunk_id for chunk_id in self.existing if chunk_id.startswith(f"{document_id}_")]
+
+    def update_chunk_metadata(self, chunks):
+        self.metadata_updated.extend(chunk.chunk_id for chunk in chunks)
+        return len(chunks)
+
+
+def _write_documents(directory: str, documents: dict):
+    paths = []
+    for name, text in documents.items():
+        path = os.path.join(directory, f"{name}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def test_stage_errors_fail_documents():
+    """测试向量化和写入阶段抛出异常时，批内文档计为失败，其他文档正常入库"""
+    print("=== 流水线阶段失败测试 ===")
+
+    documents = {
+        "ok": "# 标题\n\n提示链模式把任务拆分为多个步骤。",
+        "embed_fail": "# 标题\n\n这段文本触发向量化错误。",
+        "write_fail": "# 标题\n\n路由模式根据输入选择处理路径。",
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = _write_documents(directory, documents)
+        store = _FailingStore()
+        report = IngestPipeline(store, queue_size=2).run(paths)
+
+    print(f"  失败文档: {report['failed_documents']}")
+    assert report['documents'] == 3
+    assert report['successful'] == 1 and report['failed'] == 2
+    assert set(report['failed_documents']) == {"embed_fail", "write_fail"}
+    assert "向量化失败" in report['failed_documents']["embed_fail"]
+    assert "写入数据库失败" in report['failed_documents']["write_fail"]
+    assert {chunk.document_id for chunk in store.stored} == {"ok"}
+
+    print("✓ 流水线阶段失败测试通过")
+
+
+def test_shared_batch_failure_fails_every_document():
+    """测试跨文档的一批文档块失败时，批内的每个文档都计为失败"""
+    print("=== 流水线跨文档批次失败测试 ===")
+
+    documents = {
+        "a": "# 标题\n\n第一篇文档的内容。",
+        "b": "# 标题\n\n第二篇文档触发向量化错误。",
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = _write_documents(directory, documents)
+        report = IngestPipeline(_FailingStore(batch_size=100)).run(paths)
+
+    assert report['successful'] == 0 and set(report['failed_documents']) == {"a", "b"}
+    assert report['chunks_written'] == 0
+
+    print("✓ 流水线跨文档批次失败测试通过")
+
+
+def test_skip_existing_chunks():
+    """测试 skip_existing 时已入库的文档块不重新向量化，只同步元数据；不清理过期文档块时不记录文档块ID"""
+    print("=== 流水线跳过已入库文档块测试 ===")
+
+    documents = {
+        "a": "# 标题\n\n第一段内容。\n\n## 小节\n\n第二段内容。",
+        "b": "# 标题\n\n另一篇文档。",
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = _write_documents(directory, documents)
+        store = _ExistingStore(existing={"a_chunk_0", "b_chunk_0"})
+        pipeline = IngestPipeline(store, skip_existing=True)
+        report = pipeline.run(paths)
+
+    written = {chunk.chunk_id for chunk in store.stored}
+    print(f"  写入: {sorted(written)}, 跳过: {report['chunks_skipped']}")
+    assert report['successful'] == 2 and report['chunks_skipped'] == 2
+    assert sorted(store.metadata_updated) == ["a_chunk_0", "b_chunk_0"]
+    assert not written & store.existing and len(store.embedded) == len(written)
+    assert pipeline._document_chunk_ids == {}
+
+    print("✓ 流水线跳过已入库文档块测试通过")
+
+
+if __name__ == "__main__":
+    test_stage_errors_fail_documents()
+    test_shared_batch_failure_fails_every_document()
+    test_skip_existing_chunks()
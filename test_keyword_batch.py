@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量关键词提取测试脚本
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_extractor import get_keyword_extractor
+
+# 在独立进程中初始化提取器，输出 jieba 词频表的摘要；NO_ADD_WORD 时禁止逐词注册，只能从缓存加载
+_LOAD_SCRIPT = """
+import os, sys, json, hashlib, marshal
+import jieba
+if os.environ.get("NO_ADD_WORD"):
+    def _fail(*args, **kwargs):
+        raise AssertionError("应从缓存加载词典")
+    jieba.add_word = _fail
+from keyword_extractor import get_keyword_extractor
+get_keyword_extractor()
+freq = hashlib.sha256(marshal.dumps(sorted(jieba.dt.FREQ.items()))).hexdigest()
+print(json.dumps({"total": jieba.dt.total, "freq": freq, "words": len(jieba.dt.FREQ)}))
+"""
+
+TEST_TEXTS = [
+    """
+    提示链模式，也称为「管道模式」，是利用大语言模型处理复杂任务的一种强大范式。
+    它不期望用单一步骤解决复杂问题，而是采用「分而治之」策略。
+    """,
+    """
+    路由模式让智能体根据输入动态选择处理路径。路由器可以基于规则、嵌入相似度
+    或大语言模型的判断，把请求分发给最合适的子智能体或工具。
+    """,
+    "```python\nprint('只有代码块')\n```",
+    """
+    反思模式通过让智能体评估自己的输出并迭代改进，提升结果质量。
+    生产者智能体生成初稿，评审者智能体给出反馈。
+    """,
+]
+
+
+def test_batch_matches_single():
+    """测试批量提取与逐条提取结果一致"""
+    print("=== 批量关键词提取一致性测试 ===")
+
+    extractor = get_keyword_extractor()
+    assert get_keyword_extractor() is extractor
+
+    results = extractor.extract_batch(TEST_TEXTS, top_k=5, with_weight=True)
+    assert len(results) == len(TEST_TEXTS)
+
+    for text, result in zip(TEST_TEXTS, results):
+        assert result['keywords'] == extractor.extract_keywords(text, top_k=5, method='tfidf', with_weight=True)
+        assert result['phrases'] == extractor.extract_phrases(text, top_k=5)
+        assert result['concepts'] == extractor.extract_concepts(text, top_k=5)
+        assert result['hybrid'] == extractor.extract_hybrid_keywords(text, top_k=5)
+        print(f"  关键词: {[word for word, _ in result['keywords']]}")
+
+    # 只有代码块的文本预处理后为空
+    assert results[2] == {'keywords': [], 'phrases': [], 'concepts': [], 'hybrid': []}
+
+    keywords_only = extractor.extract_batch(TEST_TEXTS, top_k=5, fields=('keywords',))
+    assert [list(result) for result in keywords_only] == [['keywords']] * len(TEST_TEXTS)
+
+    print("✓ 批量关键词提取一致性测试通过")
+
+
+def test_batch_with_processes():
+    """测试多进程批量提取结果与单进程一致"""
+    print("=== 多进程批量关键词提取测试 ===")
+
+    extractor = get_keyword_extractor()
+    serial = extractor.extract_batch(TEST_TEXTS, top_k=5)
+    parallel = extractor.extract_batch(TEST_TEXTS, top_k=5, workers=2)
+    assert parallel == serial
+
+    print("✓ 多进程批量关键词提取测试通过")
+
+
+def test_shared_extractor_and_dictionary_cache():
+    """测试提取器在进程内只创建一次，编译后的词典缓存只写入一次，从缓存加载的词频表与重新构建的一致"""
+    print("=== 共享提取器与词典缓存测试 ===")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        extractors = list(executor.map(lambda _: get_keyword_extractor(), range(8)))
+    assert all(extractor is extractors[0] for extractor in extractors)
+
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def load(**env):
+            output = subprocess.run([sys.executable, "-c", _LOAD_SCRIPT], cwd=project_dir, check=True,
+                                    capture_output=True, text=True,
+                                    env={**os.environ, "RAG_JIEBA_CACHE_DIR": cache_dir, **env})
+            return json.loads(output.stdout.strip().splitlines()[-1])
+
+        built = load()
+        cache_files = os.listdir(cache_dir)
+        assert len(cache_files) == 1 and cache_files[0].endswith(".cache")
+        cache_path = os.path.join(cache_dir, cache_files[0])
+        written_at = os.stat(cache_path).st_mtime_ns
+
+        cached = load(NO_ADD_WORD="1")
+        assert cached == built
+        assert os.listdir(cache_dir) == cache_files and os.stat(cache_path).st_mtime_ns == written_at
+        print(f"  词条数: {built['words']}, 总词频: {built['total']}")
+
+    print("✓ 共享提取器与词典缓存测试通过")
+
+
+if __name__ == "__main__":
+    test_batch_matches_single()
+    test_batch_with_processes()
+    test_shared_extractor_and_dictionary_cache()
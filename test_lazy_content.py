@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+两阶段检索（lazy_content）测试脚本
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rag_cli.core.retriever import RAGRetriever
+from rag_cli.models.config import RetrieverConfig, SearchConfig
+from testing_fakes import FakeCursor, make_local_store, make_pg_store
+from vector_store import DocumentChunk, SearchParams
+
+
+def test_pgvector_lazy_statement():
+    """测试 lazy_content 的检索语句不读取 content，内容按 chunk_id 一次批量读取"""
+    print("=== pgvector 两阶段检索语句测试 ===")
+
+    cursor = FakeCursor(rows=[("c1", "doc", "完整内容", {"title": "标题"}, "test", None)])
+    store = make_pg_store(cursor, binary_quantization=True)
+    for mode in ("index", "exact", "binary"):
+        _, full_sql, _ = store.search_query([0.1, 0.2, 0.3], 5, mode)
+        _, lazy_sql, _ = store.search_query([0.1, 0.2, 0.3], 5, mode, SearchParams(lazy_content=True))
+        assert "document_id, content," in full_sql
+        assert "document_id, content," not in lazy_sql and "NULL::text AS content" in lazy_sql
+
+    rows = [("c1", "doc", None, {"title": "标题"}, "test", None, 0.9)]
+    chunk = store.rows_to_chunks(rows, SearchParams(lazy_content=True))[0]
+    assert chunk.content is None and chunk.metadata["similarity"] == 0.9
+
+    chunks = store.fetch_chunks(["c1", "c2", "c1"])
+    assert list(chunks) == ["c1"] and chunks["c1"].content == "完整内容"
+    assert len(cursor.executed) == 1
+    sql, params = cursor.executed[0]
+    assert "chunk_id = ANY(%s)" in sql and params == (["c1", "c2"],)
+
+    print("✓ pgvector 两阶段检索语句测试通过")
+
+
+def test_retriever_hydrates_on_demand():
+    """测试检索器返回不含内容的结果，hydrate 只补全尚未加载的结果"""
+    print("=== 检索结果按需补全测试 ===")
+
+    rng = np.random.default_rng(0)
+    corpus = rng.normal(size=(20, 8)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_local_store("sqlite", os.path.join(directory, "vectors.db"), distance_metric="cosine")
+        store.store_chunks([
+            DocumentChunk(content=f"内容{i}", metadata={"title": f"标题{i}"}, chunk_id=f"chunk_{i}",
+                          document_id="doc", vector=vector.tolist(), embedding_model="test")
+            for i, vector in enumerate(corpus)
+        ])
+
+        retriever = RAGRetriever(RetrieverConfig(vector_store_config=store.config,
+                                                 search_config=SearchConfig(similarity_threshold=-1.0,
+                                                                            lazy_content=True)))
+        retriever.vector_store = store
+        params = retriever.search_params()
+        assert params.lazy_content
+
+        results = retriever._to_results(store.search_by_vector(corpus[3].tolist(), top_k=5, params=params))
+        assert results[0].chunk_id == "chunk_3" and results[0].title == "标题3"
+        assert all(result.content is None for result in results)
+
+        retriever.hydrate(results[:2])
+        assert [result.content for result in results[:2]] == ["内容3", results[1].chunk_id.replace("chunk_", "内容")]
+        assert all(result.content is None for result in results[2:])
+
+        # 检索之后被删除的文档块补全为空内容
+        store.delete_chunks([results[2].chunk_id])
+        retriever.hydrate(results)
+        assert results[2].content == "" and all(result.content for result in results[3:])
+
+        store.disconnect()
+
+    print("✓ 检索结果按需补全测试通过")
+
+
+if __name__ == "__main__":
+    test_pgvector_lazy_statement()
+    test_retriever_hydrates_on_demand()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 IVF 索引测试脚本
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from local_ivf import train_kmeans, nearest_centroids
+from testing_fakes import make_chunks, make_local_store
+from vector_store import SearchParams
+
+# 16 维、按 IVF 检索的本地存储
+IVF_OPTIONS = {"vector_dimension": 16, "local_index": "ivf", "local_ivf_probes": 2}
+
+
+def _clustered(rng, clusters: int = 16, per_cluster: int = 100, dimension: int = 16) -> np.ndarray:
+    """围绕随机中心生成聚簇数据"""
+    centers = rng.normal(scale=5.0, size=(clusters, dimension))
+    points = centers[:, None, :] + rng.normal(size=(clusters, per_cluster, dimension))
+    return rng.permutation(points.reshape(-1, dimension)).astype(np.float32)
+
+
+def test_kmeans_separates_clusters():
+    """测试小批量 k-means 找到聚簇：同一簇的点分配到同一个中心"""
+    print("=== k-means 测试 ===")
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(scale=10.0, size=(4, 8))
+    labels = np.repeat(np.arange(4), 50)
+    points = (centers[labels] + rng.normal(size=(200, 8))).astype(np.float32)
+
+    centroids = train_kmeans(points, 4, "l2", batch_size=64, iterations=30)
+    assignment = nearest_centroids(points, centroids, "l2")[:, 0]
+    for label in range(4):
+        assert len(set(assignment[labels == label])) == 1
+
+    top = nearest_centroids(points[:3], centroids, "l2", count=4)
+    assert top.shape == (3, 4) and (top[:, 0] == assignment[:3]).all()
+
+    print("✓ k-means 测试通过")
+
+
+def test_ivf_search_recall_and_persistence():
+    """测试 IVF 检索的召回率、probes 覆盖、内存映射加载、度量不一致时忽略索引和增量写入"""
+    print("=== 本地 IVF 检索测试 ===")
+
+    rng = np.random.default_rng(1)
+    corpus = _clustered(rng)
+    queries = corpus[rng.choice(len(corpus), 20, replace=False)] + rng.normal(scale=0.1, size=(20, 16))
+
+    with tempfile.TemporaryDirectory() as path:
+        for metric in ("l2", "cosine"):
+            store = make_local_store("numpy", path, distance_metric=metric, **IVF_OPTIONS)
+            store.store_chunks(make_chunks(corpus))
+            exact = [[chunk.chunk_id for chunk in store.search_by_vector(query.tolist(), 10, mode="exact")]
+                     for query in queries]
+
+            index = store.build_index(n_lists=16)
+            assert index.offsets[-1] == len(corpus) and (np.diff(index.row_lists) >= 0).all()
+            store.save()
+
+            restored = make_local_store("numpy", path, distance_metric=metric, **IVF_OPTIONS)
+            assert isinstance(restored._matrix, np.memmap) and restored.ivf.n_lists == 16
+            approximate = [[chunk.chunk_id for chunk in results]
+                           for results in restored.search_batch(queries.tolist(), 10)]
+            recall = np.mean([len(set(a) & set(e)) / 10 for a, e in zip(approximate, exact)])
+            print(f"  {metric}: recall@10={recall:.3f}")
+            assert recall >= 0.9
+
+            # 扫描全部聚类时与精确检索一致
+            full = restored.search_batch(queries.tolist(), 10, SearchParams(probes=16))
+            assert [[chunk.chunk_id for chunk in results] for results in full] == exact
+
+            # 索引保存训练时的度量，按其他度量加载时忽略
+            assert restored.ivf.metric == metric
+            other = "cosine" if metric == "l2" else "l2"
+            assert make_local_store("numpy", path, distance_metric=other, **IVF_OPTIONS).ivf is None
+
+        # 构建后新增的文档块在尾部总是被扫描
+        restored.store_chunks(make_chunks(queries[:1], "new"))
+        assert restored.search_by_vector(queries[0].tolist(), 1)[0].chunk_id == "new_chunk_0"
+
+    print("✓ 本地 IVF 检索测试通过")
+
+
+def test_delete_keeps_lists_contiguous():
+    """测试删除文档块后倒排表偏移与剩余行一致，删除索引后文件被清理"""
+    print("=== 本地 IVF 删除测试 ===")
+
+    rng = np.random.default_rng(2)
+    corpus = _clustered(rng, clusters=4, per_cluster=25)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = make_local_store("numpy", path, **IVF_OPTIONS)
+        store.store_chunks(make_chunks(corpus[:50], "a") + make_chunks(corpus[50:], "b"))
+        store.build_index(n_lists=4)
+        assert store.delete_document("a") == 50
+
+        assert store.ivf.indexed_rows == store.size == 50 and store.ivf.offsets[-1] == 50
+        for list_id in range(4):
+            start, end = store.ivf.offsets[list_id], store.ivf.offsets[list_id + 1]
+            assert (store.ivf.row_lists[start:end] == list_id).all()
+        results = store.search_by_vector(corpus[60].tolist(), 1, params=SearchParams(probes=1))
+        assert results[0].chunk_id == "b_chunk_10"
+
+        store.drop_index()
+        store.save()
+        assert not os.path.exists(os.path.join(path, "ivf_centroids.npy"))
+
+    print("✓ 本地 IVF 删除测试通过")
+
+
+if __name__ == "__main__":
+    test_kmeans_separates_clusters()
+    test_ivf_search_recall_and_persistence()
+    test_delete_keeps_lists_contiguous()
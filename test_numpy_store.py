@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 NumPy 向量存储测试脚本
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from numpy_store import export_from_database
+from testing_fakes import FakeConnection, FakeCursor, FakeEmbedder, make_chunks, make_local_store, make_pg_store
+
+
+def test_search_matches_brute_force():
+    """测试三种度量下的 top_k 与逐条计算一致，分数与 PgVectorStore 的定义一致"""
+    print("=== 本地检索正确性测试 ===")
+
+    rng = np.random.default_rng(0)
+    corpus = rng.normal(size=(50, 8)).astype(np.float32)
+    query = rng.normal(size=8).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as path:
+        for metric in ("l2", "cosine", "ip"):
+            store = make_local_store("numpy", path, distance_metric=metric)
+            store.store_chunks(make_chunks(corpus))
+            results = store.search_by_vector(query.tolist(), top_k=5)
+
+            if metric == "l2":
+                expected = 1 / (1 + np.linalg.norm(corpus - query, axis=1))
+            elif metric == "cosine":
+                expected = corpus @ query / (np.linalg.norm(corpus, axis=1) * np.linalg.norm(query))
+            else:
+                expected = corpus @ query
+            order = np.argsort(-expected)[:5]
+
+            assert [chunk.chunk_id for chunk in results] == [f"doc_chunk_{i}" for i in order]
+            assert np.allclose([chunk.metadata["similarity"] for chunk in results], expected[order], atol=1e-4)
+            print(f"  {metric}: {[chunk.chunk_id for chunk in results]}")
+
+    print("✓ 本地检索正确性测试通过")
+
+
+def test_save_load_and_delete():
+    """测试保存/加载、覆盖写入、清理过期文档块和批量检索"""
+    print("=== 本地存储持久化测试 ===")
+
+    rng = np.random.default_rng(1)
+    corpus = rng.normal(size=(20, 8)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = make_local_store("numpy", path, FakeEmbedder({"查询": corpus[3].tolist()}),
+                                 distance_metric="cosine", local_dtype="float16")
+        store.store_chunks(make_chunks(corpus[:10], "a") + make_chunks(corpus[10:], "b"))
+        # 覆盖已有文档块不会增加数量
+        store.store_chunks(make_chunks(corpus[:2], "a"))
+        assert store.size == 20
+        assert store.delete_stale_chunks("b", ["b_chunk_0", "b_chunk_1"]) == 8
+        store.save()
+
+        restored = make_local_store("numpy", path, FakeEmbedder({"查询": corpus[3].tolist()}),
+                                    distance_metric="cosine", local_dtype="float16")
+        assert restored.size == 12
+        assert restored._matrix.dtype == np.float16
+        assert restored.get_chunk_ids("b") == ["b_chunk_0", "b_chunk_1"]
+
+        top = restored.search_similar("查询", top_k=3)
+        assert top[0].chunk_id == "a_chunk_3" and top[0].metadata["keywords"] == ["3"]
+
+        batch = restored.search_batch([corpus[3].tolist(), corpus[11].tolist()], top_k=2)
+        assert [results[0].chunk_id for results in batch] == ["a_chunk_3", "b_chunk_1"]
+
+    print("✓ 本地存储持久化测试通过")
+
+
+def test_export_uses_named_cursor_in_transaction():
+    """测试从数据库导出时命名游标在事务内打开（autocommit 连接上不能使用命名游标），导出后恢复 autocommit"""
+    print("=== 数据库导出测试 ===")
+
+    rows = [(f"c{i}", "doc", f"内容{i}", {"title": "标题"}, "test", None, json.dumps([float(i)] * 8))
+            for i in range(5)]
+    cursor = FakeCursor(rows=rows)
+    pg_store = make_pg_store()
+    pg_store.connection = FakeConnection(cursor)
+
+    with tempfile.TemporaryDirectory() as path:
+        local_store = make_local_store("numpy", path)
+        assert export_from_database(pg_store, local_store, fetch_size=2) == 5
+        assert local_store.size == 5 and local_store.search_by_vector([4.0] * 8, top_k=1)[0].chunk_id == "c4"
+
+    assert pg_store.connection.opened == [("export_vectors", False)]
+    assert pg_store.connection.commits == 1 and pg_store.connection.autocommit
+    assert cursor.itersize == 2
+
+    print("✓ 数据库导出测试通过")
+
+
+if __name__ == "__main__":
+    test_search_matches_brute_force()
+    test_save_load_and_delete()
+    test_export_uses_named_cursor_in_transaction()
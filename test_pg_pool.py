@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PostgreSQL 连接池测试脚本（用假连接，不需要数据库）
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pg_pool
+from pg_pool import PgConnectionPool
+from vector_backend import ConnectionError
+
+
+class _FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=None):
+        if self.connection.broken:
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.connection.queries.append(sql)
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.autocommit = False
+        self.queries = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakeThreadedPool:
+    """与 psycopg2 ThreadedConnectionPool 相同的 getconn/putconn/closeall 行为"""
+
+    def __init__(self, minconn, maxconn, dsn):
+        self.maxconn = maxconn
+        self.closed = False
+        self._pool = [_FakeConnection() for _ in range(minconn)]
+        self._used = {}
+        self.created = minconn
+
+    def getconn(self):
+        if len(self._used) >= self.maxconn:
+            raise RuntimeError("connection pool exhausted")
+        if self._pool:
+            connection = self._pool.pop()
+        else:
+            connection = _FakeConnection()
+            self.created += 1
+        self._used[id(connection)] = connection
+        return connection
+
+    def putconn(self, connection, close=False):
+        self._used.pop(id(connection), None)
+        if close or connection.closed:
+            connection.close()
+        else:
+            self._pool.append(connection)
+
+    def closeall(self):
+        self.closed = True
+
+
+def _make_pool(**options) -> PgConnectionPool:
+    original = pg_pool.psycopg2_pool.ThreadedConnectionPool
+    pg_pool.psycopg2_pool.ThreadedConnectionPool = _FakeThreadedPool
+    try:
+        return PgConnectionPool("postgresql://fake/db", **options)
+    finally:
+        pg_pool.psycopg2_pool.ThreadedConnectionPool = original
+
+
+def test_checkout_reuses_and_reconnects():
+    """测试连接被复用，失效的连接在取出时被丢弃并重新建立"""
+    print("=== 连接池健康检查测试 ===")
+
+    pool = _make_pool(min_size=1, max_size=2, check_interval=0)
+    first = pool.getconn()
+    assert first.autocommit and first.queries == ["SELECT 1"]
+    pool.putconn(first)
+
+    # 空闲连接被复用
+    again = pool.getconn()
+    assert again is first
+    pool.putconn(again)
+
+    # 服务端断开的连接被替换
+    first.broken = True
+    replacement = pool.getconn()
+    assert replacement is not first and first.closed and pool.reconnects == 1
+    pool.putconn(replacement)
+
+    stats = pool.stats()
+    assert stats["idle"] == 1 and stats["in_use"] == 0 and stats["checkouts"] == 3
+
+    print("✓ 连接池健康检查测试通过")
+
+
+def test_exhausted_pool_waits_then_times_out():
+    """测试连接用尽时等待归还，超时后报 ConnectionError 而不是 psycopg2 的 PoolError"""
+    print("=== 连接池上限测试 ===")
+
+    pool = _make_pool(min_size=0, max_size=1, timeout=0.05)
+    held = pool.getconn()
+    try:
+        pool.getconn()
+        assert False, "连接用尽时应超时"
+    except ConnectionError:
+        pass
+
+    pool.putconn(held)
+    with pool.connection() as connection:
+        assert connection is held
+    assert pool.stats()["in_use"] == 0
+
+    print("✓ 连接池上限测试通过")
+
+
+if __name__ == "__main__":
+    test_checkout_reuses_and_reconnects()
+    test_exhausted_pool_waits_then_times_out()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检索语句和预备语句测试脚本（用假游标，不需要数据库）
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from testing_fakes import FakeCursor, make_pg_store
+from vector_store import vector_literal
+
+
+def test_query_vector_sent_once():
+    """测试每种模式下查询向量是唯一的参数，并被语句多次引用"""
+    print("=== 查询向量参数测试 ===")
+
+    store = make_pg_store(binary_quantization=True)
+    for mode in ("index", "exact", "binary"):
+        _, search_sql, query_params = store.search_query([0.1, 0.2, 0.3], 5, mode)
+        assert "%s" not in search_sql and search_sql.count("$1") == 2
+        assert f"${len(query_params)}" in search_sql and f"${len(query_params) + 1}" not in search_sql
+        assert query_params == ([0.1, 0.2, 0.3],)
+        # top_k 直接写入语句，通用计划也知道 LIMIT
+        assert "LIMIT 5" in " ".join(search_sql.split())
+
+    assert vector_literal([0.1, 1.0, -2.5]) == "[0.1,1,-2.5]"
+
+    print("✓ 查询向量参数测试通过")
+
+
+def test_prepared_once_per_connection():
+    """测试检索语句在连接上只 PREPARE 一次，之后只执行 EXECUTE；关闭预备语句时展开为普通查询"""
+    print("=== 预备语句测试 ===")
+
+    cursor = FakeCursor()
+    store = make_pg_store(cursor, distance_metric="cosine")
+    for _ in range(3):
+        chunks = store.search_by_vector([0.6, 0.8, 0.0], top_k=5, mode="exact")
+    assert chunks[0].chunk_id == "c1" and chunks[0].metadata["similarity"] == 0.9
+
+    statements = [sql for sql, _ in cursor.executed]
+    prepares = [sql for sql in statements if sql.startswith("PREPARE")]
+    executes = [(sql, params) for sql, params in cursor.executed if sql.startswith("EXECUTE")]
+    assert len(prepares) == 1 and "$1::vector(3)" in prepares[0]
+    assert len(executes) == 3 and executes[0][1] == ("[0.6,0.8,0]",)
+    assert "LIMIT 5" in prepares[0]
+
+    # 不同的 top_k 使用各自的预备语句
+    store.search_by_vector([0.6, 0.8, 0.0], top_k=10, mode="exact")
+    prepares = [sql for sql, _ in cursor.executed if sql.startswith("PREPARE")]
+    assert len(prepares) == 2 and "LIMIT 10" in prepares[1]
+
+    cursor = FakeCursor()
+    store = make_pg_store(cursor, distance_metric="cosine", prepare_statements=False)
+    store.search_by_vector([0.6, 0.8, 0.0], top_k=5, mode="exact")
+    sql, params = cursor.executed[-1]
+    assert "$" not in sql and sql.count("%s") == 2 and "LIMIT 5" in sql
+    assert params == ["[0.6,0.8,0]", "[0.6,0.8,0]"]
+
+    print("✓ 预备语句测试通过")
+
+
+if __name__ == "__main__":
+    test_query_vector_sent_once()
+    test_prepared_once_per_connection()
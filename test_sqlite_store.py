@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 向量存储测试脚本
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlite_store import SqliteVectorStore
+from testing_fakes import make_chunks, make_local_store
+
+
+def test_search_matches_brute_force():
+    """测试 float16 存储下的检索结果与逐条计算一致，数据库为 WAL 模式"""
+    print("=== SQLite 检索正确性测试 ===")
+
+    rng = np.random.default_rng(0)
+    corpus = rng.normal(size=(50, 8)).astype(np.float32)
+    queries = rng.normal(size=(3, 8)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_local_store("sqlite", os.path.join(directory, "vectors.db"), distance_metric="cosine")
+        assert isinstance(store, SqliteVectorStore)
+        assert store.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        store.store_chunks(make_chunks(corpus))
+
+        stored = corpus.astype(np.float16).astype(np.float32)
+        for query, results in zip(queries, store.search_batch(queries.tolist(), top_k=5)):
+            expected = stored @ query / (np.linalg.norm(stored, axis=1) * np.linalg.norm(query))
+            order = np.argsort(-expected)[:5]
+            assert [chunk.chunk_id for chunk in results] == [f"doc_chunk_{i}" for i in order]
+            assert np.allclose([chunk.metadata["similarity"] for chunk in results], expected[order], atol=1e-4)
+            assert results[0].metadata["keywords"] == [str(order[0])]
+
+        stats = store.get_statistics()
+        assert stats["total_chunks"] == 50 and stats["vector_storage"] == "float16"
+        assert store.health_check()["table_exists"]
+        store.disconnect()
+
+    print("✓ SQLite 检索正确性测试通过")
+
+
+def test_upsert_delete_and_cache_reload():
+    """测试覆盖写入、清理过期文档块，以及其他连接提交后缓存矩阵重新加载"""
+    print("=== SQLite 写入和缓存测试 ===")
+
+    rng = np.random.default_rng(1)
+    corpus = rng.normal(size=(20, 8)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "vectors.db")
+        store = make_local_store("sqlite", path, distance_metric="l2")
+        store.store_chunks(make_chunks(corpus[:10], "a") + make_chunks(corpus[10:], "b"))
+        store.store_chunks(make_chunks(corpus[:2], "a"))
+        assert store.get_statistics()["total_chunks"] == 20
+        assert store.delete_stale_chunks("b", ["b_chunk_0", "b_chunk_1"]) == 8
+        assert store.get_chunk_ids("b") == ["b_chunk_0", "b_chunk_1"]
+        assert store.search_by_vector(corpus[3].tolist(), 1)[0].chunk_id == "a_chunk_3"
+
+        # 另一个连接（如另一个进程的入库）删除后，检索不会返回已删除的文档块
+        other = sqlite3.connect(path)
+        with other:
+            other.execute("DELETE FROM document_chunks WHERE chunk_id = 'a_chunk_3'")
+        other.close()
+        assert store.search_by_vector(corpus[3].tolist(), 1)[0].chunk_id != "a_chunk_3"
+
+        assert store.delete_document("a") == 9
+        assert [chunk.chunk_id for chunk in store.search_by_vector(corpus[10].tolist(), 5)] == ["b_chunk_0", "b_chunk_1"]
+        store.disconnect()
+
+    print("✓ SQLite 写入和缓存测试通过")
+
+
+if __name__ == "__main__":
+    test_search_matches_brute_force()
+    test_upsert_delete_and_cache_reload()
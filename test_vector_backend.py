@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量存储后端接口测试脚本
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from vector_backend import VectorStoreBackend, create_vector_store
+from vector_store import PgVectorStore, VectorStoreConfig
+from numpy_store import NumpyVectorStore
+from testing_fakes import FakeEmbedder, UNUSED_DATABASE_URL
+from local_store_cli import load_store_config
+from rag_cli.main import load_config
+
+
+def test_create_vector_store():
+    """测试按 backend 配置选择后端"""
+    print("=== 后端选择测试 ===")
+
+    with tempfile.TemporaryDirectory() as path:
+        config = VectorStoreConfig(database_url=UNUSED_DATABASE_URL, local_store_path=path)
+        assert isinstance(create_vector_store(config), PgVectorStore)
+
+        config.backend = "numpy"
+        store = create_vector_store(config)
+        assert isinstance(store, NumpyVectorStore) and isinstance(store, VectorStoreBackend)
+
+        config.backend = "faiss"
+        try:
+            create_vector_store(config)
+            assert False, "应拒绝未知后端"
+        except ValueError:
+            pass
+
+    print("✓ 后端选择测试通过")
+
+
+def test_embedding_is_shared_preprocessing():
+    """测试两个后端对向量化结果做相同的预处理（内积度量下归一化）"""
+    print("=== 向量预处理测试 ===")
+
+    with tempfile.TemporaryDirectory() as path:
+        config = VectorStoreConfig(database_url=UNUSED_DATABASE_URL, vector_dimension=2,
+                                   distance_metric="ip", local_store_path=path)
+        embedder = FakeEmbedder(default=[3.0, 4.0])
+        for backend in (PgVectorStore(config, embedder), NumpyVectorStore(config, embedder)):
+            assert backend.embed_text("文本") == [0.6, 0.8]
+            assert backend.embed_batch(["a", "b"]) == [[0.6, 0.8], [0.6, 0.8]]
+
+    print("✓ 向量预处理测试通过")
+
+
+def test_local_cli_uses_retriever_config():
+    """测试本地存储命令行读取 rag-cli 的配置文件，命令行参数只覆盖指定的项"""
+    print("=== 本地存储命令行配置测试 ===")
+
+    retriever_config = load_config().retriever_config.vector_store_config
+    config = load_store_config(local_store_path="/tmp/vectors", local_dtype=None)
+    assert config.local_store_path == "/tmp/vectors"
+    assert config.local_dtype == retriever_config.local_dtype
+    for name in ("distance_metric", "vector_dimension", "reduction_method", "reduced_dimension", "embedding_model"):
+        assert getattr(config, name) == getattr(retriever_config, name)
+
+    print("✓ 本地存储命令行配置测试通过")
+
+
+if __name__ == "__main__":
+    test_create_vector_store()
+    test_embedding_is_shared_preprocessing()
+    test_local_cli_uses_retriever_config()
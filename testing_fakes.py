@@ -0,0 +1,130 @@
+"""
+测试共用的替身对象
+不需要向量化服务和数据库的向量化客户端、文档块、本地存储和假游标，供各测试脚本导入
+"""
+
+from contextlib import contextmanager
+from typing import List, Optional, Dict
+
+from vector_backend import DocumentChunk, create_vector_store
+from vector_store import PgVectorStore, VectorStoreConfig
+
+# 只用于构造配置，不会真正连接
+UNUSED_DATABASE_URL = "postgresql://localhost:1/unused"
+
+
+class FakeEmbedder:
+    """按文本查表返回向量的向量化客户端，未登记的文本返回 default"""
+
+    embedding_cache = None
+
+    def __init__(self, vectors: Optional[Dict[str, List[float]]] = None, default: Optional[List[float]] = None):
+        self.vectors = vectors or {}
+        self.default = default
+
+    def embed_text(self, text: str) -> List[float]:
+        if text in self.vectors:
+            return self.vectors[text]
+        if self.default is None:
+            raise KeyError(text)
+        return self.default
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_text(text) for text in texts]
+
+    def health_check(self) -> bool:
+        return False
+
+
+def make_chunks(vectors, document_id: str = "doc") -> List[DocumentChunk]:
+    """为每个向量生成一个已向量化的文档块，ID 为 {document_id}_chunk_{i}"""
+    return [
+        DocumentChunk(content=f"内容{i}", metadata={"keywords": [str(i)]}, chunk_id=f"{document_id}_chunk_{i}",
+                      document_id=document_id, vector=list(map(float, vector)), embedding_model="test")
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def make_local_store(backend: str, path: str, embedder=None, **options):
+    """
+    创建并加载本地向量存储
+
+    Args:
+        backend: numpy 或 sqlite
+        path: numpy 的向量目录或 sqlite 的数据库文件
+        embedder: 向量化客户端，默认为 FakeEmbedder()
+        options: 其他 VectorStoreConfig 字段，vector_dimension 默认为 8
+    """
+    options.setdefault("vector_dimension", 8)
+    location = {"local_store_path": path} if backend == "numpy" else {"sqlite_path": path}
+    config = VectorStoreConfig(database_url=UNUSED_DATABASE_URL, backend=backend, **location, **options)
+    store = create_vector_store(config, embedder=embedder or FakeEmbedder())
+    store.connect()
+    return store
+
+
+class FakeCursor:
+    """记录执行的语句（空白压缩为单个空格），fetchone 返回 None，fetchall 返回给定的行"""
+
+    SEARCH_ROW = ("c1", "doc", "内容", {}, "test", None, 0.9)
+
+    def __init__(self, rows=None):
+        self.rows = rows if rows is not None else [self.SEARCH_ROW]
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def copy_expert(self, sql, buffer):
+        self.executed.append((" ".join(sql.split()), buffer.getvalue()))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchmany(self, size):
+        """按 size 依次返回给定的行，取完后返回空列表"""
+        fetched = getattr(self, "_fetched", 0)
+        self._fetched = fetched + size
+        return list(self.rows[fetched:fetched + size])
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """cursor() 总是返回同一个假游标，opened 记录每次取游标时的 (name, autocommit)"""
+
+    def __init__(self, cursor: FakeCursor):
+        self._cursor = cursor
+        self.autocommit = True
+        self.opened = []
+        self.commits = 0
+
+    def cursor(self, name=None):
+        self.opened.append((name, self.autocommit))
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def make_pg_store(cursor: Optional[FakeCursor] = None, **options) -> PgVectorStore:
+    """创建连接到假游标的 PgVectorStore（检索事务和普通查询都使用该游标），vector_dimension 默认为 3"""
+    options.setdefault("vector_dimension", 3)
+    store = PgVectorStore(VectorStoreConfig(database_url=UNUSED_DATABASE_URL, **options),
+                          embedder=FakeEmbedder())
+    if cursor is not None:
+        store.connection = FakeConnection(cursor)
+
+        @contextmanager
+        def transaction(cursor_name=None):
+            yield cursor
+
+        store._transaction = transaction
+    return store
@@ -0,0 +1,243 @@
+"""
+向量存储后端接口
+定义检索器依赖的后端操作（连接、批量写入、检索、批量检索、按文档删除、统计），
+以及各后端共用的文档块、查询参数和异常类型
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+
+# 迭代索引扫描模式（pgvector 0.8+）
+ITERATIVE_SCAN_MODES = ("off", "strict_order", "relaxed_order")
+# pgvector 接受的 hnsw.ef_search 上限
+MAX_EF_SEARCH = 1000
+VECTOR_BACKENDS = ("pgvector", "numpy", "sqlite")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_vector(vector: List[float]) -> List[float]:
+    """L2归一化向量（零向量原样返回）"""
+    norm = sum(v * v for v in vector) ** 0.5
+    if norm == 0:
+        return vector
+    return [v / norm for v in vector]
+
+
+@dataclass
+class SearchParams:
+    """单次查询的近似搜索参数（pgvector 后端通过 SET LOCAL 只在当前查询的事务内生效，精确检索的后端忽略）"""
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    iterative_scan: Optional[str] = None
+    # 只返回 id、分数和元数据，content 为 None，需要时用 fetch_chunks 按 chunk_id 批量读取
+    lazy_content: bool = False
+
+    def __post_init__(self):
+        if self.iterative_scan is not None and self.iterative_scan not in ITERATIVE_SCAN_MODES:
+            raise ValueError(f"不支持的迭代扫描模式: {self.iterative_scan}，可选 {'/'.join(ITERATIVE_SCAN_MODES)}")
+        for name in ("ef_search", "probes"):
+            value = getattr(self, name)
+            if value is not None and (not isinstance(value, int) or value <= 0):
+                raise ValueError(f"{name} 必须是正整数: {value}")
+        if self.ef_search is not None and self.ef_search > MAX_EF_SEARCH:
+            raise ValueError(f"ef_search 不能超过 {MAX_EF_SEARCH}: {self.ef_search}")
+
+
+@dataclass
+class DocumentChunk:
+    """文档块数据结构（扩展版本）"""
+    content: str
+    metadata: dict
+    chunk_id: str
+    document_id: str
+    vector: Optional[List[float]] = None
+    embedding_model: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class VectorStoreError(Exception):
+    """向量存储基础异常"""
+    pass
+
+
+class EmbeddingError(VectorStoreError):
+    """向量化异常"""
+    pass
+
+
+class DatabaseError(VectorStoreError):
+    """数据库操作异常"""
+    pass
+
+
+class ConnectionError(VectorStoreError):
+    """连接异常"""
+    pass
+
+
+class VectorStoreBackend(ABC):
+    """
+    向量存储后端基类
+
+    子类负责存储和检索；向量化由 embedder（EmbeddingClient）完成，
+    基类按配置对原始向量降维并在内积度量下归一化，保证入库和查询使用同一变换。
+    """
+
+    def __init__(self, config, embedder=None):
+        """
+        Args:
+            config: 向量存储配置
+            embedder: 向量化客户端，默认按配置创建 EmbeddingClient
+        """
+        if config.reduction_method not in ("none", "truncate", "pca"):
+            raise ValueError(f"不支持的降维方式: {config.reduction_method}")
+
+        from embedding_client import EmbeddingClient
+
+        self.config = config
+        self.embedder = embedder or EmbeddingClient(config)
+        self.reducer = self._create_reducer()
+
+    def _create_reducer(self):
+        """按配置创建降维变换（PCA 投影由后端加载或拟合）"""
+        if self.config.reduction_method == "none":
+            return None
+
+        # 只有启用降维时才需要 NumPy
+        from dim_reduction import DimensionReducer
+        return DimensionReducer(
+            self.config.reduction_method,
+            source_dimension=self.config.vector_dimension,
+            target_dimension=self.config.reduced_dimension or self.config.vector_dimension
+        )
+
+    @property
+    def stored_dimension(self) -> int:
+        """入库向量的维度（启用降维时为降维后的维度）"""
+        if self.reducer:
+            return self.reducer.target_dimension
+        return self.config.vector_dimension
+
+    # ---- 向量化 ----
+
+    def embed_text(self, text: str) -> List[float]:
+        """向量化文本，返回按配置降维和归一化后的向量"""
+        return self._prepare_vector(self.embedder.embed_text(text))
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """批量向量化文本，返回按配置降维和归一化后的向量"""
+        return self._prepare_vectors(self.embedder.embed_batch(texts))
+
+    def _prepare_vector(self, vector: List[float]) -> List[float]:
+        """将向量化服务返回的原始向量转换为入库/查询使用的向量"""
+        return self._prepare_vectors([vector])[0]
+
+    def _prepare_vectors(self, vectors: List[List[float]]) -> List[List[float]]:
+        """
+        批量预处理向量：先按配置降维，内积度量再做L2归一化
+
+        已经是入库维度的向量不会重复降维，零向量占位符保持为零向量。
+        """
+        if self.reducer:
+            if not self.reducer.fitted:
+                raise EmbeddingError("PCA投影尚未拟合，请先调用 fit_reduction() "
+                                     "或运行 vectorize_documents.py --reduction pca")
+
+            raw = [index for index, vector in enumerate(vectors)
+                   if len(vector) == self.config.vector_dimension and any(vector)]
+            reduced = self.reducer.transform_many([vectors[index] for index in raw])
+            prepared = [vector if len(vector) == self.stored_dimension else [0.0] * self.stored_dimension
+                        for vector in vectors]
+            for index, vector in zip(raw, reduced):
+                prepared[index] = vector
+            vectors = prepared
+
+        if self.config.distance_metric == "ip":
+            return [normalize_vector(vector) for vector in vectors]
+        return vectors
+
+    # ---- 后端操作 ----
+
+    @abstractmethod
+    def connect(self) -> bool:
+        """连接或加载存储"""
+
+    @abstractmethod
+    def disconnect(self):
+        """释放连接"""
+
+    @abstractmethod
+    def store_chunks(self, chunks: List[DocumentChunk]) -> bool:
+        """按 chunk_id 批量插入或更新已向量化的文档块"""
+
+    @abstractmethod
+    def search_by_vector(self, query_vector: List[float], top_k: int = 5,
+                         mode: Optional[str] = None, params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """按已预处理的查询向量检索，相似度写入 metadata["similarity"]；mode 为空时按配置选择"""
+
+    def search_batch(self, query_vectors: List[List[float]], top_k: int = 5,
+                     params: Optional[SearchParams] = None) -> List[List[DocumentChunk]]:
+        """批量检索，默认逐条调用 search_by_vector"""
+        return [self.search_by_vector(query_vector, top_k, params=params) for query_vector in query_vectors]
+
+    def search_similar(self, query: str, top_k: int = 5,
+                       params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """基于向量相似度搜索相关文档"""
+        try:
+            chunks = self.search_by_vector(self.embed_text(query), top_k, params=params)
+            logger.info(f"相似度搜索完成: 找到 {len(chunks)} 个相关文档块")
+            return chunks
+        except Exception as e:
+            logger.error(f"相似度搜索失败: {e}")
+            raise VectorStoreError(f"相似度搜索失败: {e}")
+
+    async def asearch_similar(self, query: str, top_k: int = 5,
+                              params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """
+        异步相似度搜索
+
+        默认在线程池中执行 search_similar，事件循环不被阻塞；后端有原生异步驱动时应覆盖此方法。
+        """
+        return await asyncio.to_thread(self.search_similar, query, top_k, params)
+
+    async def aclose(self):
+        """释放异步检索占用的资源（默认没有）"""
+
+    @abstractmethod
+    def fetch_chunks(self, chunk_ids: List[str]) -> Dict[str, DocumentChunk]:
+        """按 chunk_id 批量读取文档块（不含向量），返回 chunk_id -> 文档块，不存在的 id 不在结果中"""
+
+    @abstractmethod
+    def delete_document(self, document_id: str) -> int:
+        """删除某个文档的全部文档块，返回删除数量"""
+
+    @abstractmethod
+    def get_statistics(self) -> Dict[str, Any]:
+        """存储统计信息"""
+
+    @abstractmethod
+    def health_check(self) -> Dict[str, bool]:
+        """健康检查: database/embedding_service/table_exists"""
+
+
+def create_vector_store(config, embedder=None) -> VectorStoreBackend:
+    """按 config.backend 创建向量存储后端"""
+    backend = getattr(config, "backend", "pgvector")
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"不支持的向量存储后端: {backend}，可选 {'/'.join(VECTOR_BACKENDS)}")
+
+    if backend == "numpy":
+        # 只在使用本地后端时才需要 NumPy
+        from numpy_store import NumpyVectorStore
+        return NumpyVectorStore(config, embedder)
+    if backend == "sqlite":
+        from sqlite_store import SqliteVectorStore
+        return SqliteVectorStore(config, embedder)
+
+    from vector_store import PgVectorStore
+    return PgVectorStore(config, embedder)
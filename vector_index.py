@@ -0,0 +1,266 @@
+"""
+向量索引管理模块
+在批量导入完成后按实际行数构建或重建 IVFFlat/HNSW 索引，
+支持 CREATE INDEX CONCURRENTLY 和构建进度查询
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Callable
+
+import psycopg2
+
+from vector_store import PgVectorStore, ConnectionError, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_NAME = "idx_vector"
+BINARY_INDEX_NAME = "idx_vector_bit"
+
+
+@dataclass
+class IndexProgress:
+    """索引构建进度（来自 pg_stat_progress_create_index）"""
+    index_name: str
+    phase: str
+    blocks_done: int = 0
+    blocks_total: int = 0
+    tuples_done: int = 0
+    tuples_total: int = 0
+
+    @property
+    def percent(self) -> Optional[float]:
+        """当前阶段的完成百分比，无法估计时为 None"""
+        if self.tuples_total:
+            return self.tuples_done / self.tuples_total * 100
+        if self.blocks_total:
+            return self.blocks_done / self.blocks_total * 100
+        return None
+
+
+class VectorIndexManager:
+    """向量索引生命周期管理"""
+
+    def __init__(self, store: PgVectorStore):
+        """
+        Args:
+            store: 已连接的向量存储，用于查询索引状态和构建进度
+        """
+        self.store = store
+        self.table_name = store.config.table_name
+
+    def _cursor(self):
+        if not self.store.connection:
+            raise ConnectionError("数据库未连接")
+        return self.store.connection.cursor()
+
+    def row_count(self) -> int:
+        """表中已有向量的行数"""
+        cursor = self._cursor()
+        try:
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table_name} WHERE vector IS NOT NULL")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        列出表上的索引
+
+        Returns:
+            每个索引的名称、定义、大小和是否有效（CONCURRENTLY 构建失败会留下无效索引）
+        """
+        cursor = self._cursor()
+        try:
+            cursor.execute("""
+            SELECT c.relname, pg_get_indexdef(c.oid), pg_relation_size(c.oid), i.indisvalid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(%s)
+            ORDER BY c.relname
+            """, (self.table_name,))
+            return [
+                {
+                    "name": name,
+                    "definition": definition,
+                    "size_mb": round(size / 1024 / 1024, 2),
+                    "valid": valid
+                }
+                for name, definition, size, valid in cursor.fetchall()
+            ]
+        finally:
+            cursor.close()
+
+    def _existing_indexes(self) -> Dict[str, bool]:
+        """索引名称 -> 是否有效"""
+        return {index["name"]: index["valid"] for index in self.status()}
+
+    def _managed_indexes(self, row_count: int, concurrently: bool) -> Dict[str, Callable[[str], str]]:
+        """需要管理的向量索引及其建索引语句"""
+        indexes = {
+            VECTOR_INDEX_NAME: lambda name: self.store.vector_index_sql(name, row_count, concurrently)
+        }
+        if self.store.config.binary_quantization:
+            indexes[BINARY_INDEX_NAME] = lambda name: self.store.binary_index_sql(name, concurrently)
+        return indexes
+
+    def build(self, rebuild: bool = False, concurrently: bool = True,
+              on_progress: Optional[Callable[[IndexProgress], None]] = None,
+              poll_interval: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        构建向量索引
+
+        IVFFlat 的聚类数按当前行数推导。重建时先在新名称上构建，完成后再删除旧索引并改名，
+        重建期间旧索引继续服务查询；concurrently=True 时构建和删除都不阻塞读写。
+
+        Args:
+            rebuild: 已存在的索引是否重建
+            concurrently: 是否使用 CREATE/DROP INDEX CONCURRENTLY
+            on_progress: 进度回调，每 poll_interval 秒调用一次
+            poll_interval: 进度轮询间隔（秒）
+
+        Returns:
+            每个索引的处理结果
+        """
+        row_count = self.row_count()
+        existing = self._existing_indexes()
+        results = []
+
+        for name, make_sql in self._managed_indexes(row_count, concurrently).items():
+            valid = existing.get(name)
+            if valid and not rebuild:
+                results.append({"name": name, "status": "exists", "rows": row_count, "time": 0.0})
+                continue
+
+            # 无效索引（CONCURRENTLY 构建中断留下的）即使不要求重建也会被替换
+            target = name if valid is None else f"{name}_rebuild"
+            start_time = time.time()
+            self._execute_build(name, target, make_sql(target), concurrently, on_progress, poll_interval,
+                                replace=valid is not None)
+            elapsed = time.time() - start_time
+
+            status = "rebuilt" if valid is not None else "built"
+            logger.info(f"向量索引 {name} {status}: {row_count} 行, 耗时 {elapsed:.1f}s")
+            results.append({"name": name, "status": status, "rows": row_count, "time": elapsed})
+
+        return results
+
+    def drop(self, concurrently: bool = False) -> List[str]:
+        """删除向量索引（批量导入前调用，导入后用 build() 重新构建）"""
+        dropped = []
+        existing = self._existing_indexes()
+        for name in (VECTOR_INDEX_NAME, BINARY_INDEX_NAME):
+            if name not in existing:
+                continue
+            self._run_statements([f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}"])
+            dropped.append(name)
+        if dropped:
+            logger.info(f"已删除向量索引: {', '.join(dropped)}")
+        return dropped
+
+    def _build_connection(self):
+        """构建索引使用的独立连接（CONCURRENTLY 不能在事务块中执行）"""
+        connection = psycopg2.connect(self.store.config.database_url)
+        connection.autocommit = True
+        cursor = connection.cursor()
+        cursor.execute("SET maintenance_work_mem = %s", (self.store.config.maintenance_work_mem,))
+        cursor.execute("SET max_parallel_maintenance_workers = %s", (self.store.config.index_build_workers,))
+        cursor.close()
+        return connection
+
+    def _run_statements(self, statements: List[str]):
+        """在独立连接上依次执行语句"""
+        connection = self._build_connection()
+        try:
+            cursor = connection.cursor()
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.close()
+        finally:
+            connection.close()
+
+    def _execute_build(self, name: str, target: str, create_sql: str, concurrently: bool,
+                       on_progress: Optional[Callable[[IndexProgress], None]], poll_interval: float,
+                       replace: bool):
+        """在后台线程中构建索引，同时在当前连接上轮询构建进度"""
+        connection = self._build_connection()
+        backend_pid = connection.get_backend_pid()
+        errors: List[Exception] = []
+
+        def run():
+            cursor = connection.cursor()
+            try:
+                # 清理上次中断留下的临时索引
+                cursor.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {target}")
+                cursor.execute(create_sql)
+                if replace:
+                    cursor.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}")
+                    cursor.execute(f"ALTER INDEX {target} RENAME TO {name}")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                cursor.close()
+
+        worker = threading.Thread(target=run, name=f"build-{name}", daemon=True)
+        worker.start()
+        try:
+            while worker.is_alive():
+                worker.join(poll_interval)
+                if on_progress and worker.is_alive():
+                    progress = self.progress(backend_pid, name)
+                    if progress:
+                        on_progress(progress)
+        except KeyboardInterrupt:
+            # 取消服务端正在执行的构建
+            connection.cancel()
+            raise
+        finally:
+            worker.join()
+            connection.close()
+
+        if errors:
+            if target != name:
+                try:
+                    self._run_statements([f"DROP INDEX IF EXISTS {target}"])
+                except Exception:
+                    pass
+            logger.error(f"构建向量索引 {name} 失败: {errors[0]}")
+            raise DatabaseError(f"构建向量索引 {name} 失败: {errors[0]}")
+
+    def progress(self, backend_pid: Optional[int] = None, index_name: str = VECTOR_INDEX_NAME) -> Optional[IndexProgress]:
+        """
+        查询索引构建进度
+
+        Args:
+            backend_pid: 执行构建的后端进程，为空时取该表上任意一个正在进行的构建
+            index_name: 报告中使用的索引名称
+        """
+        cursor = self._cursor()
+        try:
+            sql = """
+            SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+            FROM pg_stat_progress_create_index
+            WHERE relid = to_regclass(%s)
+            """
+            params = [self.table_name]
+            if backend_pid is not None:
+                sql += " AND pid = %s"
+                params.append(backend_pid)
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+
+        if not row:
+            return None
+        return IndexProgress(index_name, row[0], *(value or 0 for value in row[1:]))
+
+
+def print_index_status(indexes: List[Dict[str, Any]]):
+    """打印索引状态"""
+    for index in indexes:
+        flag = "✓" if index["valid"] else "❌ 无效"
+        print(f"{flag} {index['name']} ({index['size_mb']}MB)")
+        print(f"    {index['definition']}")
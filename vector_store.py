@@ -3,16 +3,36 @@
 实现文档块的向量化存储到pgvector数据库
 """
 
+import io
 import os
+import re
+import csv
+import asyncio
+import hashlib
 import json
 import time
+import random
+import struct
 import logging
-from datetime import datetime
+from contextlib import contextmanager
 from typing import List, Optional, Dict, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 import psycopg2
-from psycopg2.extras import Json
-import requests
+from psycopg2.extras import Json, execute_values
+
+from embedding_client import EmbeddingClient
+from pg_pool import PgConnectionPool, get_pool
+# 文档块、查询参数和异常类型定义在 vector_backend 中，这里重新导出以兼容原有的导入路径
+from vector_backend import (VectorStoreBackend, DocumentChunk, SearchParams, ITERATIVE_SCAN_MODES, MAX_EF_SEARCH,
+                            normalize_vector, VectorStoreError, EmbeddingError, DatabaseError, ConnectionError)
+
+__all__ = [
+    "VectorStoreConfig", "PgVectorStore", "vector_literal",
+    "MAX_VECTOR_INDEX_DIMENSION", "VECTOR_STORAGE_TYPES", "DISTANCE_OPERATORS", "DISTANCE_OPCLASSES", "DEFAULT_EF_SEARCH",
+    # 从 vector_backend 重新导出
+    "VectorStoreBackend", "DocumentChunk", "SearchParams", "ITERATIVE_SCAN_MODES", "MAX_EF_SEARCH", "normalize_vector",
+    "VectorStoreError", "EmbeddingError", "DatabaseError", "ConnectionError",
+]
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -29,80 +49,386 @@ class VectorStoreConfig:
     vector_dimension: int = 2560  # qwen3-embedding:4b的实际向量维度
     batch_size: int = 100
     timeout: int = 30
+    embedding_concurrency: int = 4  # 同时在途的向量化请求数
+    use_batch_endpoint: bool = False  # 使用多输入的 /api/embed 接口（返回归一化向量，切换后需重新入库）
+    embedding_cache_path: Optional[str] = None  # 向量缓存文件路径，为空时不启用缓存
+    embedding_cache_max_mb: int = 1024
+    bulk_write: bool = True  # store_chunks 使用 COPY + 合并的批量写入
+    write_batch_size: int = 1000  # 每次 COPY 合并的行数
+    copy_format: str = "binary"  # COPY 格式: binary/csv
+    vector_storage: str = "vector"  # 向量列类型: vector(float4)/halfvec(float2)
+    binary_quantization: bool = False  # 二值量化候选检索 + 全精度精确重排
+    binary_oversample: int = 4  # 二值量化检索的候选数量 = top_k * binary_oversample
+    distance_metric: str = "l2"  # 距离度量: l2/cosine/ip（ip 会在向量化后做L2归一化）
+    reduction_method: str = "none"  # 降维方式: none/truncate(Matryoshka前缀截断)/pca
+    reduced_dimension: Optional[int] = None  # 降维后的存储维度
+    pca_sample_size: int = 5000  # 拟合PCA使用的最大样本数
+    index_method: str = "auto"  # 向量索引: auto(2000维以内IVFFlat，否则HNSW)/ivfflat/hnsw
+    ivfflat_lists: Optional[int] = None  # IVFFlat 聚类数，为空时按行数推导
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    maintenance_work_mem: str = "1GB"  # 构建索引时的 maintenance_work_mem
+    index_build_workers: int = 2  # 构建索引时的 max_parallel_maintenance_workers
+    pool_min_size: int = 1  # 共享连接池保持打开的最少连接数
+    pool_max_size: int = 10  # 共享连接池的最多连接数
+    pool_timeout: float = 30.0  # 连接全部被占用时等待归还的秒数
+    pool_check_interval: float = 30.0  # 空闲超过该秒数的连接取出时先执行 SELECT 1 检查
+    backend: str = "pgvector"  # 检索后端: pgvector/numpy（本地内存矩阵精确检索）/sqlite（单文件嵌入式存储）
+    local_store_path: str = "~/.rag_cli/vectors"  # numpy 后端的向量目录
+    local_dtype: str = "float32"  # numpy/sqlite 后端内存矩阵的类型: float32/float16(体积减半，检索时分块转换)
+    local_index: str = "flat"  # numpy 后端的检索方式: flat(精确)/ivf(只扫描最近的聚类)
+    local_ivf_lists: Optional[int] = None  # 本地 IVF 聚类数，为空时为 4*sqrt(行数)
+    local_ivf_probes: int = 8  # 本地 IVF 查询时扫描的聚类数（可被 SearchParams.probes 覆盖）
+    sqlite_path: str = "~/.rag_cli/vectors.db"  # sqlite 后端的数据库文件（WAL 模式，向量以 float16 BLOB 保存）
+    prepare_statements: bool = True  # 检索语句使用服务端预备语句（经过事务级 PgBouncer 时关闭）
+    force_vector_update: bool = False  # 写入时无条件覆盖已有行的向量（重新向量化、转换存储或降维时使用）
+
+
+# pgvector 中 vector 类型的 HNSW/IVFFlat 索引最多支持 2000 维，halfvec 最多支持 4000 维
+MAX_VECTOR_INDEX_DIMENSION = 2000
+VECTOR_STORAGE_TYPES = ("vector", "halfvec")
+
+# 距离度量对应的 pgvector 运算符和索引操作符类后缀
+DISTANCE_OPERATORS = {"l2": "<->", "cosine": "<=>", "ip": "<#>"}
+DISTANCE_OPCLASSES = {"l2": "l2_ops", "cosine": "cosine_ops", "ip": "ip_ops"}
+
+# pgvector 的 hnsw.ef_search 默认值
+DEFAULT_EF_SEARCH = 40
+
+# 检索语句中的 $n 占位符
+_PARAM_PATTERN = re.compile(r"\$(\d+)")
+
+
+def vector_literal(vector: List[float]) -> str:
+    """
+    pgvector 的文本格式 [x1,x2,...]
+
+    9 位有效数字足以精确还原 float4，比 psycopg2 把列表渲染成 ARRAY[...] 短得多，
+    服务端直接由 vector 的输入函数解析，不经过 numeric[] 到 vector 的转换。
+    """
+    return "[" + ",".join("%.9g" % value for value in vector) + "]"
+
+
+class PgVectorStore(VectorStoreBackend):
+    """基于pgvector的向量存储实现"""
 
+    def __init__(self, config: VectorStoreConfig, embedder: Optional[EmbeddingClient] = None):
+        if config.vector_storage not in VECTOR_STORAGE_TYPES:
+            raise ValueError(f"不支持的向量存储类型: {config.vector_storage}")
+        if config.distance_metric not in DISTANCE_OPERATORS:
+            raise ValueError(f"不支持的距离度量: {config.distance_metric}")
+        if config.index_method not in ("auto", "ivfflat", "hnsw"):
+            raise ValueError(f"不支持的向量索引方式: {config.index_method}")
 
-@dataclass
-class DocumentChunk:
-    """文档块数据结构（扩展版本）"""
-    content: str
-    metadata: dict
-    chunk_id: str
-    document_id: str
-    vector: Optional[List[float]] = None
-    embedding_model: Optional[str] = None
-    created_at: Optional[datetime] = None
+        super().__init__(config, embedder)
+        self.pool: Optional[PgConnectionPool] = None
+        self.connection = None
+        # 当前连接上已经 PREPARE 的检索语句（预备语句属于会话，换连接后重新准备）
+        self._prepared_statements = set()
+        # 异步检索：asyncpg 连接池绑定创建它的事件循环，每个事件循环一个
+        self._async_stores: Dict[asyncio.AbstractEventLoop, Any] = {}
 
+    @property
+    def embedding_cache(self):
+        """向量化客户端的持久化缓存"""
+        return self.embedder.embedding_cache
+
+    @property
+    def last_embedding_stats(self) -> Dict[str, Any]:
+        """最近一次批量向量化的统计信息"""
+        return self.embedder.last_embedding_stats
+
+    def connect(self) -> bool:
+        """
+        从共享连接池取出一个连接（PostgreSQL + pgvector）
+
+        可以重复调用：已持有的连接健康时直接返回，失效时归还并重新取出，不会泄漏连接。
+        """
+        if self.connection is not None:
+            if self._connection_alive():
+                return True
+            logger.warning("数据库连接已失效，重新连接")
+            self.pool.putconn(self.connection, close=True)
+            self.connection = None
 
-class VectorStoreError(Exception):
-    """向量存储基础异常"""
-    pass
+        try:
+            self.pool = get_pool(self.config.database_url, self.config.pool_min_size, self.config.pool_max_size,
+                                 self.config.pool_timeout, self.config.pool_check_interval)
+            self.connection = self.pool.getconn()
+            self._prepared_statements = set()
+            logger.info("成功连接到向量数据库")
+        except Exception as e:
+            logger.error(f"数据库连接失败: {e}")
+            raise ConnectionError(f"数据库连接失败: {e}")
 
+        self._ensure_pgvector_extension()
 
-class EmbeddingError(VectorStoreError):
-    """向量化异常"""
-    pass
+        if self.reducer and not self.reducer.fitted:
+            self._load_reducer()
+        return True
 
+    def _connection_alive(self) -> bool:
+        """检查当前持有的连接"""
+        if self.connection.closed:
+            return False
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except Exception:
+            return False
 
-class DatabaseError(VectorStoreError):
-    """数据库操作异常"""
-    pass
+    def disconnect(self):
+        """把连接归还到连接池"""
+        if self.connection is not None:
+            self.pool.putconn(self.connection)
+            self.connection = None
+            logger.info("数据库连接已归还")
+
+    @property
+    def reduction_table(self) -> str:
+        """保存PCA投影的表"""
+        return f"{self.config.table_name}_reduction"
+
+    def _load_reducer(self) -> bool:
+        """从数据库加载已拟合的PCA投影"""
+        from dim_reduction import DimensionReducer
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT to_regclass(%s)", (self.reduction_table,))
+            if cursor.fetchone()[0] is None:
+                return False
 
+            cursor.execute(f"SELECT data FROM {self.reduction_table} WHERE id = 1")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
 
-class ConnectionError(VectorStoreError):
-    """连接异常"""
-    pass
+        if not row:
+            return False
 
+        reducer = DimensionReducer.from_bytes(bytes(row[0]))
+        if (reducer.source_dimension, reducer.target_dimension) != (self.reducer.source_dimension,
+                                                                    self.reducer.target_dimension):
+            logger.warning(f"已保存的PCA投影维度 {reducer.source_dimension}->{reducer.target_dimension} "
+                           f"与配置不一致，需要重新拟合")
+            return False
 
-class PgVectorStore:
-    """基于pgvector的向量存储实现"""
+        self.reducer = reducer
+        logger.info(f"已加载PCA投影: {reducer.source_dimension} -> {reducer.target_dimension} 维")
+        return True
 
-    def __init__(self, config: VectorStoreConfig):
-        self.config = config
-        self.connection = None
-        self._ensure_pgvector_extension()
+    def fit_reduction(self, texts: List[str], force: bool = False) -> bool:
+        """
+        在文本样本上拟合PCA投影并保存到数据库
+
+        投影决定了已入库向量的坐标系，重新拟合（force=True）后必须重建表并重新入库。
+
+        Args:
+            texts: 样本文本，超过 pca_sample_size 时随机抽样
+            force: 已有投影时是否重新拟合
+
+        Returns:
+            是否进行了拟合
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+        if self.config.reduction_method != "pca":
+            raise ValueError("只有 pca 降维方式需要拟合")
+        if self.reducer.fitted and not force:
+            logger.info("PCA投影已存在，跳过拟合")
+            return False
+
+        sample = texts
+        if len(texts) > self.config.pca_sample_size:
+            sample = random.Random(0).sample(texts, self.config.pca_sample_size)
+
+        # 拟合使用原始维度的向量，失败的零向量占位符不参与
+        vectors = [vector for vector in self.embedder.embed_batch(sample) if any(vector)]
+        self.reducer.fit(vectors)
 
-    def connect(self) -> bool:
-        """连接PostgreSQL + pgvector数据库"""
         try:
-            self.connection = psycopg2.connect(self.config.database_url)
-            self.connection.autocommit = True
-            logger.info("成功连接到向量数据库")
-            return True
+            with self._transaction() as cursor:
+                cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.reduction_table} (
+                    id INTEGER PRIMARY KEY,
+                    method VARCHAR(20) NOT NULL,
+                    source_dimension INTEGER NOT NULL,
+                    target_dimension INTEGER NOT NULL,
+                    data BYTEA NOT NULL,
+                    fitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """)
+                cursor.execute(f"""
+                INSERT INTO {self.reduction_table} (id, method, source_dimension, target_dimension, data)
+                VALUES (1, %s, %s, %s, %s)
+                ON CONFLICT (id) DO UPDATE SET
+                    method = EXCLUDED.method,
+                    source_dimension = EXCLUDED.source_dimension,
+                    target_dimension = EXCLUDED.target_dimension,
+                    data = EXCLUDED.data,
+                    fitted_at = CURRENT_TIMESTAMP
+                """, (self.reducer.method, self.reducer.source_dimension, self.reducer.target_dimension,
+                      psycopg2.Binary(self.reducer.to_bytes())))
         except Exception as e:
-            logger.error(f"数据库连接失败: {e}")
-            raise ConnectionError(f"数据库连接失败: {e}")
+            logger.error(f"保存PCA投影失败: {e}")
+            raise DatabaseError(f"保存PCA投影失败: {e}")
 
-    def disconnect(self):
-        """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
-            logger.info("数据库连接已关闭")
+        return True
+
+    @contextmanager
+    def _transaction(self, cursor_name: Optional[str] = None):
+        """
+        在 autocommit 连接上开启显式事务，退出时提交，异常时回滚
+
+        Args:
+            cursor_name: 给定时使用服务端命名游标（只能在事务内使用）
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        previous_autocommit = self.connection.autocommit
+        self.connection.autocommit = False
+        cursor = self.connection.cursor(name=cursor_name) if cursor_name else self.connection.cursor()
+        try:
+            yield cursor
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            self.connection.autocommit = previous_autocommit
 
     def _ensure_pgvector_extension(self):
-        """确保pgvector扩展已安装"""
+        """确保pgvector扩展已安装（在连接后执行，只做向量化时不访问数据库）"""
         try:
-            conn = psycopg2.connect(self.config.database_url)
-            conn.autocommit = True
-            cursor = conn.cursor()
+            cursor = self.connection.cursor()
             cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
             cursor.close()
-            conn.close()
             logger.info("pgvector扩展已确保安装")
         except Exception as e:
             logger.warning(f"pgvector扩展检查失败: {e}")
 
-    def create_table(self, force_recreate: bool = False) -> bool:
-        """创建支持向量的文档块表"""
+    @property
+    def column_type(self) -> str:
+        """向量列的完整类型，如 halfvec(2560)"""
+        return f"{self.config.vector_storage}({self.stored_dimension})"
+
+    @property
+    def index_type(self) -> str:
+        """
+        向量索引使用的类型
+
+        vector 列超过索引维度上限时，按 halfvec 表达式建索引，查询使用同一表达式
+        """
+        if self.config.vector_storage == "vector" and self.stored_dimension > MAX_VECTOR_INDEX_DIMENSION:
+            return f"halfvec({self.stored_dimension})"
+        return self.column_type
+
+    @property
+    def vector_expression(self) -> str:
+        """向量索引和距离排序使用的表达式"""
+        if self.index_type == self.column_type:
+            return "vector"
+        return f"(vector::{self.index_type})"
+
+    @property
+    def distance_operator(self) -> str:
+        """当前距离度量的 pgvector 运算符"""
+        return DISTANCE_OPERATORS[self.config.distance_metric]
+
+    def similarity_sql(self, distance_sql: str) -> str:
+        """
+        将距离表达式转换为相似度分数
+
+        cosine: 1 - 余弦距离，即余弦相似度 [-1, 1]；
+        ip: <#> 返回负内积，取反后为内积（归一化向量上等于余弦相似度）；
+        l2: 1 / (1 + 欧氏距离)，范围 (0, 1]，只用于排序展示
+        """
+        if self.config.distance_metric == "cosine":
+            return f"(1 - ({distance_sql}))"
+        if self.config.distance_metric == "ip":
+            return f"(-({distance_sql}))"
+        return f"(1 / (1 + ({distance_sql})))"
+
+    @property
+    def binary_expression(self) -> str:
+        """二值量化索引使用的表达式"""
+        return f"(binary_quantize(vector)::bit({self.stored_dimension}))"
+
+    @property
+    def index_opclass(self) -> str:
+        """向量索引的操作符类，与索引类型和距离度量对应"""
+        return f"{self.index_type.split('(')[0]}_{DISTANCE_OPCLASSES[self.config.distance_metric]}"
+
+    @property
+    def index_method(self) -> str:
+        """向量索引的访问方法（auto 时2000维以内用IVFFlat，否则用HNSW）"""
+        if self.config.index_method != "auto":
+            return self.config.index_method
+        return "ivfflat" if self.stored_dimension <= MAX_VECTOR_INDEX_DIMENSION else "hnsw"
+
+    def ivfflat_lists(self, row_count: Optional[int] = None) -> int:
+        """
+        IVFFlat 聚类数
+
+        未配置时按 pgvector 的建议推导：100万行以内为 行数/1000，超过后为 sqrt(行数)；
+        行数未知（空表建索引）时使用 100。
+        """
+        if self.config.ivfflat_lists:
+            return self.config.ivfflat_lists
+        if row_count is None:
+            return 100
+        if row_count <= 1000000:
+            return max(1, row_count // 1000)
+        return int(row_count ** 0.5)
+
+    def vector_index_sql(self, name: str = "idx_vector", row_count: Optional[int] = None,
+                         concurrently: bool = False) -> str:
+        """生成向量索引的 CREATE INDEX 语句"""
+        if self.index_method == "ivfflat":
+            access_method = "ivfflat"
+            options = f"lists = {self.ivfflat_lists(row_count)}"
+        else:
+            access_method = "hnsw"
+            options = f"m = {self.config.hnsw_m}, ef_construction = {self.config.hnsw_ef_construction}"
+
+        return f"""
+        CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name}
+        ON {self.config.table_name}
+        USING {access_method} ({self.vector_expression} {self.index_opclass})
+        WITH ({options})
+        """
+
+    def binary_index_sql(self, name: str = "idx_vector_bit", concurrently: bool = False) -> str:
+        """生成二值量化向量的汉明距离HNSW索引语句（每维1比特，体积约为float4索引的1/32）"""
+        return f"""
+        CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name}
+        ON {self.config.table_name}
+        USING hnsw ({self.binary_expression} bit_hamming_ops)
+        WITH (m = {self.config.hnsw_m}, ef_construction = {self.config.hnsw_ef_construction})
+        """
+
+    def _create_binary_index(self, cursor):
+        """创建二值量化索引"""
+        cursor.execute(self.binary_index_sql())
+
+    def _create_vector_index(self, cursor):
+        """创建向量索引"""
+        cursor.execute(self.vector_index_sql())
+
+    def create_table(self, force_recreate: bool = False, create_vector_index: bool = True) -> bool:
+        """
+        创建支持向量的文档块表
+
+        Args:
+            force_recreate: 是否删除并重建表
+            create_vector_index: 是否同时创建向量索引。批量导入时应关闭，导入完成后用
+                                 VectorIndexManager.build() 按实际行数构建索引
+        """
         if not self.connection:
             raise ConnectionError("数据库未连接")
 
@@ -122,7 +448,7 @@ class PgVectorStore:
                 document_id VARCHAR(255) NOT NULL,
                 content TEXT NOT NULL,
                 metadata JSONB,
-                vector VECTOR({self.config.vector_dimension}),
+                vector {self.column_type.upper()},
                 embedding_model VARCHAR(100),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
@@ -135,28 +461,20 @@ class PgVectorStore:
             cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_created_at ON {self.config.table_name} (created_at)")
 
             # 创建向量索引（对于高维向量使用HNSW）
-            try:
-                if self.config.vector_dimension <= 2000:
-                    # 对于2000维以下的向量使用IVFFlat
-                    create_index_sql = f"""
-                    CREATE INDEX IF NOT EXISTS idx_vector
-                    ON {self.config.table_name}
-                    USING ivfflat (vector vector_l2_ops)
-                    WITH (lists = 100)
-                    """
-                else:
-                    # 对于高维向量使用HNSW
-                    create_index_sql = f"""
-                    CREATE INDEX IF NOT EXISTS idx_vector
-                    ON {self.config.table_name}
-                    USING hnsw (vector vector_l2_ops)
-                    WITH (m = 16, ef_construction = 64)
-                    """
-                cursor.execute(create_index_sql)
-                logger.info("向量索引创建成功")
-            except Exception as e:
-                logger.warning(f"向量索引创建失败，将使用顺序扫描: {e}")
-                # 如果索引创建失败，仍然继续，只是性能会受影响
+            if create_vector_index:
+                try:
+                    self._create_vector_index(cursor)
+                    logger.info(f"向量索引创建成功: {self.index_method} {self.vector_expression} ({self.index_type})")
+                except Exception as e:
+                    logger.warning(f"向量索引创建失败，将使用顺序扫描: {e}")
+                    # 如果索引创建失败，仍然继续，只是性能会受影响
+
+            if create_vector_index and self.config.binary_quantization:
+                try:
+                    self._create_binary_index(cursor)
+                    logger.info("二值量化索引创建成功")
+                except Exception as e:
+                    logger.warning(f"二值量化索引创建失败（需要 pgvector 0.7+）: {e}")
 
             cursor.close()
             logger.info(f"表 {self.config.table_name} 创建成功")
@@ -166,50 +484,91 @@ class PgVectorStore:
             logger.error(f"创建表失败: {e}")
             raise DatabaseError(f"创建表失败: {e}")
 
-    def embed_text(self, text: str) -> List[float]:
-        """使用Ollama的embedding模型向量化文本"""
-        try:
-            payload = {
-                "model": self.config.embedding_model,
-                "prompt": text
-            }
+    def migrate_vector_storage(self) -> bool:
+        """
+        将已有表的向量列转换为配置的存储类型，并按配置的距离度量重建向量索引
 
-            response = requests.post(
-                self.config.embedding_endpoint,
-                json=payload,
-                timeout=self.config.timeout
-            )
+        Returns:
+            是否执行了转换（列类型已一致时返回False）
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        try:
+            current_type = self._current_column_type()
+            index_definition = self._current_index_definition()
+            index_matches = index_definition is not None and self.index_opclass in index_definition
+            if current_type == self.column_type and index_matches:
+                logger.info(f"向量列已是 {current_type}，索引操作符类为 {self.index_opclass}，无需转换")
+                return False
+
+            with self._transaction() as cursor:
+                cursor.execute("DROP INDEX IF EXISTS idx_vector")
+                if current_type != self.column_type:
+                    cursor.execute("DROP INDEX IF EXISTS idx_vector_bit")
+                    cursor.execute(f"""
+                    ALTER TABLE {self.config.table_name}
+                    ALTER COLUMN vector TYPE {self.column_type}
+                    USING vector::{self.column_type}
+                    """)
+                    if self.config.binary_quantization:
+                        self._create_binary_index(cursor)
+                if self.config.distance_metric == "ip":
+                    # 内积度量要求向量已归一化，对已有向量原地归一化
+                    cursor.execute(f"UPDATE {self.config.table_name} SET vector = l2_normalize(vector)")
+                self._create_vector_index(cursor)
+
+            logger.info(f"向量列已从 {current_type} 转换为 {self.column_type}，索引操作符类 {self.index_opclass}")
+            return True
 
-            if response.status_code == 200:
-                result = response.json()
-                embedding = result.get("embedding", [])
+        except Exception as e:
+            logger.error(f"转换向量存储类型失败: {e}")
+            raise DatabaseError(f"转换向量存储类型失败: {e}")
 
-                if len(embedding) != self.config.vector_dimension:
-                    logger.warning(f"向量维度不匹配: 期望{self.config.vector_dimension}, 实际{len(embedding)}")
+    def _current_index_definition(self) -> Optional[str]:
+        """查询数据库中向量索引的定义"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname = 'idx_vector'",
+                (self.config.table_name,)
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
 
-                return embedding
-            else:
-                logger.error(f"向量化请求失败: {response.status_code} - {response.text}")
-                raise EmbeddingError(f"向量化请求失败: {response.status_code}")
+    def _current_column_type(self) -> Optional[str]:
+        """查询数据库中向量列的实际类型"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+            SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+            WHERE attrelid = to_regclass(%s) AND attname = 'vector' AND NOT attisdropped
+            """, (self.config.table_name,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"向量化服务连接失败: {e}")
-            raise EmbeddingError(f"向量化服务连接失败: {e}")
+    def _upsert_clause(self) -> str:
+        """
+        写入时 chunk_id 冲突的处理：内容、元数据和模型都未变化的行跳过，不产生新的行版本
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """批量向量化文本"""
-        embeddings = []
-        for text in texts:
-            try:
-                embedding = self.embed_text(text)
-                embeddings.append(embedding)
-                # 避免频繁请求导致服务过载
-                time.sleep(0.1)
-            except EmbeddingError as e:
-                logger.error(f"批量向量化失败: {e}")
-                # 对于失败的文本，使用零向量作为占位符
-                embeddings.append([0.0] * self.config.vector_dimension)
-        return embeddings
+        向量不参与比较：缓存命中的向量经过 float16 往返，与库中的向量不完全相同。
+        转换向量存储、距离度量或降维时设置 force_vector_update，无条件覆盖向量。
+        """
+        table = self.config.table_name
+        clause = """ON CONFLICT (chunk_id) DO UPDATE SET
+                content = EXCLUDED.content,
+                metadata = EXCLUDED.metadata,
+                vector = EXCLUDED.vector,
+                embedding_model = EXCLUDED.embedding_model"""
+        if self.config.force_vector_update:
+            return clause
+        return clause + f"""
+            WHERE ({table}.content, {table}.metadata, {table}.embedding_model)
+                IS DISTINCT FROM (EXCLUDED.content, EXCLUDED.metadata, EXCLUDED.embedding_model)"""
 
     def store_chunk(self, chunk: DocumentChunk) -> bool:
         """存储单个文档块"""
@@ -228,11 +587,7 @@ class PgVectorStore:
             INSERT INTO {self.config.table_name}
             (chunk_id, document_id, content, metadata, vector, embedding_model)
             VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (chunk_id) DO UPDATE SET
-                content = EXCLUDED.content,
-                metadata = EXCLUDED.metadata,
-                vector = EXCLUDED.vector,
-                embedding_model = EXCLUDED.embedding_model
+            {self._upsert_clause()}
             """
 
             cursor.execute(insert_sql, (
@@ -254,6 +609,15 @@ class PgVectorStore:
 
     def store_chunks(self, chunks: List[DocumentChunk]) -> bool:
         """批量存储文档块"""
+        if self.config.bulk_write and chunks:
+            try:
+                stored = self.bulk_store_chunks(chunks)
+                expected = len({chunk.chunk_id for chunk in chunks})
+                logger.info(f"批量存储完成: {stored}/{expected} 成功")
+                return stored == expected
+            except DatabaseError as e:
+                logger.warning(f"COPY 批量写入失败，回退到逐条写入: {e}")
+
         success_count = 0
         for chunk in chunks:
             try:
@@ -265,6 +629,127 @@ class PgVectorStore:
         logger.info(f"批量存储完成: {success_count}/{len(chunks)} 成功")
         return success_count == len(chunks)
 
+    def bulk_store_chunks(self, chunks: List[DocumentChunk]) -> int:
+        """
+        通过 COPY 批量写入文档块
+
+        在一个事务内将文档块按 write_batch_size 分批 COPY 到临时暂存表，
+        每批用一条 INSERT ... SELECT ... ON CONFLICT 合并到目标表。
+
+        Args:
+            chunks: 文档块列表，缺少向量的文档块会先批量向量化
+
+        Returns:
+            写入的文档块数量（重复的 chunk_id 只计一次，向量化后仍没有向量的文档块不写入）
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        # 同一批次内 chunk_id 重复会导致 ON CONFLICT 报错，保留最后一次出现的文档块
+        unique_chunks = list({chunk.chunk_id: chunk for chunk in chunks}.values())
+
+        missing = [chunk for chunk in unique_chunks if chunk.vector is None]
+        if missing:
+            embeddings = self.embed_batch([chunk.content for chunk in missing])
+            for chunk, embedding in zip(missing, embeddings):
+                chunk.vector = embedding
+                chunk.embedding_model = self.config.embedding_model
+
+        skipped = [chunk.chunk_id for chunk in unique_chunks if chunk.vector is None]
+        if skipped:
+            logger.warning(f"{len(skipped)} 个文档块没有向量，未写入: {', '.join(skipped[:5])}")
+            unique_chunks = [chunk for chunk in unique_chunks if chunk.vector is not None]
+
+        staging_table = f"{self.config.table_name}_staging"
+        columns = "chunk_id, document_id, content, metadata, vector, embedding_model"
+        batch_size = max(1, self.config.write_batch_size)
+        binary = self.config.copy_format == "binary"
+
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {staging_table} (
+                    chunk_id VARCHAR(255),
+                    document_id VARCHAR(255),
+                    content TEXT,
+                    metadata JSONB,
+                    vector {self.column_type.upper()},
+                    embedding_model VARCHAR(100)
+                ) ON COMMIT DROP
+                """)
+
+                for start in range(0, len(unique_chunks), batch_size):
+                    batch = unique_chunks[start:start + batch_size]
+                    cursor.execute(f"TRUNCATE {staging_table}")
+
+                    if binary:
+                        buffer = self._encode_copy_binary(batch)
+                        copy_sql = f"COPY {staging_table} ({columns}) FROM STDIN WITH (FORMAT binary)"
+                    else:
+                        buffer = self._encode_copy_csv(batch)
+                        copy_sql = f"COPY {staging_table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+                    cursor.copy_expert(copy_sql, buffer)
+
+                    cursor.execute(f"""
+                    INSERT INTO {self.config.table_name} ({columns})
+                    SELECT {columns} FROM {staging_table}
+                    {self._upsert_clause()}
+                    """)
+
+            return len(unique_chunks)
+
+        except Exception as e:
+            logger.error(f"COPY 批量写入失败: {e}")
+            raise DatabaseError(f"COPY 批量写入失败: {e}")
+
+    def _encode_copy_binary(self, chunks: List[DocumentChunk]) -> io.BytesIO:
+        """将文档块编码为 PostgreSQL 二进制 COPY 格式"""
+        buffer = io.BytesIO()
+        # 文件头: 签名 + 标志位 + 头扩展长度
+        buffer.write(b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0))
+        element_format = "e" if self.config.vector_storage == "halfvec" else "f"
+
+        def write_field(data: Optional[bytes]):
+            if data is None:
+                buffer.write(struct.pack(">i", -1))
+            else:
+                buffer.write(struct.pack(">i", len(data)))
+                buffer.write(data)
+
+        for chunk in chunks:
+            buffer.write(struct.pack(">h", 6))
+            write_field(chunk.chunk_id.encode("utf-8"))
+            write_field(chunk.document_id.encode("utf-8"))
+            write_field(chunk.content.encode("utf-8"))
+            # jsonb 二进制格式: 版本号 1 + JSON 文本
+            write_field(b"\x01" + json.dumps(chunk.metadata or {}, ensure_ascii=False).encode("utf-8"))
+            # vector/halfvec 二进制格式: int16 维度 + int16 保留位 + float4/float2 数组
+            if chunk.vector is None:
+                write_field(None)
+            else:
+                write_field(struct.pack(f">hh{len(chunk.vector)}{element_format}", len(chunk.vector), 0, *chunk.vector))
+            write_field(chunk.embedding_model.encode("utf-8") if chunk.embedding_model else None)
+
+        buffer.write(struct.pack(">h", -1))
+        buffer.seek(0)
+        return buffer
+
+    def _encode_copy_csv(self, chunks: List[DocumentChunk]) -> io.StringIO:
+        """将文档块编码为 CSV 格式的 COPY 数据"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for chunk in chunks:
+            writer.writerow([
+                chunk.chunk_id,
+                chunk.document_id,
+                chunk.content,
+                json.dumps(chunk.metadata or {}, ensure_ascii=False),
+                "[" + ",".join(repr(float(v)) for v in chunk.vector) + "]" if chunk.vector is not None else "",
+                chunk.embedding_model or ""
+            ])
+        buffer.seek(0)
+        return buffer
+
     def batch_embed_and_store(self, chunks: List[DocumentChunk]) -> bool:
         """批量向量化并存储文档块"""
         try:
@@ -284,33 +769,328 @@ class PgVectorStore:
             logger.error(f"批量向量化存储失败: {e}")
             raise VectorStoreError(f"批量向量化存储失败: {e}")
 
-    def search_similar(self, query: str, top_k: int = 5) -> List[DocumentChunk]:
-        """基于向量相似度搜索相关文档"""
+    def ann_settings(self, index_method: str, limit: int,
+                     params: Optional[SearchParams] = None) -> List[str]:
+        """
+        生成近似搜索的 SET LOCAL 语句
+
+        Args:
+            index_method: 查询使用的索引类型 hnsw/ivfflat
+            limit: 需要从索引取回的结果数
+            params: 查询参数，未设置的项使用 pgvector 默认值
+        """
+        params = params or SearchParams()
+        statements = []
+        if index_method == "hnsw":
+            # HNSW 每次扫描最多返回 ef_search 个结果，小于 LIMIT 时结果会不足
+            ef_search = max(params.ef_search or DEFAULT_EF_SEARCH, limit)
+            if ef_search > MAX_EF_SEARCH:
+                # 迭代扫描会在 ef_search 个结果之后继续扫描索引，没有开启时结果会不足
+                if params.iterative_scan in (None, "off"):
+                    logger.warning(f"需要 {limit} 个候选，超过 hnsw.ef_search 上限 {MAX_EF_SEARCH}，结果可能不足；"
+                                   "请设置 iterative_scan 让索引扫描继续取回更多结果")
+                ef_search = MAX_EF_SEARCH
+            statements.append(f"SET LOCAL hnsw.ef_search = {ef_search}")
+        elif params.probes:
+            statements.append(f"SET LOCAL ivfflat.probes = {params.probes}")
+
+        if params.iterative_scan is not None:
+            # IVFFlat 只支持 relaxed_order
+            scan = "relaxed_order" if index_method == "ivfflat" and params.iterative_scan == "strict_order" else params.iterative_scan
+            statements.append(f"SET LOCAL {index_method}.iterative_scan = {scan}")
+        return statements
+
+    def search_by_vector(self, query_vector: List[float], top_k: int = 5,
+                         mode: Optional[str] = None, params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """
+        按查询向量搜索文档块
+
+        Args:
+            query_vector: 查询向量
+            top_k: 返回数量
+            mode: 为空时按配置选择 index 或 binary；index 使用向量索引；binary 先用二值量化索引按汉明距离取
+                  top_k * binary_oversample 个候选，再用全精度向量精确重排；
+                  exact 关闭索引扫描做精确搜索（用于评估召回率）
+            params: ef_search/probes/迭代扫描等近似搜索参数；lazy_content 时只返回 id、分数和元数据
+
+        Returns:
+            按相似度排序的文档块列表
+        """
         if not self.connection:
             raise ConnectionError("数据库未连接")
 
-        try:
-            # 向量化查询文本
-            query_vector = self.embed_text(query)
-
-            cursor = self.connection.cursor()
+        settings, search_sql, query_params = self.search_query(self._prepare_vector(query_vector), top_k, mode, params)
+        # 查询向量以紧凑的 pgvector 文本格式只发送一次，服务端直接解析为向量
+        query_params = (vector_literal(query_params[0]),) + tuple(query_params[1:])
+        with self._transaction() as cursor:
+            for statement in settings:
+                cursor.execute(statement)
+            self._execute_prepared(cursor, search_sql, query_params)
+            results = cursor.fetchall()
 
+        return self.rows_to_chunks(results, params)
+
+    def _execute_prepared(self, cursor, sql: str, query_params: tuple):
+        """
+        以服务端预备语句执行使用 $n 占位符的语句
+
+        每个连接第一次执行时 PREPARE，之后只发送 EXECUTE 和参数，省去每次查询的解析和规划；
+        prepare_statements 关闭时（如经过事务级 PgBouncer）把语句展开为普通查询。
+        """
+        if not self.config.prepare_statements:
+            cursor.execute(_PARAM_PATTERN.sub(lambda match: "%s", sql),
+                           [query_params[int(match.group(1)) - 1] for match in _PARAM_PATTERN.finditer(sql)])
+            return
+
+        name = "rag_search_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+        if name not in self._prepared_statements:
+            # 连接来自共享连接池，其他实例可能已在这个会话上准备过同一语句
+            cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name,))
+            if cursor.fetchone() is None:
+                cursor.execute(f"PREPARE {name} AS {sql}")
+            self._prepared_statements.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(query_params))})", query_params)
+
+    def search_query(self, query_vector: List[float], top_k: int, mode: Optional[str] = None,
+                     params: Optional[SearchParams] = None):
+        """
+        生成检索语句（同步和异步检索共用）
+
+        查询向量作为 $1 只传一次，在打分和排序中重复引用；同步路径把语句 PREPARE 为服务端预备语句，
+        asyncpg 直接使用 $n 占位符。top_k 和候选数直接写入语句而不作为参数：预备语句执行多次后
+        PostgreSQL 可能改用通用计划，LIMIT 未知时通用计划可能不走 HNSW/IVFFlat 索引；每个 top_k 一条预备语句。
+
+        Args:
+            query_vector: 已预处理的查询向量
+            top_k / mode / params: 同 search_by_vector
+
+        Returns:
+            (SET LOCAL 语句列表, 使用 $n 占位符的查询语句, 查询参数)
+        """
+        mode = mode or ("binary" if self.config.binary_quantization else "index")
+        top_k = int(top_k)
+        if params and params.lazy_content:
+            # 两阶段检索：不读取（可能经过 TOAST 压缩的）内容，由 fetch_chunks 按需补全
+            columns = "chunk_id, document_id, NULL::text AS content, metadata, embedding_model, created_at"
+        else:
+            columns = "chunk_id, document_id, content, metadata, embedding_model, created_at"
+
+        if mode == "binary":
+            candidates = top_k * max(1, self.config.binary_oversample)
+            # 候选阶段只取 id 和向量，内容只为最终的 top_k 读取
+            search_sql = f"""
+            WITH candidates AS (
+                SELECT id, vector FROM {self.config.table_name}
+                ORDER BY {self.binary_expression} <~> binary_quantize($1::{self.column_type})
+                LIMIT {candidates}
+            ), ranked AS (
+                SELECT id, vector {self.distance_operator} $1::{self.column_type} AS distance
+                FROM candidates
+                ORDER BY distance
+                LIMIT {top_k}
+            )
+            SELECT {columns}, {self.similarity_sql("ranked.distance")} AS similarity
+            FROM ranked JOIN {self.config.table_name} USING (id)
+            ORDER BY ranked.distance
+            """
+        elif mode == "exact":
+            distance_sql = f"vector {self.distance_operator} $1::{self.column_type}"
+            search_sql = f"""
+            SELECT {columns}, {self.similarity_sql(distance_sql)} as similarity
+            FROM {self.config.table_name}
+            ORDER BY {distance_sql}
+            LIMIT {top_k}
+            """
+        elif mode == "index":
+            # 排序表达式与向量索引一致，才能走ANN索引
+            distance_sql = f"{self.vector_expression} {self.distance_operator} $1::{self.index_type}"
             search_sql = f"""
-            SELECT chunk_id, document_id, content, metadata, embedding_model, created_at,
-                   (1 - (vector <-> %s::vector)) as similarity
+            SELECT {columns}, {self.similarity_sql(distance_sql)} as similarity
             FROM {self.config.table_name}
-            ORDER BY vector <-> %s::vector
-            LIMIT %s
+            ORDER BY {distance_sql}
+            LIMIT {top_k}
             """
+        else:
+            raise ValueError(f"不支持的搜索模式: {mode}")
+        query_params = (query_vector,)
+
+        if mode == "exact":
+            settings = ["SET LOCAL enable_indexscan = off"]
+        elif mode == "binary":
+            # 二值量化索引固定为 HNSW，ef_search 需覆盖全部候选
+            settings = self.ann_settings("hnsw", candidates, params)
+        else:
+            settings = self.ann_settings(self.index_method, top_k, params)
+
+        return settings, search_sql, query_params
+
+    @staticmethod
+    def rows_to_chunks(rows, params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """把检索结果行转换为文档块，相似度写入 metadata["similarity"]"""
+        chunks = []
+        for row in rows:
+            chunk = DocumentChunk(
+                content=row[2],
+                metadata=row[3] if row[3] else {},
+                chunk_id=row[0],
+                document_id=row[1],
+                embedding_model=row[4],
+                created_at=row[5]
+            )
+            # 添加相似度分数到元数据
+            chunk.metadata["similarity"] = float(row[6])
+            chunks.append(chunk)
+
+        if params and params.iterative_scan == "relaxed_order":
+            # relaxed_order 的迭代扫描可能返回略微乱序的结果
+            chunks.sort(key=lambda c: c.metadata["similarity"], reverse=True)
+
+        return chunks
+
+    async def asearch_similar(self, query: str, top_k: int = 5,
+                              params: Optional[SearchParams] = None) -> List[DocumentChunk]:
+        """
+        异步相似度搜索
+
+        安装了 asyncpg 和 aiohttp 时使用原生异步驱动，同一事件循环中的查询共用一个 asyncpg 连接池并发执行；
+        否则回退到在线程池中执行同步检索。
+        """
+        from async_retrieval import AsyncPgVectorStore, async_available
+
+        if not async_available():
+            return await super().asearch_similar(query, top_k, params)
+
+        loop = asyncio.get_running_loop()
+        async_store = self._async_stores.get(loop)
+        if async_store is None:
+            self._release_closed_loops()
+            async_store = self._async_stores[loop] = AsyncPgVectorStore(self)
+        return await async_store.search_similar(query, top_k, params)
+
+    def _release_closed_loops(self):
+        """关闭事件循环已结束的异步连接池（未调用 aclose 就结束的 asyncio.run 等）"""
+        for loop in [loop for loop in self._async_stores if loop.is_closed()]:
+            self._async_stores.pop(loop).terminate()
+
+    async def aclose(self):
+        """关闭当前事件循环的异步连接池和HTTP会话"""
+        async_store = self._async_stores.pop(asyncio.get_running_loop(), None)
+        if async_store is not None:
+            await async_store.close()
+        self._release_closed_loops()
+
+    def evaluate_recall(self, queries: List[str], top_k: int = 10,
+                        mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        以精确搜索为基准评估近似搜索的召回率
+
+        Args:
+            queries: 查询文本列表
+            top_k: 每个查询比较的结果数量
+            mode: 被评估的搜索模式，默认按配置选择 index 或 binary
+
+        Returns:
+            平均召回率和两种搜索的平均耗时
+        """
+        mode = mode or ("binary" if self.config.binary_quantization else "index")
+        recalls = []
+        approx_time = 0.0
+        exact_time = 0.0
+
+        for query in queries:
+            query_vector = self.embed_text(query)
 
-            cursor.execute(search_sql, (query_vector, query_vector, top_k))
-            results = cursor.fetchall()
+            start_time = time.time()
+            approx_ids = {chunk.chunk_id for chunk in self.search_by_vector(query_vector, top_k, mode=mode)}
+            approx_time += time.time() - start_time
+
+            start_time = time.time()
+            exact_ids = {chunk.chunk_id for chunk in self.search_by_vector(query_vector, top_k, mode="exact")}
+            exact_time += time.time() - start_time
+
+            if exact_ids:
+                recalls.append(len(approx_ids & exact_ids) / len(exact_ids))
+
+        count = len(queries) or 1
+        return {
+            "mode": mode,
+            "queries": len(queries),
+            "top_k": top_k,
+            "recall": sum(recalls) / len(recalls) if recalls else 0.0,
+            "avg_latency_ms": approx_time / count * 1000,
+            "exact_avg_latency_ms": exact_time / count * 1000
+        }
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        按 chunk_id 删除文档块
+
+        Args:
+            chunk_ids: 要删除的文档块ID列表
+
+        Returns:
+            实际删除的行数
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        if not chunk_ids:
+            return 0
+
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"DELETE FROM {self.config.table_name} WHERE chunk_id = ANY(%s)",
+                (list(chunk_ids),)
+            )
+            deleted = cursor.rowcount
+            cursor.close()
+            logger.info(f"删除文档块: {deleted} 行")
+            return deleted
+
+        except Exception as e:
+            logger.error(f"删除文档块失败: {e}")
+            raise DatabaseError(f"删除文档块失败: {e}")
+
+    def get_chunk_ids(self, document_id: str) -> List[str]:
+        """获取某个文档当前已存储的全部文档块ID"""
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"SELECT chunk_id FROM {self.config.table_name} WHERE document_id = %s",
+                (document_id,)
+            )
+            chunk_ids = [row[0] for row in cursor.fetchall()]
             cursor.close()
+            return chunk_ids
+
+        except Exception as e:
+            logger.error(f"查询文档块ID失败: {e}")
+            raise DatabaseError(f"查询文档块ID失败: {e}")
+
+    def fetch_chunks(self, chunk_ids: List[str]) -> Dict[str, DocumentChunk]:
+        """按 chunk_id 批量读取文档块（一次查询，不含向量），用于补全 lazy_content 检索结果的内容"""
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        if not chunk_ids:
+            return {}
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
 
-            # 转换为DocumentChunk对象
-            chunks = []
-            for row in results:
-                chunk = DocumentChunk(
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"""
+                SELECT chunk_id, document_id, content, metadata, embedding_model, created_at
+                FROM {self.config.table_name}
+                WHERE chunk_id = ANY(%s)
+                """,
+                (chunk_ids,)
+            )
+            chunks = {
+                row[0]: DocumentChunk(
                     content=row[2],
                     metadata=row[3] if row[3] else {},
                     chunk_id=row[0],
@@ -318,16 +1098,113 @@ class PgVectorStore:
                     embedding_model=row[4],
                     created_at=row[5]
                 )
-                # 添加相似度分数到元数据
-                chunk.metadata["similarity"] = float(row[6])
-                chunks.append(chunk)
-
-            logger.info(f"相似度搜索完成: 找到 {len(chunks)} 个相关文档块")
+                for row in cursor.fetchall()
+            }
+            cursor.close()
             return chunks
 
         except Exception as e:
-            logger.error(f"相似度搜索失败: {e}")
-            raise VectorStoreError(f"相似度搜索失败: {e}")
+            logger.error(f"读取文档块失败: {e}")
+            raise DatabaseError(f"读取文档块失败: {e}")
+
+    def update_chunk_metadata(self, chunks: List[DocumentChunk]) -> int:
+        """
+        只更新已存在文档块的元数据（不重新向量化）
+
+        元数据未变化的行不会被改写。
+
+        Args:
+            chunks: 文档块列表
+
+        Returns:
+            实际更新的行数
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        if not chunks:
+            return 0
+
+        try:
+            cursor = self.connection.cursor()
+            execute_values(
+                cursor,
+                f"""
+                UPDATE {self.config.table_name} AS t
+                SET metadata = v.metadata::jsonb
+                FROM (VALUES %s) AS v(chunk_id, metadata)
+                WHERE t.chunk_id = v.chunk_id
+                  AND t.metadata IS DISTINCT FROM v.metadata::jsonb
+                """,
+                [(chunk.chunk_id, Json(chunk.metadata)) for chunk in chunks],
+                page_size=max(1, self.config.write_batch_size)
+            )
+            updated = cursor.rowcount
+            cursor.close()
+            return updated
+
+        except Exception as e:
+            logger.error(f"更新文档块元数据失败: {e}")
+            raise DatabaseError(f"更新文档块元数据失败: {e}")
+
+    def delete_stale_chunks(self, document_id: str, keep_chunk_ids: List[str]) -> int:
+        """
+        一次性删除某个文档中不在保留列表里的文档块
+
+        Args:
+            document_id: 文档ID
+            keep_chunk_ids: 需要保留的文档块ID列表
+
+        Returns:
+            实际删除的行数
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"DELETE FROM {self.config.table_name} "
+                f"WHERE document_id = %s AND NOT (chunk_id = ANY(%s))",
+                (document_id, list(keep_chunk_ids))
+            )
+            deleted = cursor.rowcount
+            cursor.close()
+            if deleted:
+                logger.info(f"清理文档 {document_id} 的过期文档块: {deleted} 行")
+            return deleted
+
+        except Exception as e:
+            logger.error(f"清理过期文档块失败: {e}")
+            raise DatabaseError(f"清理过期文档块失败: {e}")
+
+    def delete_document(self, document_id: str) -> int:
+        """
+        删除某个文档的全部文档块
+
+        Args:
+            document_id: 文档ID
+
+        Returns:
+            实际删除的行数
+        """
+        if not self.connection:
+            raise ConnectionError("数据库未连接")
+
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"DELETE FROM {self.config.table_name} WHERE document_id = %s",
+                (document_id,)
+            )
+            deleted = cursor.rowcount
+            cursor.close()
+            logger.info(f"删除文档 {document_id}: {deleted} 行")
+            return deleted
+
+        except Exception as e:
+            logger.error(f"删除文档失败: {e}")
+            raise DatabaseError(f"删除文档失败: {e}")
 
     def get_statistics(self) -> Dict[str, Any]:
         """获取存储统计信息"""
@@ -349,15 +1226,33 @@ class PgVectorStore:
             cursor.execute(f"SELECT embedding_model, COUNT(*) FROM {self.config.table_name} GROUP BY embedding_model")
             model_distribution = dict(cursor.fetchall())
 
+            # 表和索引占用的磁盘空间
+            cursor.execute(
+                "SELECT pg_table_size(%s::regclass), pg_indexes_size(%s::regclass)",
+                (self.config.table_name, self.config.table_name)
+            )
+            table_size, index_size = cursor.fetchone()
+
             cursor.close()
 
-            return {
+            stats = {
                 "total_chunks": total_chunks,
                 "unique_documents": unique_documents,
                 "model_distribution": model_distribution,
-                "table_name": self.config.table_name
+                "table_name": self.config.table_name,
+                "vector_storage": self._current_column_type(),
+                "vector_index": f"{self.vector_expression} ({self.index_type})",
+                "table_size_mb": round(table_size / 1024 / 1024, 2),
+                "index_size_mb": round(index_size / 1024 / 1024, 2),
+                "reduction": (f"{self.config.reduction_method}: {self.config.vector_dimension} -> {self.stored_dimension}"
+                              if self.reducer else "none")
             }
 
+            if self.embedding_cache:
+                stats["embedding_cache"] = self.embedding_cache.stats()
+
+            return stats
+
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
             raise DatabaseError(f"获取统计信息失败: {e}")
@@ -381,14 +1276,7 @@ class PgVectorStore:
             health_status["database"] = False
 
         # 检查向量化服务
-        try:
-            response = requests.get(
-                self.config.embedding_endpoint.replace("/api/embeddings", "/api/tags"),
-                timeout=5
-            )
-            health_status["embedding_service"] = response.status_code == 200
-        except Exception:
-            health_status["embedding_service"] = False
+        health_status["embedding_service"] = self.embedder.health_check()
 
         # 检查表是否存在
         try:
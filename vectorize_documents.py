@@ -6,25 +6,64 @@
 import os
 import sys
 import glob
+import hashlib
 from pathlib import Path
+from typing import List, Optional
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from document_splitter import DocumentSplitter
+from document_manifest import DocumentManifest
+from ingest_pipeline import IngestPipeline, print_pipeline_report
 from vector_store import PgVectorStore, VectorStoreConfig, DocumentChunk
+from vector_index import VectorIndexManager, IndexProgress
 
 
 class DocumentVectorizer:
     """文档向量化处理器"""
 
-    def __init__(self, database_url: str = "postgresql://localhost/hello_vector"):
+    def __init__(self, database_url: str = "postgresql://localhost/hello_vector",
+                 embedding_cache_path: str = "~/.rag_cli/embedding_cache.db",
+                 id_mode: str = "positional",
+                 vector_storage: Optional[str] = None,
+                 distance_metric: Optional[str] = None,
+                 reduction_method: Optional[str] = None,
+                 reduced_dimension: Optional[int] = None,
+                 defer_index: bool = False,
+                 force_vector_update: bool = False):
+        """
+        Args:
+            database_url: 数据库连接字符串
+            embedding_cache_path: 持久化向量缓存路径
+            id_mode: 文档块ID生成方式，positional 按位置编号，content 按标题路径和内容哈希生成
+            vector_storage: 向量列类型（vector/halfvec），指定时会把已有表转换为该类型
+            distance_metric: 距离度量（l2/cosine/ip），指定时会按该度量重建已有表的向量索引
+            reduction_method: 降维方式（none/truncate/pca），入库和查询使用同一变换
+            reduced_dimension: 降维后的存储维度
+            defer_index: 导入前删除已有向量索引，导入完成后再按行数重建（适合全量重新导入）
+            force_vector_update: 重新向量化已有的文档块并覆盖向量（切换向量化接口或模型版本后使用），
+                                 指定 vector_storage/distance_metric/reduction_method 时自动开启
+        """
+        if id_mode not in ("positional", "content"):
+            raise ValueError(f"不支持的ID模式: {id_mode}")
+
+        self.id_mode = id_mode
+        self.convert_storage = vector_storage is not None or distance_metric is not None
+        self.defer_index = defer_index
         self.document_splitter = DocumentSplitter()
 
-        # 配置向量存储
+        # 配置向量存储（启用持久化向量缓存，未变化的文档块不再重复向量化）
         self.config = VectorStoreConfig(
             database_url=database_url,
-            table_name="document_chunks"
+            table_name="document_chunks",
+            embedding_cache_path=embedding_cache_path,
+            vector_storage=vector_storage or "vector",
+            distance_metric=distance_metric or "l2",
+            reduction_method=reduction_method or "none",
+            reduced_dimension=reduced_dimension,
+            # 转换存储、度量或降维后入库的向量与已有向量不同，内容未变的行也要覆盖向量
+            force_vector_update=force_vector_update or self.convert_storage or reduction_method is not None
         )
         self.vector_store = PgVectorStore(self.config)
 
@@ -37,10 +76,18 @@ class DocumentVectorizer:
             self.vector_store.connect()
             print("✓ 数据库连接成功")
 
-            # 创建表
-            self.vector_store.create_table()
+            # 创建表（向量索引在导入完成后按实际行数构建，导入过程不维护索引）
+            self.vector_store.create_table(create_vector_index=False)
             print("✓ 向量存储表创建成功")
 
+            if self.defer_index:
+                dropped = VectorIndexManager(self.vector_store).drop()
+                if dropped:
+                    print(f"✓ 已删除向量索引，导入完成后重建: {', '.join(dropped)}")
+
+            if self.convert_storage and self.vector_store.migrate_vector_storage():
+                print(f"✓ 向量列已转换为 {self.vector_store.column_type}，索引操作符类 {self.vector_store.index_opclass}")
+
             # 健康检查
             health = self.vector_store.health_check()
             print(f"✓ 健康检查: {health}")
@@ -53,68 +100,238 @@ class DocumentVectorizer:
 
     def process_single_document(self, file_path: str, document_id: str = None) -> bool:
         """处理单个文档文件"""
+        return self._vectorize_document(file_path, document_id) is not None
+
+    def _vectorize_document(self, file_path: str, document_id: str = None) -> Optional[List[str]]:
+        """分割、向量化并存储单个文档，成功时返回生成的文档块ID列表"""
         try:
             if not document_id:
                 document_id = Path(file_path).stem
 
             print(f"处理文档: {file_path}")
 
-            # 读取文档内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # 分割文档
-                chunks = self.document_splitter.split_document(file_path)
-                print(f"  - 分割为 {len(chunks)} 个文档块")
+            # 分割文档
+            chunks = self.document_splitter.split_document(file_path)
+            print(f"  - 分割为 {len(chunks)} 个文档块")
 
             # 转换为向量存储格式
             vector_chunks = []
+            seen_ids = set()
             for i, chunk in enumerate(chunks):
                 vector_chunk = DocumentChunk(
                     content=chunk.content,
                     metadata=chunk.metadata,
-                    chunk_id=f"{document_id}_chunk_{i}",
+                    chunk_id=self._make_chunk_id(document_id, i, chunk, seen_ids),
                     document_id=document_id
                 )
                 vector_chunks.append(vector_chunk)
 
-            # 批量向量化存储
-            success = self.vector_store.batch_embed_and_store(vector_chunks)
+            if self.id_mode == "content":
+                success = self._store_content_addressed(document_id, vector_chunks)
+            else:
+                # 批量向量化存储
+                success = self.vector_store.batch_embed_and_store(vector_chunks)
 
             if success:
                 print(f"  ✓ 文档 {document_id} 向量化存储完成")
-                return True
+                return [chunk.chunk_id for chunk in vector_chunks]
             else:
                 print(f"  ❌ 文档 {document_id} 向量化存储失败")
-                return False
+                return None
 
         except Exception as e:
             print(f"  ❌ 处理文档 {file_path} 失败: {e}")
-            return False
+            return None
+
+    def _make_chunk_id(self, document_id: str, index: int, chunk, seen_ids: set) -> str:
+        """生成文档块ID"""
+        if self.id_mode != "content":
+            return f"{document_id}_chunk_{index}"
+
+        # 基于标题路径和内容的哈希，插入或删除其他段落不会改变该块的ID
+        heading_path = chunk.metadata.get('heading_path', '')
+        digest = hashlib.sha256(f"{heading_path}\n{chunk.content}".encode('utf-8')).hexdigest()[:16]
+        chunk_id = f"{document_id}_{digest}"
+
+        # 同一文档内标题和内容完全相同的块按出现次序区分
+        occurrence = 1
+        candidate = chunk_id
+        while candidate in seen_ids:
+            occurrence += 1
+            candidate = f"{chunk_id}_{occurrence}"
+        seen_ids.add(candidate)
+        return candidate
+
+    def _store_content_addressed(self, document_id: str, vector_chunks: List[DocumentChunk]) -> bool:
+        """只向量化新增的文档块，已有块仅同步元数据，并一次性清理不再存在的块"""
+        # 需要覆盖向量时已有的块也重新向量化
+        existing_ids = set() if self.config.force_vector_update else set(self.vector_store.get_chunk_ids(document_id))
+
+        new_chunks = [chunk for chunk in vector_chunks if chunk.chunk_id not in existing_ids]
+        kept_chunks = [chunk for chunk in vector_chunks if chunk.chunk_id in existing_ids]
+
+        success = True
+        if new_chunks:
+            success = self.vector_store.batch_embed_and_store(new_chunks)
+
+        # 内容未变的块无需重新向量化，只更新位置等元数据
+        updated = self.vector_store.update_chunk_metadata(kept_chunks)
+        deleted = self.vector_store.delete_stale_chunks(
+            document_id, [chunk.chunk_id for chunk in vector_chunks]
+        )
+
+        print(f"  - 新增 {len(new_chunks)} 个, 未变化 {len(kept_chunks)} 个"
+              f"（元数据更新 {updated} 个）, 删除 {deleted} 个")
+        return success
+
+    def process_directory(self, directory_path: str, pattern: str = "*.md",
+                          incremental: bool = False, manifest_path: str = None) -> dict:
+        """
+        处理目录中的所有文档
 
-    def process_directory(self, directory_path: str, pattern: str = "*.md") -> dict:
-        """处理目录中的所有文档"""
+        Args:
+            directory_path: 文档目录
+            pattern: 文件匹配模式
+            incremental: 是否增量处理（只处理新增/变更的文件，并删除已移除文件的文档块）
+            manifest_path: 增量模式使用的清单文件路径，默认位于文档目录下
+
+        Returns:
+            处理结果统计
+        """
         results = {
             "total_files": 0,
             "successful": 0,
             "failed": 0,
-            "failed_files": []
+            "failed_files": [],
+            "skipped": 0,
+            "removed": 0
         }
 
         # 查找所有匹配的文件
         search_pattern = os.path.join(directory_path, pattern)
-        files = glob.glob(search_pattern)
+        files = sorted(glob.glob(search_pattern))
         results["total_files"] = len(files)
 
         print(f"发现 {len(files)} 个文档文件")
 
-        for file_path in files:
+        if not incremental:
+            for file_path in files:
+                document_id = Path(file_path).stem
+
+                if self.process_single_document(file_path, document_id):
+                    results["successful"] += 1
+                else:
+                    results["failed"] += 1
+                    results["failed_files"].append(file_path)
+
+            return results
+
+        if not manifest_path:
+            manifest_path = os.path.join(directory_path, f".{self.config.table_name}_manifest.json")
+        manifest = DocumentManifest(manifest_path)
+        diff = manifest.diff(files, scope=directory_path)
+
+        print(f"增量模式: 新增 {len(diff.added)}, 变更 {len(diff.changed)}, "
+              f"未变化 {len(diff.unchanged)}, 已删除 {len(diff.removed)}")
+        results["skipped"] = len(diff.unchanged)
+
+        for file_path in diff.added + diff.changed:
             document_id = Path(file_path).stem
+            previous = manifest.get(file_path)
 
-            if self.process_single_document(file_path, document_id):
-                results["successful"] += 1
-            else:
+            chunk_ids = self._vectorize_document(file_path, document_id)
+            if chunk_ids is None:
+                # 保留旧的清单记录，下次运行时重试
+                results["failed"] += 1
+                results["failed_files"].append(file_path)
+                continue
+
+            # 文档变短时清理不再存在的旧文档块
+            if previous:
+                stale_ids = sorted(set(previous.chunk_ids) - set(chunk_ids))
+                if stale_ids:
+                    self.vector_store.delete_chunks(stale_ids)
+
+            manifest.update(file_path, document_id, chunk_ids)
+            results["successful"] += 1
+
+        for file_path in diff.removed:
+            entry = manifest.get(file_path)
+            try:
+                self.vector_store.delete_chunks(entry.chunk_ids)
+                manifest.remove(file_path)
+                results["removed"] += 1
+                print(f"  ✓ 已删除文档 {entry.document_id} 的 {len(entry.chunk_ids)} 个文档块")
+            except Exception as e:
+                print(f"  ❌ 删除文档 {entry.document_id} 失败: {e}")
                 results["failed"] += 1
                 results["failed_files"].append(file_path)
 
+        manifest.save()
+        return results
+
+    def process_directory_streaming(self, directory_path: str, pattern: str = "*.md",
+                                    wash: bool = False, queue_size: int = 8) -> dict:
+        """
+        以流水线方式处理目录中的所有文档
+
+        清洗、分割、关键词提取、向量化和数据库写入并发执行，阶段之间通过有界队列连接。
+
+        Args:
+            directory_path: 文档目录
+            pattern: 文件匹配模式
+            wash: 是否在分割前清洗文本
+            queue_size: 阶段之间队列的容量
+
+        Returns:
+            流水线运行报告
+        """
+        files = sorted(glob.glob(os.path.join(directory_path, pattern)))
+        print(f"发现 {len(files)} 个文档文件")
+
+        pipeline = IngestPipeline(
+            self.vector_store,
+            wash=wash,
+            queue_size=queue_size,
+            make_chunk_id=self._make_chunk_id,
+            delete_stale=self.id_mode == "content",
+            # 与非流水线模式一致：内容寻址的ID已存在时不重新向量化
+            skip_existing=self.id_mode == "content" and not self.config.force_vector_update
+        )
+        return pipeline.run(files)
+
+    def fit_reduction(self, directory_path: str, pattern: str = "*.md") -> bool:
+        """
+        用目录中文档的文档块拟合PCA投影（已有投影时跳过）
+
+        Returns:
+            是否进行了拟合
+        """
+        if self.config.reduction_method != "pca" or self.vector_store.reducer.fitted:
+            return False
+
+        splitter = DocumentSplitter(extract_keywords=False)
+        texts = []
+        for file_path in sorted(glob.glob(os.path.join(directory_path, pattern))):
+            texts.extend(chunk.content for chunk in splitter.split_document(file_path))
+
+        print(f"使用 {min(len(texts), self.config.pca_sample_size)} 个文档块拟合PCA投影...")
+        fitted = self.vector_store.fit_reduction(texts)
+        print(f"✓ PCA投影已保存: {self.config.vector_dimension} -> {self.vector_store.stored_dimension} 维")
+        return fitted
+
+    def build_indexes(self, rebuild: bool = False) -> list:
+        """导入完成后构建缺失的向量索引"""
+        manager = VectorIndexManager(self.vector_store)
+
+        def report(progress: IndexProgress):
+            percent = f" {progress.percent:.0f}%" if progress.percent is not None else ""
+            print(f"  {progress.index_name}: {progress.phase}{percent}")
+
+        results = manager.build(rebuild=rebuild, concurrently=False, on_progress=report)
+        for result in results:
+            if result["status"] != "exists":
+                print(f"✓ 向量索引 {result['name']} 已构建: {result['rows']} 行, 耗时 {result['time']:.1f}s")
         return results
 
     def get_statistics(self) -> dict:
@@ -131,11 +348,18 @@ class DocumentVectorizer:
         print("向量存储连接已关闭")
 
 
-def main(db_url: str):
+def main(db_url: str, incremental: bool = False, manifest_path: str = None,
+         id_mode: str = "positional", streaming: bool = False, wash: bool = False,
+         vector_storage: str = None, distance_metric: str = None,
+         reduction_method: str = None, reduced_dimension: int = None, defer_index: bool = False,
+         force_vector_update: bool = False):
     """主函数 - 处理项目中的所有文档"""
 
     # 创建向量化处理器
-    vectorizer = DocumentVectorizer(db_url)
+    vectorizer = DocumentVectorizer(db_url, id_mode=id_mode, vector_storage=vector_storage,
+                                    distance_metric=distance_metric, reduction_method=reduction_method,
+                                    reduced_dimension=reduced_dimension, defer_index=defer_index,
+                                    force_vector_update=force_vector_update)
 
     try:
         # 初始化系统
@@ -148,13 +372,25 @@ def main(db_url: str):
         # 处理text目录中的所有markdown文档
         text_dir = os.path.join(os.path.dirname(__file__), "text")
 
+        # PCA降维需要在入库前拟合投影
         if os.path.exists(text_dir):
-            results = vectorizer.process_directory(text_dir, "*.md")
+            vectorizer.fit_reduction(text_dir, "*.md")
+
+        if os.path.exists(text_dir) and streaming:
+            report = vectorizer.process_directory_streaming(text_dir, "*.md", wash=wash)
+            print_pipeline_report(report)
+        elif os.path.exists(text_dir):
+            results = vectorizer.process_directory(
+                text_dir, "*.md", incremental=incremental, manifest_path=manifest_path
+            )
 
             print(f"\n=== 处理结果 ===")
             print(f"总文件数: {results['total_files']}")
             print(f"成功: {results['successful']}")
             print(f"失败: {results['failed']}")
+            if incremental:
+                print(f"跳过（未变化）: {results['skipped']}")
+                print(f"删除: {results['removed']}")
 
             if results['failed_files']:
                 print(f"失败文件:")
@@ -163,6 +399,10 @@ def main(db_url: str):
         else:
             print(f"❌ 文档目录不存在: {text_dir}")
 
+        # 导入完成后构建向量索引
+        print("\n=== 构建向量索引 ===")
+        vectorizer.build_indexes()
+
         # 显示最终统计信息
         print(f"\n=== 最终统计 ===")
         stats = vectorizer.get_statistics()
@@ -180,6 +420,30 @@ def main(db_url: str):
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='文档向量化处理工具')
+    parser.add_argument('--incremental', action='store_true', help='增量模式：只处理新增/变更的文件，删除已移除文件的文档块')
+    parser.add_argument('--manifest', type=str, help='增量模式使用的清单文件路径')
+    parser.add_argument('--id-mode', choices=['positional', 'content'], default='positional',
+                        help='文档块ID生成方式：positional 按位置编号，content 按标题路径+内容哈希')
+    parser.add_argument('--streaming', action='store_true', help='流水线模式：清洗、分割、关键词、向量化、写入并发执行')
+    parser.add_argument('--wash', action='store_true', help='流水线模式下在分割前清洗文本')
+    parser.add_argument('--vector-storage', choices=['vector', 'halfvec'],
+                        help='向量列类型：halfvec 以半精度存储，存储减半且2000维以上可直接建HNSW索引（会转换已有表）')
+    parser.add_argument('--distance-metric', choices=['l2', 'cosine', 'ip'],
+                        help='距离度量：ip 会归一化向量（会重建已有表的向量索引）')
+    parser.add_argument('--reduction', choices=['none', 'truncate', 'pca'],
+                        help='降维方式：truncate 取前N维（Matryoshka模型），pca 在文档块样本上拟合投影')
+    parser.add_argument('--reduced-dimension', type=int, help='降维后的存储维度')
+    parser.add_argument('--defer-index', action='store_true',
+                        help='导入前删除向量索引，导入完成后按行数重建（全量重新导入时更快）')
+    parser.add_argument('--force-vector-update', action='store_true',
+                        help='重新向量化已有的文档块并覆盖向量（切换向量化接口或模型版本后使用）')
+    args = parser.parse_args()
+    if args.streaming and (args.incremental or args.manifest):
+        parser.error("--streaming 不支持 --incremental/--manifest，流水线模式总是处理目录中的全部文档")
+
     # 从环境变量获取数据库配置
     db_host = os.getenv("DB_HOST", "localhost")
     db_port = os.getenv("DB_PORT", "5432")
@@ -189,4 +453,8 @@ if __name__ == "__main__":
 
     database_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 
-    main(database_url)
\ No newline at end of file
+    main(database_url, incremental=args.incremental, manifest_path=args.manifest, id_mode=args.id_mode,
+         streaming=args.streaming, wash=args.wash, vector_storage=args.vector_storage,
+         distance_metric=args.distance_metric, reduction_method=args.reduction,
+         reduced_dimension=args.reduced_dimension, defer_index=args.defer_index,
+         force_vector_update=args.force_vector_update)
\ No newline at end of file